@@ -0,0 +1,290 @@
+import asyncio
+import heapq
+import ssl
+import struct
+from urllib.parse import urlsplit
+
+from axis_earthquake_model import EarthquakeModel
+from axis_message_dispatcher import CHANNEL_PRIORITIES, DEFAULT_PRIORITY
+from axis_websocket_frames import (
+    OP_CLOSE, OP_TEXT, accept_key, encode_frame, new_client_key, parse_http_head, read_message_async
+)
+
+
+class AsyncWebSocket:
+    """asyncio のストリーム上で動く最小限のWebSocketクライアント接続"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, url, headers=None, timeout=10.0):
+        """ハンドシェイクを行って接続を返す"""
+        parts = urlsplit(url)
+        secure = parts.scheme == 'wss'
+        port = parts.port or (443 if secure else 80)
+        ssl_context = ssl.create_default_context() if secure else None
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ssl_context,
+                                    server_hostname=parts.hostname if secure else None),
+            timeout)
+
+        key = new_client_key()
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Key: {key}",
+            "Sec-WebSocket-Version: 13",
+        ] + list(headers or [])
+        writer.write(("\r\n".join(request) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        status_line, response_headers = parse_http_head(head[:-4])
+        if status_line.split(" ")[1:2] != ["101"] or response_headers.get('sec-websocket-accept') != accept_key(key):
+            writer.close()
+            raise ConnectionError(f"WebSocketハンドシェイク失敗: {status_line}")
+        return cls(reader, writer)
+
+    async def send(self, payload, opcode=OP_TEXT):
+        """1フレーム送信"""
+        self.writer.write(encode_frame(payload, opcode, mask=True))
+        await self.writer.drain()
+
+    async def recv(self):
+        """1メッセージ受信して (opcode, payload) を返す（ping には自動で pong を返す）"""
+        return await read_message_async(self.reader.readexactly, self.send)
+
+    async def close(self, code=1000):
+        """接続を閉じる"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.send(struct.pack('!H', code), OP_CLOSE)
+        except (ConnectionError, OSError):
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class AsyncEarthquakeModel(EarthquakeModel):
+    """接続・ハートビート・受信・配信を1つのイベントループ上で行う EarthquakeModel
+
+    コールバックの契約（callbacks 辞書）は EarthquakeModel と同じ。
+    1つのイベントループで複数のインスタンスを動かせる。
+    ワーカースレッドは使わず、受信したメッセージはチャンネルの優先度順にイベントループ上で処理する
+    （コールバックはすべてイベントループのスレッドから呼ばれる）。
+    """
+
+    def __init__(self, callbacks=None, heartbeat_interval=30.0, priorities=None, **kwargs):
+        super().__init__(callbacks, dispatch=False, **kwargs)
+        self.heartbeat_interval = heartbeat_interval
+        self.priorities = priorities if priorities is not None else CHANNEL_PRIORITIES
+        self.loop = None
+        self._heartbeat_task = None
+        self._wakeup = None  # 再接続の待機を停止時に中断する asyncio.Event
+        self._pending = []  # 処理待ちのメッセージ（(優先度, 受信順, item) のヒープ）
+        self._pending_seq = 0
+        self._drain_scheduled = False
+
+    def _dispatch(self, channel, item):
+        """メッセージを処理待ちに加え、イベントループの次の周回で処理する"""
+        self._pending_seq += 1
+        heapq.heappush(self._pending, (self.priorities.get(channel, DEFAULT_PRIORITY), self._pending_seq, item))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.loop.call_soon(self._drain_pending)
+
+    def _drain_pending(self):
+        """処理待ちから最も優先度の高いメッセージを1件処理する
+
+        1周回に1件ずつ処理するので、その間に受信した緊急地震速報は先に処理される。
+        """
+        if self._pending:
+            self._process_pending()
+        if self._pending:
+            self.loop.call_soon(self._drain_pending)
+        else:
+            self._drain_scheduled = False
+
+    def _process_pending(self):
+        _, _, item = heapq.heappop(self._pending)
+        try:
+            self._process_message(item)
+        except Exception as e:
+            self._notify_log_message(f"データ処理エラー: {e}", "ERROR")
+
+    def flush(self, timeout=None):
+        """処理待ちのメッセージをすべて処理する（イベントループのスレッドから呼ぶ）"""
+        while self._pending:
+            self._process_pending()
+        return True
+
+    async def run(self, url=None):
+        """接続して受信を続ける（切断・停滞時はバックオフしながら再接続し、停止されるまで戻らない）"""
+        self.loop = asyncio.get_running_loop()
+        if not self.token:
+            self._notify_log_message("アクセストークンが設定されていません。", "ERROR")
+            return
+
+        self._stop_requested = False
+        self._wakeup = asyncio.Event()
+        self.connection_active = True
+        self.supervisor.start()
+        self._notify_log_message("接続を開始しています...", "INFO")
+        self._notify_status_update("接続中...")
+
+        try:
+            if url is None:
+                # サーバーリスト取得は requests を使うためスレッドプールで実行
+                servers = await self.loop.run_in_executor(None, self.get_server_list)
+                if not servers:
+                    self._notify_log_message("利用可能なサーバーが見つかりません", "ERROR")
+                    return
+                urls = [server + "/socket" for server in servers]
+            else:
+                urls = [url]
+
+            index = 0
+            while not self._stop_requested:
+                opened = await self._run_once(urls[index])
+                if self._stop_requested:
+                    break
+
+                delay = self.supervisor.record_disconnected(opened)
+                if delay is None:
+                    self._notify_log_message("再接続の試行回数が上限に達しました", "ERROR")
+                    break
+
+                # 接続できなかった場合は次のサーバーへ切り替える
+                if not opened:
+                    index = (index + 1) % len(urls)
+                self._notify_log_message(
+                    f"🔁 {delay:.1f}秒後に {urls[index]} へ再接続します "
+                    f"(連続失敗 {self.supervisor.consecutive_failures}回)", "WARNING")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.connection_active:
+                self._reset_connection_state()
+
+    async def _run_once(self, url):
+        """1回接続して切断されるまで受信する（接続できた場合は True）"""
+        self.server_url = url
+        self._opened = False
+        self._notify_log_message(f"接続先サーバー: {self.server_url}", "INFO")
+
+        try:
+            self.ws = await AsyncWebSocket.connect(url, [f"Authorization: Bearer {self.token}"])
+        except (OSError, asyncio.TimeoutError, ConnectionError) as e:
+            self._notify_log_message(f"接続エラー: {e}", "ERROR")
+            return False
+        if self._stop_requested:
+            await self.ws.close()
+            return True
+
+        self.on_websocket_open(self.ws)
+        close_code, close_msg = None, None
+        try:
+            while True:
+                # 一定時間なにも受信しない接続は閉じて再接続する（hb の応答も受信に含まれる）
+                try:
+                    opcode, payload = await asyncio.wait_for(self.ws.recv(), self.supervisor.stale_timeout)
+                except asyncio.TimeoutError:
+                    self.supervisor.record_stale()
+                    self._notify_log_message(
+                        f"⏱️ {self.supervisor.stale_timeout:.0f}秒間 hb の応答もデータもないため接続を切断します", "WARNING")
+                    break
+                if opcode == OP_CLOSE:
+                    if len(payload) >= 2:
+                        close_code = struct.unpack('!H', payload[:2])[0]
+                        close_msg = payload[2:].decode('utf-8', 'replace')
+                    break
+                if opcode == OP_TEXT:
+                    self.on_websocket_message(self.ws, payload.decode('utf-8'))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            if not self._stop_requested:
+                self.on_websocket_error(self.ws, e)
+        finally:
+            self.connected = False
+            if self._heartbeat_task:
+                self._heartbeat_task.cancel()
+                self._heartbeat_task = None
+            if self.ws:
+                await self.ws.close()
+            self.on_websocket_close(self.ws, close_code, close_msg)
+        return self._opened
+
+    def _start_heartbeat(self, ws):
+        """ハートビート送信をタスクとして開始"""
+        async def heartbeat():
+            while self.connected:
+                try:
+                    await ws.send('hb')
+                    self.supervisor.record_heartbeat_sent()
+                    await asyncio.sleep(self.heartbeat_interval)
+                except (ConnectionError, OSError):
+                    break
+
+        self._heartbeat_task = asyncio.ensure_future(heartbeat())
+
+    def start_websocket_connection(self):
+        """イベントループ上で接続を開始（イベントループのスレッドから呼ぶ）"""
+        return asyncio.ensure_future(self.run())
+
+    def stop_websocket_connection(self):
+        """接続停止（任意のスレッドから呼べる）"""
+        self._notify_log_message("接続を停止しています...", "WARNING")
+        self._stop_requested = True
+        self.connected = False
+        self.supervisor.cancel()
+        ws = self.ws
+        if self.loop and self.loop.is_running():
+            # 再接続の待機中であれば起こす
+            if self._wakeup is not None:
+                self.loop.call_soon_threadsafe(self._wakeup.set)
+            if ws:
+                asyncio.run_coroutine_threadsafe(ws.close(), self.loop)
+
+
+async def run_clients(clients):
+    """複数の AsyncEarthquakeModel を同じイベントループで並行して動かす"""
+    await asyncio.gather(*(client.run() for client in clients))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from axis_earthquake_model import DEFAULT_SERVER_LIST_URL
+
+    parser = argparse.ArgumentParser(description="asyncio版 AXIS地震情報クライアント")
+    parser.add_argument("--token", required=True, help="AXISアクセストークン")
+    parser.add_argument("--server-list-url", default=DEFAULT_SERVER_LIST_URL)
+    parser.add_argument("--url", help="接続先WebSocket URL（省略時はサーバーリストから取得）")
+    args = parser.parse_args()
+
+    callbacks = {
+        'log_message': lambda message, level: print(f"[{level}] {message}"),
+        'data_received': lambda channel, data: print(f"📡 {channel}: {json.dumps(data, ensure_ascii=False)[:200]}"),
+    }
+    model = AsyncEarthquakeModel(callbacks=callbacks, server_list_url=args.server_list_url)
+    model.set_token(args.token)
+    try:
+        asyncio.run(model.run(args.url))
+    except KeyboardInterrupt:
+        print("\n👋 プログラムを終了します")
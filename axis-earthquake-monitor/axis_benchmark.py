@@ -0,0 +1,368 @@
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from axis_earthquake_model import EarthquakeModel
+from axis_event_index import EventIndex
+from axis_event_store import EventStore
+from axis_event_records import make_record
+from axis_message_decoder import JSON_BACKEND, decode, loads
+from axis_synthetic_load import (HYPOCENTERS, SyntheticLoad, build_profile, make_eew, make_frame, make_jmx,
+                                 make_quake_one)
+
+
+def build_cases(seed=0):
+    """チャンネルとペイロードの大きさごとのベンチマーク用フレーム"""
+    load = SyntheticLoad(seed=seed)
+    rng = load.rng
+    origin_time = load.start_time
+    return [
+        ('eew', 'eew', make_frame('eew', make_eew('20250704123456', 3, 6.1, '茨城県沖', 40, origin_time))),
+        ('quake-one', 'quake-one', make_frame('quake-one', make_quake_one('20250704123456', 6.1, '茨城県沖', 40, origin_time, rng))),
+        ('jmx-small', 'jmx-seismology', make_frame('jmx-seismology', make_jmx('20250704123456', 4.0, '茨城県沖', 40, origin_time, rng, station_count=10))),
+        ('jmx-medium', 'jmx-seismology', make_frame('jmx-seismology', make_jmx('20250704123456', 5.5, '茨城県沖', 40, origin_time, rng, station_count=200))),
+        ('jmx-large', 'jmx-seismology', make_frame('jmx-seismology', make_jmx('20250704123456', 7.3, '茨城県沖', 40, origin_time, rng, station_count=2000))),
+    ]
+
+
+# 緊急地震速報の受信処理の計測で、1つの地震に続けて届く報の数（最後の報は最終報）
+EEW_SERIALS_PER_EVENT = 30
+
+
+def eew_frames(count, origin_time):
+    """報番号が地震ごとに1から増えていく緊急地震速報のフレームを count 件作る
+
+    同じフレームを繰り返すと2件目以降は古い報として無視され、続報の処理を計測できないため。
+    """
+    frames = []
+    for i in range(count):
+        event, serial = divmod(i, EEW_SERIALS_PER_EVENT)
+        frames.append(make_frame('eew', make_eew(
+            f"20250704{event:06d}", serial + 1, 6.1 + serial * 0.01, '茨城県沖', 40,
+            origin_time + timedelta(minutes=event), final=serial + 1 == EEW_SERIALS_PER_EVENT)))
+    return frames
+
+
+def percentile(sorted_values, fraction):
+    """昇順に並んだ値から百分位数を返す（最近傍法）"""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(func, iterations, between=None, between_every=0):
+    """func を iterations 回呼び出し、1回ごとの所要時間(ns)を返す
+
+    between は計測対象外の後片付け処理で、between_every 回ごとに呼ばれる。
+    """
+    samples = []
+    perf_counter_ns = time.perf_counter_ns
+    for i in range(iterations):
+        start = perf_counter_ns()
+        func()
+        samples.append(perf_counter_ns() - start)
+        if between and between_every and (i + 1) % between_every == 0:
+            between()
+    if between:
+        between()
+    return samples
+
+
+def summarize(stage, case, channel, payload_bytes, samples):
+    """計測結果を集計"""
+    samples = sorted(samples)
+    total_ns = sum(samples)
+    return {
+        'stage': stage,
+        'case': case,
+        'channel': channel,
+        'payload_bytes': payload_bytes,
+        'iterations': len(samples),
+        'messages_per_second': len(samples) / (total_ns / 1e9) if total_ns else None,
+        'mean_us': statistics.fmean(samples) / 1000,
+        'p50_us': percentile(samples, 0.50) / 1000,
+        'p99_us': percentile(samples, 0.99) / 1000,
+    }
+
+
+def bench_model(cases, iterations):
+    """チャンネルの先読み、JSONデコード、Modelの受信処理、_notify_* コールバックの計測"""
+    results = []
+    noop_callbacks = {
+        'log_message': lambda message, level: None,
+        'data_received': lambda channel, data: None,
+        'stats_update': lambda total_count, channel_counts: None,
+    }
+
+    for case, channel, raw in cases:
+        payload_bytes = len(raw.encode('utf-8'))
+        content = json.loads(raw)['message']
+
+        results.append(summarize('peek', case, channel, payload_bytes,
+                                 measure(lambda: decode(raw), iterations)))
+        results.append(summarize('decode', case, channel, payload_bytes,
+                                 measure(lambda: loads(raw), iterations)))
+
+        # 受信処理そのものを計測するためワーカースレッドへの受け渡しは行わない
+        model = EarthquakeModel(callbacks=noop_callbacks, dispatch=False)
+        # 緊急地震速報は報番号を増やしながら流し、第1報と続報の処理を計測する
+        frames = iter(eew_frames(iterations, SyntheticLoad().start_time)) if channel == 'eew' else None
+
+        def receive():
+            model.on_websocket_message(None, next(frames) if frames is not None else raw)
+
+        results.append(summarize('on_websocket_message', case, channel, payload_bytes,
+                                 measure(receive, iterations)))
+
+        def notify():
+            model._notify_data_received(channel, content)
+            model._notify_stats_update()
+
+        results.append(summarize('notify', case, channel, payload_bytes, measure(notify, iterations)))
+    return results
+
+
+def bench_gui(cases, iterations):
+    """EarthquakeApp のスケジューリングと EarthquakeGUI の描画の計測（表示環境が必要）"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return [], f"GUIの計測をスキップしました: {e}"
+
+    from axis_earthquake_app import EarthquakeApp
+
+    results = []
+    try:
+        root.withdraw()
+        app = EarthquakeApp(root, journal_dir=None)
+
+        def drain():
+            # 描画待ちの更新は計測の合間に処理する
+            while app.renderer.backlog:
+                app.renderer.flush()
+            root.update()
+            app.gui.clear_display()
+
+        for case, channel, raw in cases:
+            payload_bytes = len(raw.encode('utf-8'))
+            content = json.loads(raw)['message']
+
+            results.append(summarize('app_schedule', case, channel, payload_bytes, measure(
+                lambda: app.on_model_data_received(channel, content), iterations,
+                between=drain, between_every=100)))
+
+            def render():
+                app.gui.display_earthquake_data(channel, content)
+                root.update_idletasks()
+
+            results.append(summarize('gui_render', case, channel, payload_bytes, measure(
+                render, max(iterations // 10, 1), between=app.gui.clear_display, between_every=50)))
+    finally:
+        root.destroy()
+    return results, None
+
+
+def bench_memory(count, seed=0):
+    """count 件の受信データ履歴のメモリ使用量を、従来の辞書形式とレコード形式で比較"""
+    # 実際の受信に近いチャンネル構成のフレームを使い回す（1件ごとに解析し直す）
+    pool = [raw for _, raw in build_profile('constant', seed=seed, rate=1000, duration=1)]
+    base_time = time.time()
+
+    def legacy_entry(i, raw):
+        data = json.loads(raw)
+        return {
+            'timestamp': datetime.fromtimestamp(base_time + i).strftime('%Y-%m-%d %H:%M:%S'),
+            'channel': data.get('channel', '不明'),
+            'data': data.get('message', data),
+        }
+
+    def record_entry(i, raw):
+        return make_record(decode(raw), base_time + i)
+
+    result = {'events': count}
+    for name, build in (('dict', legacy_entry), ('record', record_entry)):
+        gc.collect()
+        tracemalloc.start()
+        history = [build(i, pool[i % len(pool)]) for i in range(count)]
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del history
+        result[f'{name}_bytes'] = used
+        result[f'{name}_bytes_per_event'] = used / count
+    result['reduction'] = 1 - result['record_bytes'] / result['dict_bytes']
+    return result
+
+
+def bench_index(count, iterations=200, seed=0):
+    """1分に1件の地震を count 件索引し、代表的な検索の所要時間を計測"""
+    load = SyntheticLoad(seed=seed)
+    rng = load.rng
+    index = EventIndex()
+    start = time.perf_counter()
+    for i in range(count):
+        origin_time = load.start_time - timedelta(minutes=count - i)
+        magnitude = 2.0 + rng.expovariate(2.0)
+        raw = make_frame('quake-one', make_quake_one(f"{i:016d}", magnitude, rng.choice(HYPOCENTERS),
+                                                     rng.choice([10, 30, 50, 100]), origin_time, rng))
+        index.add(make_record(decode(raw), origin_time.timestamp()))
+    build_seconds = time.perf_counter() - start
+
+    now = load.start_time.timestamp()
+    queries = [
+        ('M5以上・24時間・千葉県東方沖', dict(since=now - 86400, min_magnitude=5.0, hypocenter='千葉県東方沖')),
+        ('M5以上・24時間', dict(since=now - 86400, min_magnitude=5.0)),
+        ('震度5弱以上・7日', dict(since=now - 7 * 86400, min_intensity='5弱')),
+        ('震度6弱以上・全期間', dict(min_intensity='6弱')),
+        ('M6以上・全期間・日向灘', dict(min_magnitude=6.0, hypocenter='日向灘')),
+        ('最新20件', dict(limit=20)),
+    ]
+    results = []
+    for name, filters in queries:
+        samples = sorted(measure(lambda: index.query(**filters), iterations))
+        results.append({
+            'query': name,
+            'hits': len(index.query(**filters)),
+            'p50_us': percentile(samples, 0.50) / 1000,
+            'p99_us': percentile(samples, 0.99) / 1000,
+        })
+    return {'events': count, 'build_seconds': build_seconds, 'queries': results}
+
+
+def bench_store(aftershock_count, seed=0):
+    """余震が続く負荷（本震 + aftershock_count 件の余震）を最高速で EventStore に保存し、
+    受信スレッド側の append() の所要時間と、書き込みスレッドの持続的な書き込み件数を計測"""
+    frames = [raw for _, raw in build_profile('aftershock', seed=seed, rate=aftershock_count, duration=600)]
+    messages = [(json.loads(raw)['channel'], decode(raw).event_id, raw) for raw in frames]
+    with tempfile.TemporaryDirectory() as directory:
+        store = EventStore(os.path.join(directory, 'bench.db'), queue_size=len(messages) + 1).start()
+        position = iter(messages)
+
+        def append():
+            channel, event_id, raw = next(position)
+            store.append(channel, event_id, raw)
+
+        start = time.perf_counter()
+        samples = sorted(measure(append, len(messages)))
+        store.flush()
+        elapsed = time.perf_counter() - start
+        store.close()
+        written = store.count()
+    return {
+        'messages': len(messages),
+        'payload_bytes': sum(len(raw.encode('utf-8')) for _, _, raw in messages),
+        'append_p50_us': percentile(samples, 0.50) / 1000,
+        'append_p99_us': percentile(samples, 0.99) / 1000,
+        'written': written,
+        'batches': store.batch_count,
+        'dropped': store.dropped_count,
+        'seconds': elapsed,
+        'messages_per_second': written / elapsed if elapsed else None,
+    }
+
+
+def compare(results, baseline, threshold):
+    """基準結果と比較し、p99 が threshold 倍を超えて悪化した項目を返す"""
+    baseline_map = {(r['stage'], r['case']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = baseline_map.get((result['stage'], result['case']))
+        if base and base['p99_us'] and result['p99_us'] > base['p99_us'] * threshold:
+            regressions.append({
+                'stage': result['stage'],
+                'case': result['case'],
+                'baseline_p99_us': base['p99_us'],
+                'p99_us': result['p99_us'],
+                'ratio': result['p99_us'] / base['p99_us'],
+            })
+    return regressions
+
+
+def run(iterations=2000, include_gui=True, label=None, seed=0, memory_events=0, index_events=0, store_events=0):
+    """全ステージを計測して結果の辞書を返す"""
+    cases = build_cases(seed)
+    report = {
+        'label': label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'json_backend': JSON_BACKEND,
+        'iterations': iterations,
+        'results': bench_model(cases, iterations),
+        'skipped': [],
+    }
+    if include_gui:
+        gui_results, skipped = bench_gui(cases, iterations)
+        report['results'].extend(gui_results)
+        if skipped:
+            report['skipped'].append(skipped)
+    if memory_events:
+        report['memory'] = bench_memory(memory_events, seed)
+    if index_events:
+        report['index'] = bench_index(index_events, seed=seed)
+    if store_events:
+        report['store'] = bench_store(store_events, seed)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="受信→解析→コールバック→描画のベンチマーク")
+    parser.add_argument("--iterations", type=int, default=2000, help="ケースごとの計測回数")
+    parser.add_argument("--no-gui", action="store_true", help="GUIの計測を行わない")
+    parser.add_argument("--label", help="結果に付けるラベル（バージョン名など）")
+    parser.add_argument("--output", help="結果のJSONを書き出すファイル（省略時は標準出力）")
+    parser.add_argument("--compare", help="比較対象とする過去の結果JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p99 の悪化を検出する倍率")
+    parser.add_argument("--memory-events", type=int, default=0,
+                        help="受信データ履歴のメモリ使用量を比較する件数（例: 100000）")
+    parser.add_argument("--index-events", type=int, default=0,
+                        help="地震の索引の検索時間を計測する件数（例: 1000000）")
+    parser.add_argument("--store-events", type=int, default=0,
+                        help="データベースへの保存を計測する余震の件数（例: 5000）")
+    args = parser.parse_args()
+
+    report = run(args.iterations, include_gui=not args.no_gui, label=args.label, memory_events=args.memory_events,
+                 index_events=args.index_events, store_events=args.store_events)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report['regressions'] = compare(report['results'], json.load(f), args.threshold)
+        exit_code = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for result in report['results']:
+        print(f"{result['stage']:>22} {result['case']:>11}: {result['messages_per_second']:>12.0f} 件/秒  "
+              f"p50 {result['p50_us']:>9.1f}µs  p99 {result['p99_us']:>9.1f}µs", file=sys.stderr)
+    if 'memory' in report:
+        memory = report['memory']
+        print(f"履歴 {memory['events']}件: 辞書 {memory['dict_bytes'] / 2**20:.1f}MiB "
+              f"({memory['dict_bytes_per_event']:.0f}B/件) → レコード {memory['record_bytes'] / 2**20:.1f}MiB "
+              f"({memory['record_bytes_per_event']:.0f}B/件), {memory['reduction']:.0%} 削減", file=sys.stderr)
+    if 'index' in report:
+        print(f"索引 {report['index']['events']}件 (構築 {report['index']['build_seconds']:.1f}秒)", file=sys.stderr)
+        for query in report['index']['queries']:
+            print(f"  {query['query']}: {query['hits']}件  p50 {query['p50_us']:.1f}µs  p99 {query['p99_us']:.1f}µs",
+                  file=sys.stderr)
+    if 'store' in report:
+        store = report['store']
+        print(f"保存 {store['written']}/{store['messages']}件 ({store['payload_bytes'] / 2**20:.1f}MiB): "
+              f"{store['messages_per_second']:.0f}件/秒 ({store['batches']}回のトランザクション), "
+              f"append p50 {store['append_p50_us']:.1f}µs  p99 {store['append_p99_us']:.1f}µs", file=sys.stderr)
+    for skipped in report['skipped']:
+        print(f"⚠️  {skipped}", file=sys.stderr)
+    sys.exit(exit_code)
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import websocket
+
+ProbeResult = namedtuple('ProbeResult', ['server', 'handshake_ms', 'first_message_ms', 'error'])
+
+
+def probe_server(server, token, timeout=3.0):
+    """サーバーへ試験接続し、ハンドシェイクと最初のメッセージ受信までの時間を計測"""
+    url = server + "/socket"
+    start = time.perf_counter()
+    ws = None
+    try:
+        ws = websocket.create_connection(url, header=[f"Authorization: Bearer {token}"], timeout=timeout)
+        handshake_ms = (time.perf_counter() - start) * 1000
+        ws.recv()  # 通常は "hello"
+        first_message_ms = (time.perf_counter() - start) * 1000
+        return ProbeResult(server, handshake_ms, first_message_ms, None)
+    except Exception as e:
+        return ProbeResult(server, None, None, e)
+    finally:
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+
+class ConnectionManager:
+    """サーバーリストの全サーバーを計測して速い順に並べ、切断・停滞時の切り替え先を決める"""
+
+    def __init__(self, probe_timeout=3.0, max_concurrent_probes=2, connect_timeout=5.0, probe=probe_server):
+        self.probe_timeout = probe_timeout
+        # トークンの同時接続数の上限を超えないよう、同時に計測するサーバー数を制限する
+        self.max_concurrent_probes = max_concurrent_probes
+        self.connect_timeout = connect_timeout  # 1サーバーへの接続にかける最大時間
+        self.probe = probe
+        self.results = []
+        self.ranked_servers = []
+        self._lock = threading.Lock()
+
+    def rank(self, servers, token):
+        """全サーバーを並行して計測し、最初のメッセージまでの時間が短い順に並べる
+
+        計測に失敗したサーバーは末尾に元の順序のまま残す（全滅時のフォールバック用）。
+        """
+        if len(servers) <= 1:
+            ranked = list(servers)
+            results = []
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_probes) as executor:
+                results = list(executor.map(lambda server: self.probe(server, token, self.probe_timeout), servers))
+            reachable = sorted((r for r in results if r.error is None), key=lambda r: r.first_message_ms)
+            unreachable = [r for r in results if r.error is not None]
+            ranked = [r.server for r in reachable] + [r.server for r in unreachable]
+
+        with self._lock:
+            self.results = results
+            self.ranked_servers = ranked
+        return ranked
+
+    def next_server(self, current):
+        """current の次に速いサーバーを返す（末尾の次は先頭に戻る）"""
+        with self._lock:
+            servers = self.ranked_servers
+            if not servers:
+                return None
+            if current not in servers:
+                return servers[0]
+            return servers[(servers.index(current) + 1) % len(servers)]
+
+
+class StallWatchdog:
+    """一定時間なにも受信しない接続を閉じて切り替えを促す監視スレッド"""
+
+    def __init__(self, timeout, on_stall, interval=1.0):
+        self.timeout = timeout
+        self.on_stall = on_stall
+        self.interval = interval
+        self.last_activity = time.monotonic()
+        self._stop_event = threading.Event()
+
+    def touch(self):
+        """受信があったことを記録"""
+        self.last_activity = time.monotonic()
+
+    def start(self):
+        self.touch()
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            idle = time.monotonic() - self.last_activity
+            if idle > self.timeout:
+                self.on_stall(idle)
+                break
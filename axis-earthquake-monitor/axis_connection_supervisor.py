@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+
+
+class ReconnectBackoff:
+    """指数バックオフ + ジッターで再接続までの待ち時間を決める"""
+
+    def __init__(self, initial_delay=1.0, max_delay=60.0, multiplier=2.0, jitter=0.5, rng=None):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter  # 0〜1: 待ち時間をこの割合だけランダムに短くする（同時再接続の集中を避ける）
+        self.rng = rng if rng else random.Random()
+        self.attempt = 0
+
+    def next_delay(self):
+        """次の待ち時間（秒）を返し、試行回数を進める"""
+        base = min(self.max_delay, self.initial_delay * self.multiplier ** self.attempt)
+        self.attempt += 1
+        return base * self.rng.uniform(1.0 - self.jitter, 1.0)
+
+    def reset(self):
+        """接続に成功したら最初の待ち時間に戻す"""
+        self.attempt = 0
+
+
+class ConnectionSupervisor:
+    """接続の生存監視と自動再接続の方針を持ち、再接続の計測値を記録する
+
+    stale_timeout 秒の間 hb の応答もデータも届かない接続は切断されたものとみなす
+    （省略時はハートビート間隔の3倍）。
+    """
+
+    def __init__(self, heartbeat_interval=30.0, stale_timeout=None, initial_delay=1.0, max_delay=60.0,
+                 multiplier=2.0, jitter=0.5, max_attempts=None):
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_timeout = stale_timeout if stale_timeout else heartbeat_interval * 3
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts  # 連続失敗の上限（None は無制限）
+        self.backoff = self.new_backoff()
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.connect_count = 0          # 接続に成功した回数
+        self.reconnect_count = 0        # 切断後に復旧した回数
+        self.failed_attempts = 0        # 接続に失敗した回数
+        self.stale_count = 0            # 無応答で切断した回数
+        self.consecutive_failures = 0
+        self.disconnected_at = None     # 最後に切断された時刻（復旧すると None）
+        self.last_recovery_seconds = None
+        self.total_recovery_seconds = 0.0
+        self.max_recovery_seconds = 0.0
+        self.heartbeat_count = 0        # hb の応答を受け取った回数
+        self.last_heartbeat_rtt = None  # 最後の hb の往復時間（秒）
+        self.max_heartbeat_rtt = 0.0
+        self._heartbeat_sent = {}       # 経路 -> hb を送った時刻
+
+    def new_backoff(self):
+        """同じ設定のバックオフを作る（冗長接続の経路ごとに使う）"""
+        return ReconnectBackoff(self.initial_delay, self.max_delay, self.multiplier, self.jitter)
+
+    def start(self):
+        """接続開始時に呼ぶ"""
+        self._cancel_event.clear()
+        self.backoff.reset()
+        with self._lock:
+            self.consecutive_failures = 0
+            self.disconnected_at = None
+
+    def cancel(self):
+        """再接続の待機を中断する（停止時に呼ぶ）"""
+        self._cancel_event.set()
+
+    def wait(self, delay):
+        """delay 秒待つ（中断されたら True を返す）"""
+        return self._cancel_event.wait(delay)
+
+    def record_connected(self):
+        """接続確立を記録し、切断からの復旧時間（秒）を返す（初回接続は None）"""
+        now = time.monotonic()
+        self.backoff.reset()
+        with self._lock:
+            self.connect_count += 1
+            self.consecutive_failures = 0
+            if self.disconnected_at is None:
+                return None
+            recovery = now - self.disconnected_at
+            self.disconnected_at = None
+            self.reconnect_count += 1
+            self.last_recovery_seconds = recovery
+            self.total_recovery_seconds += recovery
+            self.max_recovery_seconds = max(self.max_recovery_seconds, recovery)
+            return recovery
+
+    def record_disconnected(self, opened):
+        """接続の終了を記録し、再接続までの待ち時間を返す（上限に達したら None）"""
+        with self._lock:
+            if opened:
+                self.disconnected_at = time.monotonic()
+            else:
+                self.failed_attempts += 1
+                self.consecutive_failures += 1
+                if self.disconnected_at is None:
+                    self.disconnected_at = time.monotonic()
+            if self.max_attempts is not None and self.consecutive_failures >= self.max_attempts:
+                return None
+        return self.backoff.next_delay()
+
+    def record_stale(self):
+        """無応答による切断を記録"""
+        with self._lock:
+            self.stale_count += 1
+
+    def record_heartbeat_sent(self, link=None):
+        """hb の送信を記録（冗長接続では経路ごとに link を分ける）"""
+        with self._lock:
+            self._heartbeat_sent[link] = time.monotonic()
+
+    def record_heartbeat_received(self, link=None):
+        """hb の応答を記録し、往復時間（秒）を返す（対応する送信がなければ None）
+
+        サーバーから自発的に届く hb とは区別できないため、送信後に最初に届いた hb までの時間を往復時間とする。
+        """
+        now = time.monotonic()
+        with self._lock:
+            sent_at = self._heartbeat_sent.pop(link, None)
+            if sent_at is None:
+                return None
+            rtt = now - sent_at
+            self.heartbeat_count += 1
+            self.last_heartbeat_rtt = rtt
+            self.max_heartbeat_rtt = max(self.max_heartbeat_rtt, rtt)
+            return rtt
+
+    def snapshot(self):
+        """再接続の計測値を辞書で返す"""
+        with self._lock:
+            return {
+                'connect_count': self.connect_count,
+                'reconnect_count': self.reconnect_count,
+                'failed_attempts': self.failed_attempts,
+                'stale_count': self.stale_count,
+                'consecutive_failures': self.consecutive_failures,
+                'disconnected_seconds': (time.monotonic() - self.disconnected_at
+                                         if self.disconnected_at is not None else 0.0),
+                'last_recovery_seconds': self.last_recovery_seconds,
+                'mean_recovery_seconds': (self.total_recovery_seconds / self.reconnect_count
+                                          if self.reconnect_count else None),
+                'max_recovery_seconds': self.max_recovery_seconds,
+                'heartbeat_count': self.heartbeat_count,
+                'last_heartbeat_rtt': self.last_heartbeat_rtt,
+                'max_heartbeat_rtt': self.max_heartbeat_rtt,
+            }
@@ -1,14 +1,39 @@
 import tkinter as tk
 from tkinter import messagebox
+import sqlite3
 import sys
 import os
+import time
 
 # 同じディレクトリ内のモジュールをインポート
-from axis_earthquake_model import EarthquakeModel
+from axis_connection_supervisor import ConnectionSupervisor
+from axis_earthquake_model import EarthquakeModel, DEFAULT_SERVER_LIST_URL
 from axis_earthquake_gui import EarthquakeGUI
+from axis_event_store import EventStore
+from axis_fanout_broker import FanoutBroker
+from axis_formatters import format_eew_changes, format_eew_summary
+from axis_message_journal import MessageJournal
+from axis_metrics import (
+    MetricsRegistry, MetricsServer, broker_metrics, model_metrics, process_metrics, renderer_metrics
+)
+from axis_message_replay import MessageReplay, load_records, parse_speed
+from axis_profiler import CallbackProfiler, format_profile
+from axis_render_scheduler import RenderScheduler
+
+# --journal-dir を値なしで指定したときの生メッセージの保存先（スクリプトと同じ場所の journal/）
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal")
+# 受信メッセージを保存するデータベース（スクリプトと同じ場所）
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earthquake_history.db")
+
+# 緊急地震速報の一覧を描き直す間隔（続報が途絶えたイベントを終了と表示するため）
+EEW_PANEL_REFRESH_MS = 10000
 
 class EarthquakeApp:
-    def __init__(self, root):
+    def __init__(self, root, journal_dir=None, server_list_url=DEFAULT_SERVER_LIST_URL, max_fps=30,
+                 max_log_lines=5000, redundant=False, stale_timeout=None, max_reconnect_delay=60.0,
+                 db_path=DEFAULT_DB_PATH, restore_hours=24.0, broker_port=None, broker_host='127.0.0.1',
+                 metrics_port=None, metrics_host='127.0.0.1', profile=False, profile_sample=1, retention_days=None,
+                 journal_retention_days=None):
         self.root = root
         self.root.title("AXIS地震情報モニター")
 
@@ -17,17 +42,75 @@ class EarthquakeApp:
             'log_message': self.on_model_log_message,
             'status_update': self.on_model_status_update,
             'data_received': self.on_model_data_received,
+            'eew_update': self.on_model_eew_update,
             'stats_update': self.on_model_stats_update,
             'connection_established': self.on_model_connection_established,
             'connection_reset': self.on_model_connection_reset
         }
 
+        # broker_port を指定した場合は受信メッセージをローカルのクライアントへ再配信する
+        self.broker = None
+        if broker_port is not None:
+            self.broker = FanoutBroker(host=broker_host, port=broker_port, log=self.on_model_log_message)
+            self.model_callbacks['message_received'] = self.broker.on_message_received
+
         self.gui_callbacks = {
             'toggle_connection': self.on_gui_toggle_connection
         }
 
-        self.model = EarthquakeModel(callbacks=self.model_callbacks)
-        self.gui = EarthquakeGUI(root, callbacks=self.gui_callbacks)
+        # journal_dir が None の場合（既定。受信データはデータベースに保存される）は生メッセージを保存しない
+        self.journal = None
+        if journal_dir:
+            journal_retention = journal_retention_days * 86400 if journal_retention_days else None
+            self.journal = MessageJournal(journal_dir, retention_seconds=journal_retention)
+        if self.journal:
+            self.journal.start()
+        self.replay = None
+
+        # db_path が None の場合（リプレイ時など）はデータベースに保存しない
+        self.store = None
+        store_error = None
+        if db_path:
+            try:
+                retention_seconds = retention_days * 86400 if retention_days else None
+                self.store = EventStore(db_path, retention_seconds=retention_seconds).start()
+            except (sqlite3.Error, OSError) as e:
+                store_error = e
+
+        self.model = EarthquakeModel(callbacks=self.model_callbacks, journal=self.journal, store=self.store,
+                                     server_list_url=server_list_url, redundant=redundant,
+                                     supervisor=ConnectionSupervisor(stale_timeout=stale_timeout,
+                                                                     max_delay=max_reconnect_delay))
+        self.gui = EarthquakeGUI(root, callbacks=self.gui_callbacks, max_log_lines=max_log_lines)
+
+        # Modelからの更新はまとめて max_fps 回/秒まで描画する
+        self.renderer = RenderScheduler(root, self.gui, max_fps=max_fps)
+        self.renderer.start()
+        self._eew_refresh_id = self.root.after(EEW_PANEL_REFRESH_MS, self.refresh_eew_panel)
+
+        # profile=True の場合はコールバック・処理段階・描画の所要時間を計測し、F9 キーでログへ出力する
+        if profile:
+            profiler = CallbackProfiler(sample_every=profile_sample)
+            self.model.enable_profiling(profiler)
+            self.renderer.flush = profiler.wrap("stage.render_flush", self.renderer.flush)
+            self.root.bind("<F9>", lambda event: self.dump_profile())
+
+        if self.broker:
+            try:
+                self.broker.start()
+            except OSError as e:
+                self.on_model_log_message(f"再配信サーバーを開始できません: {e}", "ERROR")
+                self.broker = None
+
+        # metrics_port を指定した場合は Prometheus 形式のメトリクスを公開する
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.start_metrics_server(metrics_host, metrics_port)
+
+        if store_error is not None:
+            self.on_model_log_message(f"データベースを開けません: {store_error}", "ERROR")
+        elif self.store is not None and restore_hours:
+            self.restore_history(restore_hours)
 
         # アプリアイコンの設定（可能であれば）
         try:
@@ -50,6 +133,54 @@ class EarthquakeApp:
         """アプリケーションを開始"""
         self.root.mainloop()
 
+    def start_metrics_server(self, host, port):
+        """受信・接続・処理待ち・描画待ち・メモリのメトリクスを http://host:port/metrics で公開"""
+        registry = MetricsRegistry()
+        registry.add(lambda: model_metrics(self.model))
+        registry.add(lambda: renderer_metrics(self.renderer))
+        if self.broker:
+            registry.add(lambda: broker_metrics(self.broker))
+        registry.add(process_metrics)
+        try:
+            self.metrics_server = MetricsServer(registry, host, port, log=self.on_model_log_message).start()
+        except OSError as e:
+            self.on_model_log_message(f"メトリクスを公開できません: {e}", "ERROR")
+
+    def dump_profile(self):
+        """コールバック・処理段階ごとの所要時間をログ表示へ出力"""
+        if self.model.profiler is not None:
+            self.on_model_log_message(
+                f"コールバックの所要時間:\n{format_profile(self.model.profiler.report())}", "INFO")
+
+    def restore_history(self, hours):
+        """データベースから直近 hours 時間の受信データを読み込む"""
+        try:
+            messages = self.store.load_recent(since=time.time() - hours * 3600,
+                                              limit=self.model.data_log.max_entries or 10000)
+        except sqlite3.Error as e:
+            self.on_model_log_message(f"履歴の読み込みエラー: {e}", "ERROR")
+            return
+        restored = self.model.restore_history(messages)
+        if restored:
+            self.on_model_log_message(f"📂 直近{hours:g}時間の受信データ {restored}件を読み込みました", "INFO")
+            self.post_eew_panel()
+
+    def start_replay(self, path, speed=1.0):
+        """記録済みメッセージをModelに流し込んで再生"""
+        speed_text = f"{speed}倍速" if speed else "最高速"
+        self.on_model_log_message(f"リプレイを開始します: {path} ({speed_text})", "INFO")
+        self.on_model_status_update("▶ リプレイ中")
+        self.replay = MessageReplay(self.model, load_records(path), speed=speed,
+                                    on_finished=self.on_replay_finished)
+        self.replay.start()
+
+    def on_replay_finished(self, summary):
+        """リプレイ完了時の処理"""
+        self.on_model_log_message(
+            f"リプレイ完了: {summary['replayed_count']}件 / {summary['elapsed']:.2f}秒 "
+            f"({summary['messages_per_second']:.1f}件/秒)", "SUCCESS")
+        self.on_model_status_update("🔴 未接続")
+
     # --- GUIからのイベントハンドラ (Controllerの役割) ---
     def on_gui_toggle_connection(self, token):
         """GUIの接続ボタンがクリックされたときにModelに通知"""
@@ -59,19 +190,42 @@ class EarthquakeApp:
     # --- Modelからの通知ハンドラ (Controllerの役割) ---
     def on_model_log_message(self, message, level):
         """ModelからのログメッセージをGUIに表示"""
-        self.root.after(0, lambda: self.gui.append_log_message(message, level))
+        self.renderer.post_log(message, level)
 
     def on_model_status_update(self, status_text):
         """Modelからのステータス更新をGUIに表示"""
-        self.root.after(0, lambda: self.gui.update_status_label(status_text))
+        self.renderer.post_status(status_text)
 
     def on_model_data_received(self, channel, data):
         """Modelからのデータ受信をGUIに表示"""
-        self.root.after(0, lambda: self.gui.display_earthquake_data(channel, data))
+        if channel == 'eew':
+            return # 緊急地震速報は on_model_eew_update で表示する
+        self.renderer.post_data(channel, data, self.model.current_trace())
+
+    def on_model_eew_update(self, update, data):
+        """緊急地震速報は第1報だけ全文を表示し、続報は変わった項目だけを1行で表示する"""
+        trace = self.model.current_trace()
+        if update.is_new:
+            self.renderer.post_data('eew', data, trace)
+        else:
+            self.renderer.post_log(format_eew_changes(update), "WARNING", trace, urgent=True)
+        self.post_eew_panel()
+
+    def post_eew_panel(self):
+        """追跡中の緊急地震速報の一覧をGUIへ反映"""
+        self.renderer.post_eew("\n".join(
+            format_eew_summary(record, state) for record, state in self.model.eew_tracker.events()))
+
+    def refresh_eew_panel(self):
+        """終了したイベントの状態と表示期間を現在時刻で反映する（GUIスレッドで定期的に呼ぶ）"""
+        self.model.eew_tracker.expire()
+        self.post_eew_panel()
+        self._eew_refresh_id = self.root.after(EEW_PANEL_REFRESH_MS, self.refresh_eew_panel)
 
     def on_model_stats_update(self, total_count, channel_counts):
         """Modelからの統計情報更新をGUIに表示"""
-        self.root.after(0, lambda: self.gui.update_stats_label(total_count, channel_counts))
+        snapshot = self.model.get_stats_snapshot()
+        self.renderer.post_stats(total_count, channel_counts, snapshot)
 
     def on_model_connection_established(self):
         """Modelからの接続確立通知"""
@@ -85,11 +239,64 @@ class EarthquakeApp:
 
     def on_closing(self):
         """ウィンドウを閉じる時の処理"""
-        if self.model.connected:
+        if self.model.connected or self.model.connection_active:
             self.model.stop_websocket_connection()
+        if self.replay:
+            self.replay.stop()
+        self.model.close()
+        if self.journal:
+            self.journal.close()
+        if self.store:
+            self.store.close()
+        if self.broker:
+            self.broker.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        self.root.after_cancel(self._eew_refresh_id)
+        self.renderer.stop()
+        self.gui.close()
         self.root.destroy()
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AXIS地震情報モニター")
+    parser.add_argument("--replay", help="記録済みメッセージ（ジャーナルのディレクトリまたはJSONL）を再生")
+    parser.add_argument("--speed", default="1", help="リプレイ速度 (例: 1, 10x, max)")
+    parser.add_argument("--server-list-url", default=DEFAULT_SERVER_LIST_URL,
+                        help="サーバーリストAPIのURL（試験サーバー利用時に指定）")
+    parser.add_argument("--max-fps", type=int, default=30, help="受信データの描画頻度の上限（回/秒）")
+    parser.add_argument("--max-log-lines", type=int, default=5000, help="ログ表示に保持する最大行数")
+    parser.add_argument("--redundant", action="store_true", help="2本の接続を同時に維持する冗長接続モード")
+    parser.add_argument("--stale-timeout", type=float, help="hb の応答もデータもない場合に切断とみなす秒数（既定: 90）")
+    parser.add_argument("--max-reconnect-delay", type=float, default=60.0, help="再接続の待ち時間の上限（秒）")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="受信データを保存するSQLiteデータベース")
+    parser.add_argument("--no-db", action="store_true", help="受信データをデータベースに保存しない")
+    parser.add_argument("--restore-hours", type=float, default=24.0,
+                        help="起動時にデータベースから読み込む受信データの時間（0で読み込まない）")
+    parser.add_argument("--retention-days", type=float, help="データベースに保存する日数（超えた分は削除。既定: 削除しない）")
+    parser.add_argument("--journal-dir", nargs="?", const=DEFAULT_JOURNAL_DIR,
+                        help="生メッセージをジャーナルに保存する（ディレクトリ省略時は journal/。既定: 保存しない）")
+    parser.add_argument("--journal-retention-days", type=float,
+                        help="ジャーナルを残す日数（超えたセグメントは削除。既定: 削除しない）")
+    parser.add_argument("--broker-port", type=int, help="受信メッセージをローカルへ再配信するポート（指定時のみ起動）")
+    parser.add_argument("--broker-host", default="127.0.0.1", help="再配信サーバーの待ち受けアドレス")
+    parser.add_argument("--profile", action="store_true", help="コールバックと処理段階の所要時間を計測（F9 でログへ出力）")
+    parser.add_argument("--profile-sample", type=int, default=1, help="N回に1回だけ所要時間を計る（回数は毎回数える）")
+    parser.add_argument("--metrics-port", type=int, help="Prometheus形式のメトリクスを公開するポート（指定時のみ起動）")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="メトリクスの待ち受けアドレス")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = EarthquakeApp(root)
+    app = EarthquakeApp(root, journal_dir=None if args.replay else args.journal_dir,
+                        server_list_url=args.server_list_url, max_fps=args.max_fps,
+                        max_log_lines=args.max_log_lines, redundant=args.redundant,
+                        stale_timeout=args.stale_timeout, max_reconnect_delay=args.max_reconnect_delay,
+                        db_path=None if args.replay or args.no_db else args.db, restore_hours=args.restore_hours,
+                        broker_port=args.broker_port, broker_host=args.broker_host,
+                        metrics_port=args.metrics_port, metrics_host=args.metrics_host,
+                        profile=args.profile, profile_sample=args.profile_sample, retention_days=args.retention_days,
+                        journal_retention_days=args.journal_retention_days)
+    if args.replay:
+        root.after(0, lambda: app.start_replay(args.replay, parse_speed(args.speed)))
     app.run()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from collections import deque
+
+
+def _to_json(value):
+    """JSONに変換できない値の変換（to_dict を持つレコードは辞書にする）"""
+    to_dict = getattr(value, 'to_dict', None)
+    return to_dict() if to_dict else str(value)
+
+
+class EarthquakeHistory:
+    """件数またはおおよそのバイト数で上限を設けた受信データ履歴"""
+
+    def __init__(self, max_entries=10000, max_bytes=None, spill_path=None, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path  # 指定時は押し出したエントリをJSONLで追記保存
+        self.on_evict = on_evict  # on_evict(押し出したエントリのリスト) 形式のコールバック（任意）
+        self._entries = deque()
+        self._sizes = deque()
+        self._lock = threading.Lock()
+        self._spill_file = None
+        self.total_bytes = 0
+        self.evicted_count = 0
+        self.spilled_bytes = 0  # 退避ファイルの書き込み済みバイト数
+
+    def append(self, entry, size=None):
+        """エントリを追加し、上限を超えた分を古い順に押し出す"""
+        if size is None:
+            size = self.estimate_size(entry)
+
+        with self._lock:
+            self._entries.append(entry)
+            self._sizes.append(size)
+            self.total_bytes += size
+            evicted = self._evict_locked()
+            # 複数のスレッドから追加されても押し出した順にファイルへ書くよう、ロックを持ったまま退避する
+            if evicted and self.spill_path:
+                self._spill(evicted)
+
+        if evicted and self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def _evict_locked(self):
+        evicted = []
+        while self._entries and self._over_limit():
+            evicted.append(self._entries.popleft())
+            self.total_bytes -= self._sizes.popleft()
+        self.evicted_count += len(evicted)
+        return evicted
+
+    def _over_limit(self):
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _spill(self, entries):
+        """押し出したエントリをディスクへ退避（ロックを持って呼ぶ）"""
+        try:
+            if self._spill_file is None:
+                directory = os.path.dirname(self.spill_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+            self._spill_file.write("".join(
+                json.dumps(entry, ensure_ascii=False, default=_to_json) + "\n" for entry in entries
+            ))
+            self._spill_file.flush()
+            self.spilled_bytes = os.fstat(self._spill_file.fileno()).st_size
+        except OSError:
+            # 退避に失敗しても受信処理は止めない
+            pass
+
+    @staticmethod
+    def estimate_size(entry):
+        """エントリのおおよそのバイト数を見積もる"""
+        return len(json.dumps(entry, ensure_ascii=False, default=_to_json).encode('utf-8'))
+
+    def snapshot(self):
+        """現在の履歴のコピーをリストで返す"""
+        with self._lock:
+            return list(self._entries)
+
+    def latest(self, count=1):
+        """最新のエントリを受信順で最大count件返す"""
+        with self._lock:
+            if count >= len(self._entries):
+                return list(self._entries)
+            return [self._entries[i] for i in range(len(self._entries) - count, len(self._entries))]
+
+    def load_spilled(self):
+        """ディスクへ退避したエントリを読み出す"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return []
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.flush()
+        with open(self.spill_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def iter_reversed(self):
+        """呼び出し時点の履歴を新しい順に返す（メモリ上の分の後にディスクへ退避した分）
+
+        退避した分はファイルの末尾から必要な分だけ読むので、全体を読み込まずに古い方へたどれる。
+        """
+        with self._lock:
+            entries = list(self._entries)
+            spilled_bytes = self.spilled_bytes
+        yield from reversed(entries)
+        if spilled_bytes:
+            yield from self._iter_spilled_reversed(spilled_bytes)
+
+    def _iter_spilled_reversed(self, end, block_size=64 * 1024):
+        """退避ファイルの end バイト目までの行を末尾から順に読む"""
+        with open(self.spill_path, 'rb') as f:
+            position = end
+            tail = b""
+            while position > 0:
+                size = min(block_size, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + tail).split(b"\n")
+                tail = lines.pop(0)  # 行の途中から読んだ可能性があるため次のブロックとつなげる
+                for line in reversed(lines):
+                    if line.strip():
+                        yield json.loads(line)
+            if tail.strip():
+                yield json.loads(tail)
+
+    def clear(self):
+        """履歴をクリア"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def close(self):
+        """退避ファイルを閉じる"""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._entries[index]
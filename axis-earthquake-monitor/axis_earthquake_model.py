@@ -1,58 +1,84 @@
 import websocket
-import requests
 import json
 import threading
 import time
-from datetime import datetime
+
+from axis_connection_manager import ConnectionManager, StallWatchdog
+from axis_connection_supervisor import ConnectionSupervisor
+from axis_earthquake_history import EarthquakeHistory
+from axis_earthquake_stats import EarthquakeStats
+from axis_eew_tracker import EEWTracker
+from axis_event_index import EventIndex
+from axis_event_records import EEWRecord, make_record
+from axis_latency import LatencyTracker, reference_time
+from axis_message_decoder import decode
+from axis_message_dispatcher import PriorityDispatcher
+from axis_redundant_connection import RedundantConnection
+from axis_server_list_cache import ServerListCache
+
+DEFAULT_SERVER_LIST_URL = "https://axis.prioris.jp/api/server/list/"
+# enable_profiling() で計測する処理段階（受信・ワーカーでの処理・データログへの追加）
+PROFILED_STAGES = ('on_websocket_message', '_process_message', '_add_record')
 
 class EarthquakeModel:
-    def __init__(self, callbacks=None):
+    def __init__(self, callbacks=None, history=None, journal=None, server_list_url=DEFAULT_SERVER_LIST_URL,
+                 connection_manager=None, redundant=False, supervisor=None, server_list_cache=None,
+                 dispatch=True, keep_raw=False, store=None):
         self.callbacks = callbacks if callbacks else {}
         self.connected = False
         self.ws = None
-        self.data_log = []
+        self.data_log = history if history is not None else EarthquakeHistory()
+        self.stats = EarthquakeStats()
+        self.eew_tracker = EEWTracker() # 緊急地震速報を EventID ごとに最新の報へまとめる
+        self.event_index = EventIndex() # 地震ごとの検索用索引（データログから押し出したレコードは外す）
+        self.data_log.on_evict = self._on_records_evicted
+        self.latency = LatencyTracker() # 受信から表示までの段階ごとの遅延
+        self.decode_error_count = 0 # JSONとして解析できなかったメッセージの数
+        self._current = threading.local() # 通知中のメッセージの LatencyTrace（コールバックから参照する）
+        self.journal = journal # 生メッセージを保存するMessageJournal（任意）
+        self.store = store # 受信メッセージを保存するEventStore（任意）
+        self.keep_raw = keep_raw # True の場合はデータログのレコードに生メッセージも保持する
         self.server_url = None
+        self.server_list_url = server_list_url # 試験サーバー利用時に差し替え可能
+        # 接続時は保存済みのサーバーリストを使い、APIの取得は裏で行う
+        self.server_list_cache = server_list_cache if server_list_cache else ServerListCache(
+            server_list_url, log=self._notify_log_message)
         self.token = None # トークンはModelで保持する
+        self.connection_manager = connection_manager if connection_manager else ConnectionManager()
+        self.supervisor = supervisor if supervisor else ConnectionSupervisor() # 生存監視と自動再接続
+        self.connection_active = False # 接続処理（フェイルオーバー含む）が動作中か
+        self._stop_requested = False
+        self._opened = False
+        self._watchdog = None
+        self.redundant = redundant # True の場合は2本の接続を同時に維持する
+        self.redundant_connection = None
+        # 受信スレッドからの処理はチャンネルの優先度順にワーカースレッドで行う（False の場合は受信スレッドで処理）
+        self.dispatcher = None
+        if dispatch:
+            self.dispatcher = PriorityDispatcher(
+                self._process_message,
+                on_error=lambda e: self._notify_log_message(f"データ処理エラー: {e}", "ERROR")).start()
+        self.profiler = None # enable_profiling() で設定した CallbackProfiler
+        self._unprofiled_callbacks = None
 
     def set_token(self, token):
         self.token = token
+        # 期限切れのサーバーリストを接続前に更新しておく
+        if token and not self.server_list_cache.is_fresh():
+            self.server_list_cache.refresh_async(token)
 
     def get_server_list(self):
         """AXISサーバーリストを取得"""
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
-        possible_urls = [
-            "https://axis.prioris.jp/api/server/list/"
-        ]
-
-        for api_url in possible_urls:
-            try:
-                self._notify_log_message(f"サーバーリスト取得試行: {api_url}", "INFO")
-                response = requests.get(api_url, headers=headers, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    servers = data.get('servers', [])
-                    if servers:
-                        self._notify_log_message(f"サーバーリスト取得成功: {len(servers)}個のサーバー", "SUCCESS")
-                        return servers
-                else:
-                    self._notify_log_message(f"エラー {response.status_code}: {response.text}", "ERROR")
-
-            except requests.exceptions.RequestException as e:
-                self._notify_log_message(f"接続エラー: {e}", "ERROR")
-            except Exception as e:
-                self._notify_log_message(f"その他のエラー: {e}", "ERROR")
+        servers = self.server_list_cache.get(self.token)
+        if servers:
+            return servers
 
         self._notify_log_message("サーバーリストAPIが利用できません。推測サーバーを使用します。", "WARNING")
         return ["wss://axis.prioris.jp/socket"]
 
     def toggle_connection(self):
         """接続の開始/停止を切り替え"""
-        if not self.connected:
+        if not self.connected and not self.connection_active:
             self.start_websocket_connection()
         else:
             self.stop_websocket_connection()
@@ -65,6 +91,9 @@ class EarthquakeModel:
 
         self._notify_log_message("接続を開始しています...", "INFO")
         self._notify_status_update("接続中...") # GUIに接続中であることを通知
+        self.connection_active = True
+        self._stop_requested = False
+        self.supervisor.start()
 
         # 別スレッドで接続処理を実行
         threading.Thread(target=self._connect_websocket, daemon=True).start()
@@ -72,37 +101,122 @@ class EarthquakeModel:
     def _connect_websocket(self):
         """WebSocket接続処理（別スレッド）"""
         try:
-            servers = self.get_server_list()
-            if not servers:
+            ranked = self._rank_servers()
+            if not ranked:
                 self._notify_log_message("利用可能なサーバーが見つかりません", "ERROR")
                 self._reset_connection_state()
                 return
 
-            self.server_url = servers[0] + "/socket"
-            self._notify_log_message(f"接続先サーバー: {self.server_url}", "INFO")
-
             websocket.enableTrace(False)  # デバッグログを無効化
-            headers = [f"Authorization: Bearer {self.token}"]
+            websocket.setdefaulttimeout(self.connection_manager.connect_timeout)
 
-            self.ws = websocket.WebSocketApp(
-                self.server_url,
-                header=headers,
-                on_message=self.on_websocket_message,
-                on_error=self.on_websocket_error,
-                on_close=self.on_websocket_close,
-                on_open=self.on_websocket_open
-            )
+            if self.redundant:
+                self._run_redundant(ranked)
+                return
 
-            # 接続開始
-            self.ws.run_forever(ping_interval=60, ping_timeout=10)
+            # 切断・停滞時はバックオフしながら次に速いサーバーへ再接続する
+            server = ranked[0]
+            while not self._stop_requested:
+                opened = self._run_websocket(server + "/socket")
+                if self._stop_requested:
+                    break
+
+                delay = self.supervisor.record_disconnected(opened)
+                if delay is None:
+                    self._notify_log_message("再接続の試行回数が上限に達しました", "ERROR")
+                    self._reset_connection_state()
+                    return
+
+                # 全候補に連続で接続できなかった場合はサーバーリストを裏で更新し、計測し直す
+                failures = self.supervisor.consecutive_failures
+                if failures and failures % len(ranked) == 0:
+                    self.server_list_cache.refresh_async(self.token)
+                    ranked = self._rank_servers() or ranked
+                    server = ranked[0]
+                else:
+                    server = self.connection_manager.next_server(server)
+
+                self._notify_log_message(
+                    f"🔁 {delay:.1f}秒後に {server} へ再接続します (連続失敗 {failures}回)", "WARNING")
+                if self.supervisor.wait(delay):
+                    break
 
         except Exception as e:
             self._notify_log_message(f"接続エラー: {e}", "ERROR")
             self._reset_connection_state()
 
+    def _rank_servers(self):
+        """サーバーリストを取得し、全サーバーの応答速度を計測して速い順に返す"""
+        servers = self.get_server_list()
+        if not servers:
+            return []
+
+        ranked = self.connection_manager.rank(servers, self.token)
+        for result in self.connection_manager.results:
+            if result.error is None:
+                self._notify_log_message(
+                    f"サーバー計測: {result.server} (ハンドシェイク {result.handshake_ms:.0f}ms, "
+                    f"初回受信 {result.first_message_ms:.0f}ms)", "INFO")
+            else:
+                self._notify_log_message(f"サーバー計測失敗: {result.server} ({result.error})", "WARNING")
+        return ranked
+
+    def _run_redundant(self, servers):
+        """ホットスタンバイの2接続で受信し、重複を除いて先着したフレームを処理する"""
+        self._notify_log_message("冗長接続モードで接続します", "INFO")
+        self.redundant_connection = RedundantConnection(self, servers, supervisor=self.supervisor)
+        self.redundant_connection.run()
+
+        report = self.redundant_connection.report()
+        self._notify_log_message(
+            f"冗長接続の結果: {report['unique_count']}件受信 / 重複 {report['duplicate_count']}件", "INFO")
+        for path, result in sorted(report['paths'].items()):
+            self._notify_log_message(
+                f"  経路{path}: 先着 {result['wins']}件 (平均 {result['mean_lead_ms']:.1f}ms / "
+                f"最大 {result['max_lead_ms']:.1f}ms 先行)", "INFO")
+        self.redundant_connection = None
+
+    def get_redundancy_report(self):
+        """冗長接続の経路ごとの先着状況を返す（冗長接続中でなければ None）"""
+        if self.redundant_connection:
+            return self.redundant_connection.report()
+        return None
+
+    def _run_websocket(self, url):
+        """1つのサーバーに接続し、切断されるまで受信する（接続できたかを返す）"""
+        self.server_url = url
+        self._notify_log_message(f"接続先サーバー: {self.server_url}", "INFO")
+        headers = [f"Authorization: Bearer {self.token}"]
+
+        ws = websocket.WebSocketApp(
+            self.server_url,
+            header=headers,
+            on_message=self.on_websocket_message,
+            on_error=self.on_websocket_error,
+            on_close=self.on_websocket_close,
+            on_open=self.on_websocket_open,
+            on_pong=self.on_websocket_pong
+        )
+        self.ws = ws
+        self._opened = False
+
+        def on_stall(idle):
+            self.supervisor.record_stale()
+            self._notify_log_message(f"⏱️ {idle:.0f}秒間 hb の応答もデータもないため接続を切断します", "WARNING")
+            ws.close()
+
+        self._watchdog = StallWatchdog(self.supervisor.stale_timeout, on_stall).start()
+        try:
+            # 接続開始
+            ws.run_forever(ping_interval=60, ping_timeout=10)
+        finally:
+            self._watchdog.stop()
+        return self._opened
+
     def _reset_connection_state(self):
         """接続状態をリセット"""
         self.connected = False
+        self.connection_active = False
         self._notify_status_update("🔴 未接続")
         self._notify_connection_reset() # Controllerに接続リセットを通知
 
@@ -110,6 +224,11 @@ class EarthquakeModel:
         """接続停止"""
         self._notify_log_message("接続を停止しています...", "WARNING")
         self.connected = False
+        self._stop_requested = True
+        self.supervisor.cancel()
+
+        if self.redundant_connection:
+            self.redundant_connection.stop()
 
         if self.ws:
             self.ws.close()
@@ -119,35 +238,177 @@ class EarthquakeModel:
 
     def on_websocket_message(self, ws, message):
         """WebSocketメッセージ受信"""
+        received_perf = time.perf_counter()
+        received_at = time.time()
+        if self._watchdog:
+            self._watchdog.touch()
         if message == "hello":
             self._notify_log_message("サーバーに接続されました", "SUCCESS")
             return
 
         if message == "hb":
-            # ハートビートは表示しない
+            # ハートビートは表示しない（応答までの往復時間だけ記録する）
+            self.supervisor.record_heartbeat_received()
             return
 
         try:
-            data = json.loads(message)
-            channel = data.get('channel', '不明')
-            content = data.get('message', data) # messageキーがない場合はdata全体を使用
-
-            # データログに追加
-            self.data_log.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'channel': channel,
-                'data': content
-            })
-
-            # Controllerにデータ受信を通知
-            self._notify_data_received(channel, content)
-            self._notify_stats_update() # 統計情報更新を通知
+            # チャンネルと主要項目だけを先読みし、本文の解析は利用者が必要とするまで遅らせる
+            decoded = decode(message)
+            if decoded.channel is None:
+                decoded.data # 先読みできない形式はその場で解析する
+            channel = decoded.channel or '不明'
+            trace = self.latency.begin(received_at, received_perf)
+            trace.channel = channel
+            trace.decoded = time.perf_counter()
+
+            # 生メッセージをジャーナルに保存（書き込みは別スレッドで行われる）
+            if self.journal is not None:
+                self.journal.append(channel, message, received_at)
+            if self.store is not None:
+                self.store.append(channel, decoded.event_id, message, received_at)
+
+            # 以降の処理（保存・通知・描画）は受信スレッドを止めないようワーカーに任せる
+            self._dispatch(channel, (channel, decoded, received_at, trace))
 
         except json.JSONDecodeError:
+            self.decode_error_count += 1
+            if self.journal is not None:
+                self.journal.append('', message, received_at)
             self._notify_log_message(f"JSONパースエラー: {message}", "ERROR")
         except Exception as e:
             self._notify_log_message(f"データ処理エラー: {e}", "ERROR")
 
+    def _dispatch(self, channel, item):
+        """解析済みのメッセージをワーカーへ渡す（ワーカーがない場合はその場で処理）"""
+        if self.dispatcher is not None:
+            self.dispatcher.submit(channel, item)
+        else:
+            self._process_message(item)
+
+    def _process_message(self, item):
+        """受信メッセージをデータログと統計情報に追加し、Controllerへ通知する"""
+        channel, decoded, received_at, trace = item
+        trace.dispatched = time.perf_counter()
+        self._current.trace = trace
+        try:
+            # 大きなフレームは受信スレッドでは先読みしかしていないため、記録・通知の前に全体を解析して確かめる
+            decoded.data
+
+            # データログ（主要項目だけを持つ小さなレコード）と統計情報に追加
+            self.stats.record(channel)
+            added = self._add_record(decoded, received_at)
+            if added is not None:
+                trace.origin_time = reference_time(added[0])
+
+            # Controllerにデータ受信を通知（出力先・再配信には、追跡で無視した古い緊急地震速報も含めて全て渡す）
+            self._notify_message_received(channel, decoded, received_at)
+            if added is None:
+                self._notify_stats_update()
+                return
+            update = added[1]
+            if update is not None:
+                self._notify_eew_update(update, decoded.content)
+            if 'data_received' in self.callbacks:
+                self._notify_data_received(channel, decoded.content)
+            self._notify_stats_update() # 統計情報更新を通知
+
+        except json.JSONDecodeError:
+            self.decode_error_count += 1
+            self._notify_log_message(f"JSONパースエラー: {decoded.raw[:200]}", "ERROR")
+        except Exception as e:
+            self._notify_log_message(f"データ処理エラー: {e}", "ERROR")
+        finally:
+            self._current.trace = None
+            # 描画待ちに入った場合は画面へ反映した時点で集計する
+            if not trace.held:
+                trace.finish()
+
+    def current_trace(self):
+        """コールバックの中から呼ぶと、通知中のメッセージの LatencyTrace を返す（それ以外は None）"""
+        return getattr(self._current, 'trace', None)
+
+    def _add_record(self, decoded, received_at):
+        """レコードをデータログ・緊急地震速報の追跡・地震の索引に追加し、(レコード, EEWUpdate) を返す（古い報なら None）"""
+        record = make_record(decoded, received_at, self.keep_raw)
+
+        # 緊急地震速報の続報はデータログ上の同じレコードを書き換える（古い報は無視）
+        update = None
+        if isinstance(record, EEWRecord):
+            update = self.eew_tracker.update(record)
+            if update is None:
+                return None
+        if update is None or update.is_new:
+            self.data_log.append(record, size=record.memory_size())
+            self.event_index.add(record)
+        else:
+            # データログから押し出されたレコードは索引に戻さない
+            self.event_index.refresh(update.record)
+        return record, update
+
+    def _on_records_evicted(self, records):
+        """データログから押し出されたレコードを地震の索引から外す"""
+        for record in records:
+            self.event_index.discard(record)
+
+    def restore_history(self, messages):
+        """保存済みのメッセージ（受信順）からデータログと地震の索引を復元し、復元した件数を返す（通知はしない）"""
+        restored = 0
+        for message in messages:
+            try:
+                decoded = decode(message.raw)
+                decoded.data # 壊れたメッセージはここで例外になる
+                if self._add_record(decoded, message.received_at) is not None:
+                    restored += 1
+            except Exception:
+                continue # 壊れたメッセージは読み飛ばす
+        # 復元した緊急地震速報は受信時刻で終了を判定し、現在時刻で表示期間を過ぎたものは外す
+        self.eew_tracker.expire()
+        return restored
+
+    def query_events(self, **filters):
+        """受信した地震を条件で検索（条件は EventIndex.query と同じ）"""
+        return self.event_index.query(**filters)
+
+    def enable_profiling(self, profiler):
+        """コールバックと各処理段階を profiler で包んで計測する
+
+        無効の間は元の関数をそのまま呼ぶため負担はない。受信段階は次の接続から計測される。
+        有効の間に callbacks 辞書へ追加したコールバックは計測されない。
+        """
+        if self.profiler is not None:
+            self.disable_profiling()
+        self.profiler = profiler
+        self._unprofiled_callbacks = self.callbacks
+        self.callbacks = profiler.wrap_callbacks(self.callbacks)
+        for name in PROFILED_STAGES:
+            # インスタンス属性で上書きする（disable_profiling() で取り除けばクラスのメソッドに戻る）
+            setattr(self, name, profiler.wrap(f"stage.{name.lstrip('_')}", getattr(self, name)))
+        if self.dispatcher is not None:
+            self.dispatcher.handler = self._process_message
+
+    def disable_profiling(self):
+        """計測をやめて元のコールバックと処理段階に戻す"""
+        if self.profiler is None:
+            return
+        self.callbacks = self._unprofiled_callbacks
+        self._unprofiled_callbacks = None
+        for name in PROFILED_STAGES:
+            self.__dict__.pop(name, None)
+        if self.dispatcher is not None:
+            self.dispatcher.handler = self._process_message
+        self.profiler = None
+
+    def flush(self, timeout=None):
+        """処理待ちのメッセージがなくなるまで待つ（完了したら True）"""
+        if self.dispatcher is None:
+            return True
+        return self.dispatcher.flush(timeout)
+
+    def close(self):
+        """ワーカースレッドを停止"""
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
     def on_websocket_error(self, ws, error):
         """WebSocketエラー"""
         self._notify_log_message(f"❌ WebSocketエラー: {error}", "ERROR")
@@ -158,12 +419,25 @@ class EarthquakeModel:
         self._notify_log_message(f"🔌 サーバーとの接続が終了しました (コード: {close_status_code})", "WARNING")
         if close_msg:
             self._notify_log_message(f"理由: {close_msg}", "WARNING")
-        self._reset_connection_state()
+        if self._stop_requested:
+            self._reset_connection_state()
+        else:
+            self._notify_status_update("🟡 再接続中") # バックオフ後に再接続する
+
+    def on_websocket_pong(self, ws, data):
+        """WebSocket pong受信（停滞検知のため受信として扱う）"""
+        if self._watchdog:
+            self._watchdog.touch()
 
     def on_websocket_open(self, ws):
         """WebSocket接続開始"""
         self.connected = True
+        self._opened = True
+        recovery = self.supervisor.record_connected()
         self._notify_log_message("🌐 AXISサーバーに正常に接続しました！", "SUCCESS")
+        if recovery is not None:
+            self._notify_log_message(
+                f"🔁 再接続しました (切断から {recovery:.1f}秒, 累計 {self.supervisor.reconnect_count}回)", "SUCCESS")
         self._notify_status_update("🟢 接続中")
         self._notify_connection_established() # Controllerに接続確立を通知
         self._notify_log_message("📡 地震情報の受信を開始します...", "INFO")
@@ -171,20 +445,35 @@ class EarthquakeModel:
         self._notify_log_message("⚠️  終了するにはウィンドウを閉じるか「接続停止」ボタンを押してください", "INFO")
 
         # ハートビート開始
+        self._start_heartbeat(ws)
+
+    def _start_heartbeat(self, ws):
+        """ハートビート送信を開始（別スレッド）"""
         def heartbeat():
-            while self.connected:
+            while self.connected and self.ws is ws:
                 try:
                     if ws.sock and ws.sock.connected:
                         ws.send('hb')
-                    time.sleep(30)
+                        self.supervisor.record_heartbeat_sent()
+                    time.sleep(self.supervisor.heartbeat_interval)
                 except:
                     break
 
         threading.Thread(target=heartbeat, daemon=True).start()
 
     def get_data_log(self):
-        """現在のデータログを返す"""
-        return self.data_log
+        """現在のデータログ（EventRecord のリスト）のスナップショットを返す"""
+        return self.data_log.snapshot()
+
+    def get_stats_snapshot(self):
+        """統計情報のスナップショットを返す（'latency' に受信から表示までの遅延の概要を含む）"""
+        snapshot = self.stats.snapshot()
+        snapshot['latency'] = self.latency.summary()
+        return snapshot
+
+    def get_reconnect_stats(self):
+        """再接続の計測値（回数・復旧時間など）を返す"""
+        return self.supervisor.snapshot()
 
     # --- 通知メソッド (Controllerへのコールバック呼び出し) ---
     def _notify_log_message(self, message, level):
@@ -195,17 +484,21 @@ class EarthquakeModel:
         if 'status_update' in self.callbacks:
             self.callbacks['status_update'](status_text)
 
+    def _notify_message_received(self, channel, decoded, received_at):
+        if 'message_received' in self.callbacks:
+            self.callbacks['message_received'](channel, decoded, received_at)
+
+    def _notify_eew_update(self, update, data):
+        if 'eew_update' in self.callbacks:
+            self.callbacks['eew_update'](update, data)
+
     def _notify_data_received(self, channel, data):
         if 'data_received' in self.callbacks:
             self.callbacks['data_received'](channel, data)
 
     def _notify_stats_update(self):
         if 'stats_update' in self.callbacks:
-            total_count = len(self.data_log)
-            channel_counts = {}
-            for entry in self.data_log:
-                channel = entry['channel']
-                channel_counts[channel] = channel_counts.get(channel, 0) + 1
+            total_count, channel_counts = self.stats.counts()
             self.callbacks['stats_update'](total_count, channel_counts)
 
     def _notify_connection_established(self):
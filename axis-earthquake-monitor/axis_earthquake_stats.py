@@ -0,0 +1,126 @@
+import threading
+import time
+
+
+class RollingCounter:
+    """一定時間窓のメッセージ数を固定数のバケットで集計するカウンター"""
+
+    def __init__(self, window_seconds, bucket_count=60):
+        self.window_seconds = window_seconds
+        self.bucket_count = bucket_count
+        self.bucket_seconds = window_seconds / bucket_count
+        self._buckets = [0] * bucket_count
+        self._current = None  # 現在のバケット番号（経過時間 / バケット幅）
+        self._total = 0
+
+    def _advance(self, now):
+        """現在時刻までバケットを進め、窓から外れた件数を差し引く"""
+        bucket = int(now // self.bucket_seconds)
+        if self._current is None:
+            self._current = bucket
+            return
+        if bucket <= self._current:
+            return  # 時刻が戻った場合は現在のバケットに加算する
+
+        # 経過したバケットだけをクリア（窓全体を超えた場合は全クリア）
+        steps = min(bucket - self._current, self.bucket_count)
+        for i in range(1, steps + 1):
+            index = (self._current + i) % self.bucket_count
+            self._total -= self._buckets[index]
+            self._buckets[index] = 0
+        self._current = bucket
+
+    def add(self, now, count=1):
+        """件数を加算"""
+        self._advance(now)
+        self._buckets[self._current % self.bucket_count] += count
+        self._total += count
+
+    def count(self, now):
+        """現在の窓内の件数を返す"""
+        self._advance(now)
+        return self._total
+
+    def rate_per_minute(self, now):
+        """窓内の件数を1分あたりの件数に換算して返す"""
+        return self.count(now) * 60.0 / self.window_seconds
+
+
+class EarthquakeStats:
+    """受信メッセージの統計情報を1件あたりO(1)で更新する"""
+
+    # 集計する時間窓（表示名: 秒数）
+    WINDOWS = (("1m", 60), ("10m", 600), ("1h", 3600))
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.total_count = 0
+        self.channel_counts = {}
+        self.last_seen = {}
+        self.last_received = None
+        self._rates = self._new_counters()
+        self._channel_rates = {}
+
+    def _new_counters(self):
+        return {name: RollingCounter(seconds) for name, seconds in self.WINDOWS}
+
+    def record(self, channel, now=None):
+        """メッセージ1件を記録"""
+        if now is None:
+            now = self.clock()
+
+        with self._lock:
+            self.total_count += 1
+            self.channel_counts[channel] = self.channel_counts.get(channel, 0) + 1
+            self.last_seen[channel] = now
+            self.last_received = now
+
+            for counter in self._rates.values():
+                counter.add(now)
+
+            channel_rates = self._channel_rates.get(channel)
+            if channel_rates is None:
+                channel_rates = self._channel_rates[channel] = self._new_counters()
+            for counter in channel_rates.values():
+                counter.add(now)
+
+    def counts(self):
+        """総件数とチャンネル別件数を返す"""
+        with self._lock:
+            return self.total_count, dict(self.channel_counts)
+
+    def snapshot(self, now=None):
+        """統計情報のスナップショットを辞書で返す"""
+        if now is None:
+            now = self.clock()
+
+        with self._lock:
+            return {
+                'total_count': self.total_count,
+                'channel_counts': dict(self.channel_counts),
+                'last_received': self.last_received,
+                'last_seen': dict(self.last_seen),
+                'counts': {name: counter.count(now) for name, counter in self._rates.items()},
+                'rates_per_minute': {name: counter.rate_per_minute(now) for name, counter in self._rates.items()},
+                'channel_rates_per_minute': {
+                    channel: {name: counter.rate_per_minute(now) for name, counter in counters.items()}
+                    for channel, counters in self._channel_rates.items()
+                },
+            }
+
+    def reset(self):
+        """統計情報をリセット"""
+        with self._lock:
+            self.total_count = 0
+            self.channel_counts = {}
+            self.last_seen = {}
+            self.last_received = None
+            self._rates = self._new_counters()
+            self._channel_rates = {}
+
+
+def format_rates(snapshot):
+    """スナップショットの時間窓別件数を表示用文字列に整形"""
+    counts = snapshot['counts']
+    return " / ".join(f"{name}: {counts[name]}件" for name, _ in EarthquakeStats.WINDOWS)
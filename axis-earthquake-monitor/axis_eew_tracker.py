@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+STATE_ACTIVE = "継続"
+STATE_FINAL = "最終報"
+STATE_CANCELLED = "取消"
+STATE_EXPIRED = "終了"  # 最終報も取消もないまま続報が途絶えた
+
+# 報ごとの差分を取る項目
+TRACKED_FIELDS = ('magnitude', 'depth', 'max_intensity', 'hypocenter', 'origin_time')
+
+# record は EventID ごとに1つだけの「最新の報」レコード（続報が来ると中身が書き換わる）
+# changes は {項目名: (前の値, 新しい値)}（状態の変化は 'state'）
+EEWUpdate = namedtuple('EEWUpdate', ['event_id', 'serial', 'state', 'record', 'changes', 'is_new'])
+
+
+def eew_state(record):
+    """レコードの状態（継続・最終報・取消）"""
+    if record.is_cancel:
+        return STATE_CANCELLED
+    if record.is_final:
+        return STATE_FINAL
+    return STATE_ACTIVE
+
+
+class EEWTracker:
+    """緊急地震速報を EventID ごとに1件のレコードへまとめ、続報の差分を求める
+
+    古い報番号・同じ報番号の続報は無視する。
+    最終報・取消がないまま inactive_seconds の間続報がないイベントは終了したものとして扱う。
+    終了したイベントは retain_seconds 経過後に一覧から外す。
+    """
+
+    def __init__(self, max_events=100, retain_seconds=600.0, inactive_seconds=180.0):
+        self.max_events = max_events
+        self.retain_seconds = retain_seconds
+        self.inactive_seconds = inactive_seconds
+        self.ignored_count = 0  # 無視した古い報の件数
+        self._events = OrderedDict()  # EventID -> 最新の報レコード（更新順）
+        self._lock = threading.Lock()
+
+    def update(self, record):
+        """EEWRecord を取り込み、EEWUpdate を返す（古い報なら None）"""
+        event_id = record.event_id
+        if event_id is None:
+            # EventID のない報はまとめられないため毎回新しいイベントとして扱う
+            return EEWUpdate(None, record.serial, eew_state(record), record, {}, True)
+
+        with self._lock:
+            live = self._events.get(event_id)
+            if live is None:
+                self._events[event_id] = record
+                self._expire_locked(record.received_at)
+                return EEWUpdate(event_id, record.serial, eew_state(record), record, {}, True)
+
+            if record.serial is not None and live.serial is not None and record.serial <= live.serial:
+                self.ignored_count += 1
+                return None
+
+            changes = {}
+            for field in TRACKED_FIELDS:
+                old, new = getattr(live, field), getattr(record, field)
+                if old != new:
+                    changes[field] = (old, new)
+            old_state = eew_state(live)
+
+            # 最新の報の内容でレコードを書き換える（データログ上の同じレコードも最新になる）
+            for field in record.FIELDS:
+                setattr(live, field, getattr(record, field))
+            live.received_at = record.received_at
+            live.raw = record.raw
+
+            state = eew_state(live)
+            if state != old_state:
+                changes['state'] = (old_state, state)
+            self._events.move_to_end(event_id)
+            self._expire_locked(record.received_at)
+            return EEWUpdate(event_id, live.serial, state, live, changes, False)
+
+    def state(self, record, now=None):
+        """レコードの状態（続報が途絶えた継続中のイベントは終了）"""
+        state = eew_state(record)
+        if state == STATE_ACTIVE:
+            now = now if now is not None else time.time()
+            if now - record.received_at > self.inactive_seconds:
+                return STATE_EXPIRED
+        return state
+
+    def _ended_at(self, record):
+        """イベントが終了した時刻（継続中なら None）"""
+        if eew_state(record) != STATE_ACTIVE:
+            return record.received_at
+        return record.received_at + self.inactive_seconds
+
+    def _expire_locked(self, now):
+        """終了から retain_seconds 経過したイベントと、上限を超えた古いイベントを外す"""
+        for event_id, record in list(self._events.items()):
+            if now - self._ended_at(record) > self.retain_seconds:
+                del self._events[event_id]
+        while len(self._events) > self.max_events:
+            self._events.popitem(last=False)
+
+    def expire(self, now=None):
+        """現在時刻で終了から retain_seconds 経過したイベントを外す"""
+        with self._lock:
+            self._expire_locked(now if now is not None else time.time())
+
+    def get(self, event_id):
+        """EventID の最新の報レコード（なければ None）"""
+        with self._lock:
+            return self._events.get(event_id)
+
+    def events(self, now=None):
+        """追跡中のイベントを (レコード, 状態) のリストで新しい順に返す（状態は now 時点）"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            return [(record, self.state(record, now)) for record in reversed(self._events.values())]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
@@ -0,0 +1,324 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+# 震度の並び順（範囲指定の比較に使う）
+INTENSITY_ORDER = ('0', '1', '2', '3', '4', '5弱', '5強', '6弱', '6強', '7')
+INTENSITY_RANK = {intensity: rank for rank, intensity in enumerate(INTENSITY_ORDER)}
+LAST_EVENT_ID = '\U0010ffff'  # どの EventID よりも大きい文字列（発生時刻の上限の二分探索用）
+
+DAY_SECONDS = 86400
+# 期間指定の検索で「値 x 日」の集合を個別に引く上限（超える場合は期間で絞らない）
+MAX_DAY_LOOKUPS = 4096
+# 起点の索引と件数の差がこの倍率以内の索引は、集合の積で候補を絞る
+INTERSECT_RATIO = 8
+
+
+def magnitude_bucket(magnitude):
+    """マグニチュードを0.1刻みのバケット番号にする"""
+    return int(round(magnitude * 10))
+
+
+def day_of(origin_time):
+    """発生時刻の日番号（発生時刻がなければ None）"""
+    return int(origin_time // DAY_SECONDS) if origin_time is not None else None
+
+
+class CategoryIndex:
+    """値ごとの EventID の集合と、それを発生日ごとに分けた集合（値 -> {日番号 -> 集合}）"""
+
+    def __init__(self):
+        self._sets = {}  # 値 -> 集合
+        self._days = {}  # 値 -> {日番号 -> 集合}
+
+    def add(self, value, day, event_id):
+        ids = self._sets.get(value)
+        if ids is None:
+            ids = self._sets[value] = set()
+            self._days[value] = {}
+        ids.add(event_id)
+        days = self._days[value]
+        day_ids = days.get(day)
+        if day_ids is None:
+            day_ids = days[day] = set()
+        day_ids.add(event_id)
+
+    def discard(self, value, day, event_id):
+        ids = self._sets.get(value)
+        if ids is None or event_id not in ids:
+            return
+        ids.remove(event_id)
+        days = self._days[value]
+        day_ids = days.get(day)
+        if day_ids is not None:
+            day_ids.discard(event_id)
+            if not day_ids:
+                del days[day]
+        if not ids:
+            del self._sets[value]
+            del self._days[value]
+
+    def values(self):
+        return list(self._sets)
+
+    def count(self, values):
+        """値のいずれかに当てはまる件数"""
+        return sum(len(self._sets[value]) for value in values if value in self._sets)
+
+    def sets(self, values):
+        """値のいずれかに当てはまる集合のリスト"""
+        return [self._sets[value] for value in values if value in self._sets]
+
+    def sets_between(self, values, day_low, day_high):
+        """値のいずれかに当てはまり、発生日が範囲内の集合のリスト（引く回数が多すぎる場合は None）"""
+        if len(values) * (day_high - day_low + 1) > MAX_DAY_LOOKUPS:
+            return None
+        sets = []
+        for value in values:
+            days = self._days.get(value)
+            if days is None:
+                continue
+            for day in range(day_low, day_high + 1):
+                ids = days.get(day)
+                if ids:
+                    sets.append(ids)
+        return sets
+
+    def clear(self):
+        self._sets.clear()
+        self._days.clear()
+
+
+class EventIndex:
+    """受信した地震（EventID ごとに最新のレコード1件）を項目別に索引し、条件で検索する
+
+    EventID・発生時刻・マグニチュード・最大震度・震源名ごとの索引をメッセージ受信のたびに更新する。
+    マグニチュード・最大震度・震源名の索引は発生日ごとに分かれており、期間指定と組み合わせると候補が少なくなる。
+    検索では最も絞り込める索引から候補を取り出し、残りの条件はレコードを直接比べる。
+    発生時刻のないレコードは別に登録順で保持し、期間を指定しない検索の最後に含める。
+    """
+
+    def __init__(self):
+        self._records = {}     # EventID -> レコード
+        self._keys = {}        # EventID -> 索引に登録したときの (発生時刻, マグニチュード, 最大震度, 震源)
+        self._by_time = []     # (発生時刻, EventID) の昇順リスト
+        self._untimed = {}     # 発生時刻のない EventID（登録順。値は使わない）
+        self._by_magnitude = CategoryIndex()  # 0.1刻みのバケット番号ごと
+        self._by_intensity = CategoryIndex()
+        self._by_hypocenter = CategoryIndex()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def indexable(record):
+        """索引の対象となるレコードか（EventID と震源要素を持つもの）"""
+        return record.event_id is not None and hasattr(record, 'magnitude')
+
+    def add(self, record):
+        """レコードを登録（同じ EventID は新しいレコードで置き換える。続報で値が変わったレコードもそのまま渡せる）"""
+        if not self.indexable(record):
+            return False
+        event_id = record.event_id
+        with self._lock:
+            self._records[event_id] = record
+            self._reindex_locked(event_id, record)
+        return True
+
+    def refresh(self, record):
+        """登録中のレコードの値が変わったときに索引を更新する（外されたレコード・置き換わったレコードは登録し直さない）"""
+        if not self.indexable(record):
+            return False
+        event_id = record.event_id
+        with self._lock:
+            if self._records.get(event_id) is not record:
+                return False
+            self._reindex_locked(event_id, record)
+        return True
+
+    def _reindex_locked(self, event_id, record):
+        key = (record.origin_time, record.magnitude, record.max_intensity, record.hypocenter)
+        old_key = self._keys.get(event_id)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self._unindex_locked(event_id, old_key)
+        self._index_locked(event_id, key)
+        self._keys[event_id] = key
+
+    def discard(self, record):
+        """レコードを索引から外す（同じ EventID が別のレコードで置き換わっていれば何もしない）"""
+        if not self.indexable(record):
+            return False
+        event_id = record.event_id
+        with self._lock:
+            if self._records.get(event_id) is not record:
+                return False
+            del self._records[event_id]
+            self._unindex_locked(event_id, self._keys.pop(event_id))
+        return True
+
+    def _index_locked(self, event_id, key):
+        origin_time, magnitude, max_intensity, hypocenter = key
+        day = day_of(origin_time)
+        if origin_time is not None:
+            entry = (origin_time, event_id)
+            if not self._by_time or self._by_time[-1] <= entry:
+                self._by_time.append(entry)  # 通常は発生時刻順に届くため末尾に追加するだけ
+            else:
+                insort(self._by_time, entry)
+        else:
+            self._untimed[event_id] = None
+        if magnitude is not None:
+            self._by_magnitude.add(magnitude_bucket(magnitude), day, event_id)
+        if max_intensity is not None:
+            self._by_intensity.add(max_intensity, day, event_id)
+        if hypocenter is not None:
+            self._by_hypocenter.add(hypocenter, day, event_id)
+
+    def _unindex_locked(self, event_id, key):
+        origin_time, magnitude, max_intensity, hypocenter = key
+        day = day_of(origin_time)
+        if origin_time is not None:
+            entry = (origin_time, event_id)
+            position = bisect_left(self._by_time, entry)
+            if position < len(self._by_time) and self._by_time[position] == entry:
+                del self._by_time[position]
+        else:
+            self._untimed.pop(event_id, None)
+        if magnitude is not None:
+            self._by_magnitude.discard(magnitude_bucket(magnitude), day, event_id)
+        if max_intensity is not None:
+            self._by_intensity.discard(max_intensity, day, event_id)
+        if hypocenter is not None:
+            self._by_hypocenter.discard(hypocenter, day, event_id)
+
+    def get(self, event_id):
+        """EventID のレコード（なければ None）"""
+        with self._lock:
+            return self._records.get(event_id)
+
+    def query(self, since=None, until=None, min_magnitude=None, max_magnitude=None,
+              min_intensity=None, max_intensity=None, hypocenter=None, limit=None):
+        """条件に合うレコードを発生時刻の新しい順に返す
+
+        since/until は発生時刻（UNIX秒）の範囲、min_/max_ は両端を含む範囲、hypocenter は震源名の完全一致。
+        発生時刻のないレコードは期間を指定しない場合だけ、最後に新しく登録した順で含める。
+        """
+        min_rank = INTENSITY_RANK.get(min_intensity) if min_intensity is not None else None
+        max_rank = INTENSITY_RANK.get(max_intensity) if max_intensity is not None else None
+        if (min_intensity is not None and min_rank is None) or (max_intensity is not None and max_rank is None):
+            raise ValueError(f"不明な震度です: {min_intensity if min_rank is None else max_intensity}")
+        timed = since is not None or until is not None
+
+        def matches(record):
+            if timed:
+                if record.origin_time is None:
+                    return False
+                if since is not None and record.origin_time < since:
+                    return False
+                if until is not None and record.origin_time > until:
+                    return False
+            if min_magnitude is not None or max_magnitude is not None:
+                if record.magnitude is None:
+                    return False
+                if min_magnitude is not None and record.magnitude < min_magnitude:
+                    return False
+                if max_magnitude is not None and record.magnitude > max_magnitude:
+                    return False
+            if min_rank is not None or max_rank is not None:
+                rank = INTENSITY_RANK.get(record.max_intensity)
+                if rank is None:
+                    return False
+                if min_rank is not None and rank < min_rank:
+                    return False
+                if max_rank is not None and rank > max_rank:
+                    return False
+            if hypocenter is not None and record.hypocenter != hypocenter:
+                return False
+            return True
+
+        with self._lock:
+            filters = []
+            if min_magnitude is not None or max_magnitude is not None:
+                bucket_low = magnitude_bucket(min_magnitude) if min_magnitude is not None else None
+                bucket_high = magnitude_bucket(max_magnitude) if max_magnitude is not None else None
+                filters.append((self._by_magnitude, [
+                    bucket for bucket in self._by_magnitude.values()
+                    if (bucket_low is None or bucket >= bucket_low) and (bucket_high is None or bucket <= bucket_high)]))
+            if min_rank is not None or max_rank is not None:
+                filters.append((self._by_intensity, [
+                    intensity for intensity in self._by_intensity.values()
+                    if intensity in INTENSITY_RANK
+                    and (min_rank is None or INTENSITY_RANK[intensity] >= min_rank)
+                    and (max_rank is None or INTENSITY_RANK[intensity] <= max_rank)]))
+            if hypocenter is not None:
+                filters.append((self._by_hypocenter, [hypocenter]))
+
+            # 発生時刻の範囲（期間指定がなければ全件）
+            low = bisect_left(self._by_time, (since,)) if since is not None else 0
+            high = len(self._by_time)
+            if until is not None:
+                high = bisect_right(self._by_time, (until, LAST_EVENT_ID))
+
+            # 索引ごとの候補（期間指定がある場合は発生日で絞る）
+            plans = []  # (件数, 集合のリスト)
+            time_count = high - low
+            if timed and low < high:
+                day_low, day_high = day_of(self._by_time[low][0]), day_of(self._by_time[high - 1][0])
+                for index, values in filters:
+                    sets = index.sets_between(values, day_low, day_high)
+                    if sets is None:
+                        if index.count(values) >= time_count:
+                            continue
+                        sets = index.sets(values)
+                    plans.append((sum(map(len, sets)), sets))
+            elif not timed and filters:
+                counts = [index.count(values) for index, values in filters]
+                smallest = min(counts)
+                plans = [(count, index.sets(values)) for count, (index, values) in zip(counts, filters)
+                         if count <= smallest * INTERSECT_RATIO]
+            plans.sort(key=lambda plan: plan[0])
+            if timed and plans and plans[0][0] >= time_count:
+                plans = []  # 発生時刻の索引のほうが候補が少ない
+
+            records = self._records
+            if plans:
+                # 最も候補の少ない索引を起点にし、件数の近い索引とは集合演算で絞り込む
+                best_count, best_sets = plans[0]
+                ids = best_sets[0] if len(best_sets) == 1 else set().union(*best_sets)
+                for count, sets in plans[1:]:
+                    if count > best_count * INTERSECT_RATIO:
+                        break
+                    ids = ids.intersection(sets[0] if len(sets) == 1 else set().union(*sets))
+                results = [records[event_id] for event_id in ids if matches(records[event_id])]
+            else:
+                # 発生時刻の索引を新しい順にたどり、limit 件そろった時点で打ち切る
+                results = []
+                for position in range(high - 1, low - 1, -1):
+                    record = records[self._by_time[position][1]]
+                    if matches(record):
+                        results.append(record)
+                        if limit is not None and len(results) >= limit:
+                            return results
+                if not timed:
+                    for event_id in reversed(self._untimed):
+                        record = records[event_id]
+                        if matches(record):
+                            results.append(record)
+                            if limit is not None and len(results) >= limit:
+                                break
+                return results
+
+        results.sort(key=lambda record: record.origin_time or 0.0, reverse=True)
+        return results[:limit] if limit is not None else results
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._keys.clear()
+            self._by_time.clear()
+            self._untimed.clear()
+            self._by_magnitude.clear()
+            self._by_intensity.clear()
+            self._by_hypocenter.clear()
+
+    def __len__(self):
+        return len(self._records)
@@ -0,0 +1,179 @@
+import re
+import sys
+from datetime import datetime
+
+# 大きな電文は本文を解析せず、先頭付近から項目を取り出す
+JMX_PEEK_LENGTH = 2048
+JMX_PATTERNS = {
+    'info_type': re.compile(r'"InfoType"\s*:\s*"([^"]*)"'),
+    'title': re.compile(r'"Title"\s*:\s*"([^"]*)"'),
+    'report_time': re.compile(r'"DateTime"\s*:\s*"([^"]*)"'),
+}
+
+
+def intern_text(value):
+    """繰り返し現れる文字列（チャンネル名・震源名・震度など）を1つのオブジェクトにまとめる"""
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+def parse_epoch(value):
+    """ISO 8601 形式の時刻をUNIX秒に変換（変換できなければ None）"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def to_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_bool(value):
+    """真偽値の項目を解釈する（真偽値はそのまま、文字列は "true" と "1" だけを真とする）"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1')
+    return False
+
+
+class EventRecord:
+    """受信データ履歴の1件（どのチャンネルにも共通の項目）"""
+
+    __slots__ = ('received_at', 'channel', 'event_id', 'raw')
+    FIELDS = ()  # サブクラス固有の項目
+
+    def __init__(self, received_at, channel, event_id=None, raw=None):
+        self.received_at = received_at
+        self.channel = intern_text(channel)
+        self.event_id = intern_text(event_id)
+        self.raw = raw  # 生メッセージ（keep_raw 指定時のみ保持）
+
+    @property
+    def timestamp(self):
+        """受信時刻の文字列表現"""
+        return datetime.fromtimestamp(self.received_at).strftime('%Y-%m-%d %H:%M:%S')
+
+    def memory_size(self):
+        """レコードが保持しているおおよそのメモリ量（バイト。共有している文字列も1件ごとに数える）"""
+        size = sys.getsizeof(self)
+        for value in (self.event_id, self.raw) + tuple(getattr(self, field) for field in self.FIELDS):
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+    def to_dict(self):
+        """辞書に変換（ディスクへの退避用）"""
+        entry = {
+            'timestamp': self.timestamp,
+            'received_at': self.received_at,
+            'channel': self.channel,
+            'event_id': self.event_id,
+        }
+        for field in self.FIELDS:
+            entry[field] = getattr(self, field)
+        if self.raw is not None:
+            entry['raw'] = self.raw
+        return entry
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.to_dict().items() if key != 'raw')
+        return f"{type(self).__name__}({fields})"
+
+
+class EEWRecord(EventRecord):
+    """緊急地震速報（eew）"""
+
+    __slots__ = ('serial', 'magnitude', 'depth', 'max_intensity', 'hypocenter', 'origin_time',
+                 'is_final', 'is_cancel')
+    FIELDS = __slots__
+
+    def __init__(self, received_at, channel, event_id, content, raw=None):
+        super().__init__(received_at, channel, event_id, raw)
+        self.serial = to_int(content.get('serial', content.get('Serial')))
+        self.magnitude = to_float(content.get('magnitude'))
+        self.depth = to_float(content.get('depth'))
+        self.max_intensity = intern_text(content.get('maxIntensity', content.get('max_intensity')))
+        self.hypocenter = intern_text(content.get('hypocenter'))
+        self.origin_time = parse_epoch(content.get('origin_time'))
+        self.is_final = to_bool(content.get('is_final'))
+        self.is_cancel = to_bool(content.get('is_cancel'))
+
+
+class QuakeOneRecord(EventRecord):
+    """QUAKE.ONE地震情報（quake-one）"""
+
+    __slots__ = ('magnitude', 'depth', 'max_intensity', 'hypocenter', 'origin_time')
+    FIELDS = __slots__
+
+    def __init__(self, received_at, channel, event_id, content, raw=None):
+        super().__init__(received_at, channel, event_id, raw)
+        earthquake = content.get('earthquake')
+        if not isinstance(earthquake, dict):
+            earthquake = {}
+        intensity = content.get('intensity')
+        if not isinstance(intensity, dict):
+            intensity = {}
+        self.magnitude = to_float(earthquake.get('magnitude'))
+        self.depth = to_float(earthquake.get('depth'))
+        self.max_intensity = intern_text(intensity.get('max'))
+        self.hypocenter = intern_text(earthquake.get('hypocenter'))
+        self.origin_time = parse_epoch(earthquake.get('time'))
+
+
+class JMXRecord(EventRecord):
+    """気象庁電文（jmx-seismology）"""
+
+    __slots__ = ('info_type', 'title', 'report_time')
+    FIELDS = __slots__
+
+    def __init__(self, received_at, channel, event_id, content=None, raw=None, peek_source=None):
+        super().__init__(received_at, channel, event_id, raw)
+        if content is not None:
+            info_type, title, report_time = content.get('InfoType'), content.get('Title'), content.get('DateTime')
+        else:
+            # 本文を解析していない大きな電文は先頭付近から取り出す
+            values = {}
+            for field, pattern in JMX_PATTERNS.items():
+                match = pattern.search(peek_source or '', 0, JMX_PEEK_LENGTH)
+                values[field] = match.group(1) if match else None
+            info_type, title, report_time = values['info_type'], values['title'], values['report_time']
+        self.info_type = intern_text(info_type)
+        self.title = intern_text(title)
+        self.report_time = parse_epoch(report_time)
+
+
+def make_record(decoded, received_at, keep_raw=False):
+    """DecodedMessage からチャンネルに応じたレコードを作る"""
+    channel = decoded.channel or '不明'
+    raw = decoded.raw if keep_raw else None
+
+    if channel == 'jmx-seismology':
+        # 大きな電文の解析は利用者が必要とするまで遅らせる
+        if decoded.parsed:
+            content = decoded.content
+            if isinstance(content, dict):
+                return JMXRecord(received_at, channel, decoded.event_id, content, raw)
+        return JMXRecord(received_at, channel, decoded.event_id, raw=raw, peek_source=decoded.raw)
+
+    if channel in ('eew', 'quake-one'):
+        content = decoded.content
+        if isinstance(content, dict):
+            record_type = EEWRecord if channel == 'eew' else QuakeOneRecord
+            return record_type(received_at, channel, decoded.event_id, content, raw)
+
+    return EventRecord(received_at, channel, decoded.event_id, raw)
@@ -0,0 +1,220 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+StoredMessage = namedtuple('StoredMessage', ['received_at', 'channel', 'event_id', 'raw'])
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        received_at REAL NOT NULL,
+        channel TEXT NOT NULL,
+        event_id TEXT,
+        raw TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS messages_received_at ON messages (received_at)",
+    "CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, received_at)",
+    "CREATE INDEX IF NOT EXISTS messages_event_id ON messages (event_id)",
+)
+INSERT_SQL = "INSERT INTO messages (received_at, channel, event_id, raw) VALUES (?, ?, ?, ?)"
+# 保存期間を過ぎたメッセージを削除する（1回の削除は PRUNE_BATCH 件まで。書き込みを長く止めない）
+PRUNE_SQL = "DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE received_at < ? LIMIT ?)"
+PRUNE_BATCH = 10000
+
+
+class EventStore:
+    """受信メッセージを SQLite（WALモード）へ保存するストア
+
+    append() はキューへ入れるだけで戻り、書き込みスレッドがまとめて1つのトランザクションで挿入する。
+    retention_seconds を指定すると、書き込みスレッドが prune_interval 秒ごとにそれより古いメッセージを削除する。
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=0.5, queue_size=100000, retention_seconds=None,
+                 prune_interval=60.0):
+        self.path = path
+        self.batch_size = batch_size          # 1回のトランザクションで挿入する最大件数
+        self.flush_interval = flush_interval  # 件数がそろわなくても書き込むまでの秒数
+        self.retention_seconds = retention_seconds  # 保存期間（秒）。None は削除しない
+        self.prune_interval = prune_interval
+        self.written_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+        self.batch_count = 0
+        self.pruned_count = 0  # 保存期間を過ぎて削除した件数
+        self.prune_error_count = 0  # 削除に失敗した回数（次の周期でやり直す）
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._running = False
+        self._schema_ready = False
+
+    def connect(self):
+        """データベースに接続する（接続はスレッドごとに作る。初回はテーブルと索引を作る）"""
+        if not self._schema_ready:
+            self._create_schema()
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _create_schema(self):
+        """WALモードへの切り替えとテーブル・索引の作成（データベースファイルに残るため1回だけ行う）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+        self._schema_ready = True
+
+    # --- 書き込み ---
+    def start(self):
+        """書き込みスレッドを開始"""
+        if self._running:
+            return self
+        self._create_schema()  # 失敗した場合は呼び出し元へ例外を返す
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def append(self, channel, event_id, raw, received_at=None):
+        """メッセージを書き込みキューへ追加（呼び出し元はブロックしない）"""
+        if received_at is None:
+            received_at = time.time()
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8', 'replace')
+        try:
+            self._queue.put_nowait((received_at, channel or '', event_id, raw))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def flush(self):
+        """キュー内のメッセージがデータベースへ書き込まれるまで待つ"""
+        if self._running:
+            self._queue.put(None)
+            self._queue.join()
+
+    def close(self):
+        """残りのメッセージを書き込んで停止"""
+        if not self._running:
+            return
+        self.flush()
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    @property
+    def backlog(self):
+        """書き込み待ちの件数"""
+        return self._queue.qsize()
+
+    def _writer_loop(self):
+        """キューから最大 batch_size 件をまとめて取り出し、1つのトランザクションで挿入する"""
+        connection = self.connect()
+        connection.execute("PRAGMA synchronous=NORMAL")  # WALでは電源断以外でデータを失わない
+        next_prune = time.monotonic()
+        try:
+            while self._running or not self._queue.empty():
+                if self.retention_seconds is not None and time.monotonic() >= next_prune:
+                    self._prune(connection)
+                    next_prune = time.monotonic() + self.prune_interval
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                batch = []
+                taken = 1
+                if item is not None:
+                    batch.append(item)
+                # 待たずに取り出せる分をまとめる（flush() / close() の区切りはそこで止める）
+                while item is not None and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is not None:
+                        batch.append(item)
+
+                try:
+                    if batch:
+                        with connection:
+                            connection.executemany(INSERT_SQL, batch)
+                        self.written_count += len(batch)
+                        self.batch_count += 1
+                except sqlite3.Error:
+                    self.error_count += len(batch)
+                finally:
+                    for _ in range(taken):
+                        self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _prune(self, connection):
+        """保存期間を過ぎたメッセージを PRUNE_BATCH 件ずつ削除する（書き込みスレッドで呼ぶ）"""
+        cutoff = time.time() - self.retention_seconds
+        try:
+            while True:
+                with connection:
+                    deleted = connection.execute(PRUNE_SQL, (cutoff, PRUNE_BATCH)).rowcount
+                self.pruned_count += deleted
+                if deleted < PRUNE_BATCH:
+                    break
+        except sqlite3.Error:
+            self.prune_error_count += 1
+
+    # --- 読み出し ---
+    def _query(self, sql, parameters=()):
+        connection = self.connect()
+        try:
+            return [StoredMessage(*row) for row in connection.execute(sql, parameters)]
+        finally:
+            connection.close()
+
+    def load_recent(self, since=None, limit=10000):
+        """受信時刻が since 以降の最新 limit 件を受信順で返す"""
+        sql = "SELECT received_at, channel, event_id, raw FROM messages"
+        parameters = []
+        if since is not None:
+            sql += " WHERE received_at >= ?"
+            parameters.append(since)
+        sql += " ORDER BY received_at DESC LIMIT ?"
+        parameters.append(limit)
+        return self._query(sql, parameters)[::-1]
+
+    def read_range(self, start=None, end=None, channel=None):
+        """受信時刻が [start, end) のメッセージを受信順で返す（channel 指定時はそのチャンネルのみ）"""
+        conditions, parameters = [], []
+        if start is not None:
+            conditions.append("received_at >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("received_at < ?")
+            parameters.append(end)
+        if channel is not None:
+            conditions.append("channel = ?")
+            parameters.append(channel)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"SELECT received_at, channel, event_id, raw FROM messages{where} ORDER BY received_at",
+                           parameters)
+
+    def find_event(self, event_id):
+        """EventID のメッセージを受信順で返す"""
+        return self._query("SELECT received_at, channel, event_id, raw FROM messages WHERE event_id = ? "
+                           "ORDER BY received_at", (event_id,))
+
+    def count(self):
+        return self._query_value("SELECT COUNT(*) FROM messages")
+
+    def _query_value(self, sql, parameters=()):
+        connection = self.connect()
+        try:
+            return connection.execute(sql, parameters).fetchone()[0]
+        finally:
+            connection.close()
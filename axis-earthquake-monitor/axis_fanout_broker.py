@@ -0,0 +1,359 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from axis_websocket_frames import OP_CLOSE, OP_TEXT, accept_key, encode_frame, parse_http_head, read_message_async
+
+ALL_CHANNELS = '*'
+
+
+def parse_channels(text):
+    """"eew,quake-one" 形式のチャンネル指定を集合にする（空・"*" は全チャンネル）"""
+    channels = {channel.strip() for channel in text.split(',') if channel.strip()}
+    return channels if channels and ALL_CHANNELS not in channels else {ALL_CHANNELS}
+
+
+class _Publication:
+    """配信する1メッセージ（WebSocketフレームとTCPの1行は購読者の数によらず1回だけ作る）"""
+
+    __slots__ = ('channel', 'frame', 'line', 'published_at')
+
+    def __init__(self, channel, raw):
+        self.channel = channel
+        self.published_at = time.perf_counter()
+        payload = raw.encode('utf-8') if isinstance(raw, str) else raw
+        self.frame = encode_frame(payload)
+        self.line = payload.replace(b"\n", b" ") + b"\n"
+
+
+class _Subscriber:
+    """購読中のクライアント（イベントループのスレッドからのみ操作する）
+
+    送信バッファに余裕があればその場でソケットへ書き、なければ上限付きのキューへ入れて
+    送信できるようになるのを待つ。キューが満杯なら最も古いメッセージを捨てる。
+    """
+
+    def __init__(self, broker, writer, protocol):
+        self.broker = broker
+        self.writer = writer
+        self.transport = writer.transport
+        self.address = writer.get_extra_info('peername') or ('?', 0)
+        self.protocol = protocol  # 'websocket' または 'tcp'
+        self.channels = set()
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.closed = False
+        self._consecutive_drops = 0
+        self._queue = deque()
+        self._flushing = False
+        self.transport.set_write_buffer_limits(high=broker.write_buffer)
+
+    def deliver(self, publication, latencies):
+        """メッセージを送るかキューへ入れる。切断すべき場合は False を返す"""
+        if self.closed:
+            return True
+        if not self._queue and self.transport.get_write_buffer_size() <= self.broker.write_buffer:
+            self.transport.write(publication.frame if self.protocol == 'websocket' else publication.line)
+            latencies.append(time.perf_counter() - publication.published_at)
+            self.sent_count += 1
+            self._consecutive_drops = 0
+            return True
+
+        self._queue.append(publication)
+        if len(self._queue) > self.broker.queue_size:
+            self._queue.popleft()
+            self.dropped_count += 1
+            self.broker.dropped_count += 1
+            self._consecutive_drops += 1
+            if self.broker.max_dropped is not None and self._consecutive_drops > self.broker.max_dropped:
+                return False
+        if not self._flushing:
+            self._flushing = True
+            asyncio.ensure_future(self._flush())
+        return True
+
+    async def _flush(self):
+        """送信バッファが空くのを待ちながらキューを送り切る"""
+        websocket = self.protocol == 'websocket'
+        try:
+            while self._queue and not self.closed:
+                await self.writer.drain()
+                items = [self._queue.popleft() for _ in range(min(len(self._queue), 256))]
+                self.transport.write(b"".join(item.frame if websocket else item.line for item in items))
+                sent_at = time.perf_counter()
+                self.broker.record_latency([sent_at - item.published_at for item in items])
+                self.sent_count += len(items)
+                self._consecutive_drops = 0
+        except (ConnectionError, OSError):
+            self.close(abort=True)
+        finally:
+            self._flushing = False
+
+    async def send_frame(self, payload, opcode=OP_TEXT):
+        """キューを通さずに送る（pong・close）"""
+        self.transport.write(encode_frame(payload, opcode))
+
+    @property
+    def backlog(self):
+        return len(self._queue)
+
+    def close(self, abort=False):
+        """切断する（abort=True は送信バッファに残った分を捨ててすぐに切る）"""
+        if not self.closed:
+            self.closed = True
+            self._queue.clear()
+            if abort:
+                self.transport.abort()
+            else:
+                self.transport.close()
+
+
+class FanoutBroker:
+    """1本のAXIS接続で受信したメッセージを、ローカルの多数のクライアントへ再配信するサーバー
+
+    - WebSocket: ws://host:port/?channels=eew,quake-one で接続（"*" または省略で全チャンネル）。
+      接続後に {"subscribe": [...]} / {"unsubscribe": [...]} を送ると購読を変更できる
+    - TCP: 接続後に "SUBSCRIBE eew,quake-one" の1行を送ると、受信メッセージが1行1件で届く
+      （"UNSUBSCRIBE ..." で解除）
+    - 全クライアントを1つのイベントループで扱い、publish() は各クライアントのソケットへ直接書く。
+      送信が追いつかないクライアントはクライアントごとの上限付きキューに溜め、溢れたら古いものから捨てる
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, queue_size=1000, max_dropped=None, write_buffer=256 * 1024,
+                 latency_samples=10000, log=None):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size      # 送信バッファに入りきらない分を溜めるクライアントごとの件数
+        self.max_dropped = max_dropped    # 連続してこの件数を捨てたクライアントは切断する（None は切断しない）
+        self.write_buffer = write_buffer  # クライアントごとのソケット送信バッファの上限（バイト）
+        self.log = log  # log(message, level) 形式のコールバック（任意）
+        self.published_count = 0
+        self.delivered_count = 0
+        self.dropped_count = 0
+        self.disconnected_slow_count = 0
+        self._latencies = deque(maxlen=latency_samples)  # 配信からソケットへ渡すまでの秒数（直近の分）
+        self._subscribers = {}  # チャンネル -> 購読者の集合（"*" は全チャンネル）
+        self._clients = set()
+        self._loop = None
+        self._thread = None
+        self._server = None
+
+    def _log(self, message, level="INFO"):
+        if self.log:
+            self.log(message, level)
+
+    # --- サーバー ---
+    def start(self):
+        """専用スレッドでイベントループを動かし、待ち受けを開始"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fanout-broker", daemon=True)
+        self._thread.start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024),
+                self._loop).result()
+        except OSError:
+            # 待ち受けられない（ポートが使用中など）場合はループを止めて呼び出し元へ返す
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._log(f"📢 再配信サーバーを開始しました (ws://{self.host}:{self.port}/ , tcp://{self.host}:{self.port})")
+        return self
+
+    def stop(self, timeout=5.0):
+        """サーバーを停止し、全クライアントを切断"""
+        if not self._loop:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+        self._loop = None
+
+    async def _shutdown(self):
+        self._server.close()
+        for client in list(self._clients):
+            client.close(abort=True)
+        # 切断された接続の処理は読み込み・送信待ちのエラーで自然に終わる
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+
+    async def _handle_connection(self, reader, writer):
+        client = None
+        try:
+            first_line = await reader.readline()
+            if first_line.startswith(b"GET "):
+                head = first_line + await reader.readuntil(b"\r\n\r\n")
+                request_line, headers = parse_http_head(head[:-4])
+                if headers.get('upgrade', '').lower() != 'websocket':
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    return
+                writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                              "Upgrade: websocket\r\n"
+                              "Connection: Upgrade\r\n"
+                              f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+                              ).encode('latin-1'))
+                query = parse_qs(urlsplit(request_line.split(" ")[1]).query)
+                client = self._add_client(writer, 'websocket',
+                                          parse_channels(",".join(query.get('channels', [ALL_CHANNELS]))))
+                while not client.closed and await self._read_websocket_command(client, reader):
+                    pass
+            elif first_line:
+                client = self._add_client(writer, 'tcp', set())
+                line = first_line
+                while line and not client.closed and self._handle_tcp_command(client, line):
+                    line = await reader.readline()
+        except (EOFError, ConnectionError, OSError, ValueError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            if client:
+                self._remove_client(client)
+            writer.close()
+
+    def _add_client(self, writer, protocol, channels):
+        client = _Subscriber(self, writer, protocol)
+        self._clients.add(client)
+        self.subscribe(client, channels)
+        self._log(f"📥 クライアント接続 ({client.protocol} {client.address[0]}:{client.address[1]})")
+        return client
+
+    async def _read_websocket_command(self, client, reader):
+        opcode, payload = await read_message_async(reader.readexactly, client.send_frame)
+        if opcode == OP_CLOSE:
+            await client.send_frame(payload, OP_CLOSE)
+            return False
+        try:
+            command = json.loads(payload)
+        except ValueError:
+            return True  # 購読の変更以外のメッセージは無視する
+        if isinstance(command, dict):
+            if 'subscribe' in command:
+                self.subscribe(client, parse_channels(",".join(command['subscribe'])))
+            if 'unsubscribe' in command:
+                self.unsubscribe(client, set(command['unsubscribe']))
+        return True
+
+    def _handle_tcp_command(self, client, line):
+        verb, _, argument = line.decode('utf-8', 'replace').strip().partition(" ")
+        if verb.upper() == "SUBSCRIBE":
+            self.subscribe(client, parse_channels(argument))
+        elif verb.upper() == "UNSUBSCRIBE":
+            self.unsubscribe(client, parse_channels(argument))
+        elif verb.upper() == "QUIT":
+            return False
+        return True
+
+    def _remove_client(self, client, reason=None):
+        client.close(abort=reason is not None)
+        if client not in self._clients:
+            return
+        self._clients.discard(client)
+        for subscribers in self._subscribers.values():
+            subscribers.discard(client)
+        suffix = f": {reason}" if reason else ""
+        self._log(f"📤 クライアント切断 ({client.protocol} {client.address[0]}:{client.address[1]}, "
+                  f"送信{client.sent_count} 破棄{client.dropped_count}){suffix}")
+
+    # --- 購読（イベントループのスレッドから呼ぶ） ---
+    def subscribe(self, client, channels):
+        if ALL_CHANNELS in channels:
+            # 全チャンネルの購読は個別の購読を置き換える
+            for channel in client.channels:
+                self._subscribers.get(channel, set()).discard(client)
+            client.channels = {ALL_CHANNELS}
+        elif ALL_CHANNELS in client.channels:
+            return
+        else:
+            client.channels |= channels
+        for channel in client.channels:
+            self._subscribers.setdefault(channel, set()).add(client)
+
+    def unsubscribe(self, client, channels):
+        if ALL_CHANNELS in channels:
+            channels = set(client.channels)
+        for channel in channels:
+            self._subscribers.get(channel, set()).discard(client)
+        client.channels -= channels
+
+    # --- 配信 ---
+    def publish(self, channel, raw):
+        """メッセージを購読中のクライアントへ配る（任意のスレッドから呼べる。待たずに戻る）"""
+        loop = self._loop
+        if loop is None:
+            return
+        publication = _Publication(channel, raw)
+        try:
+            loop.call_soon_threadsafe(self._fanout, publication)
+        except RuntimeError:
+            return  # 停止処理中
+        self.published_count += 1
+
+    def on_message_received(self, channel, decoded, received_at):
+        """EarthquakeModel の message_received コールバックとして使う（追跡で無視した古い緊急地震速報も配る）"""
+        self.publish(channel, decoded.raw)
+
+    def _fanout(self, publication):
+        latencies = []
+        slow = []
+        for subscribers in (self._subscribers.get(publication.channel), self._subscribers.get(ALL_CHANNELS)):
+            for client in subscribers or ():
+                if not client.deliver(publication, latencies):
+                    slow.append(client)
+        for client in slow:
+            self.disconnected_slow_count += 1
+            self._remove_client(client, f"{self.max_dropped}件を超えて連続で破棄したため")
+        self.record_latency(latencies)
+
+    def record_latency(self, latencies):
+        """配信からソケットへ渡すまでの時間を記録する"""
+        self._latencies.extend(latencies)
+        self.delivered_count += len(latencies)
+
+    # --- 集計 ---
+    def snapshot(self):
+        """クライアント数・配信件数・配信遅延（µs）の集計"""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            async def collect():
+                return list(self._clients), sorted(self._latencies)
+            clients, latencies = asyncio.run_coroutine_threadsafe(collect(), loop).result(5)
+        else:
+            clients, latencies = list(self._clients), sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1e6
+
+        return {
+            'clients': len(clients),
+            'published': self.published_count,
+            'delivered': self.delivered_count,
+            'dropped': self.dropped_count,
+            'backlog': sum(client.backlog for client in clients),
+            'disconnected_slow': self.disconnected_slow_count,
+            'latency_p50_us': percentile(0.50),
+            'latency_p99_us': percentile(0.99),
+            'latency_max_us': latencies[-1] * 1e6 if latencies else None,
+        }
+
+
+def format_fanout(snapshot):
+    """集計を1行の文字列にする"""
+    if snapshot['latency_p50_us'] is None:
+        latency = "遅延 -"
+    else:
+        latency = (f"遅延 p50 {snapshot['latency_p50_us']:.0f}µs p99 {snapshot['latency_p99_us']:.0f}µs "
+                   f"max {snapshot['latency_max_us']:.0f}µs")
+    return (f"再配信: クライアント{snapshot['clients']} 配信{snapshot['published']} "
+            f"送信{snapshot['delivered']} 破棄{snapshot['dropped']} | {latency}")
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime
+
+# チャンネル名 -> formatter(data) （表示する行のリストを返す関数）
+FORMATTERS = {}
+
+SEPARATOR = "=" * 80
+SUBSEPARATOR = "-" * 40
+
+JMX_IMPORTANT_KEYS = ('EventID', 'InfoType', 'Title', 'DateTime', 'Status')
+QUAKE_ONE_IMPORTANT_KEYS = frozenset(('earthquake', 'intensity'))
+EEW_IMPORTANT_KEYS = frozenset(('magnitude', 'maxIntensity', 'max_intensity', 'origin_time', 'hypocenter',
+                                'arrival_time', 'warning_time'))
+EEW_FIELDS = (
+    ('origin_time', "  ⏰ 発生時刻: "),
+    ('hypocenter', "  📍 震源地: "),
+    ('arrival_time', "  ⚡ 到達予想時刻: "),
+    ('warning_time', "  ⏰ 警報発表時刻: "),
+)
+
+
+def register_formatter(channel):
+    """チャンネルの表示形式を登録するデコレーター"""
+    def decorator(formatter):
+        FORMATTERS[channel] = formatter
+        return formatter
+    return decorator
+
+
+def format_value(value):
+    """入れ子の値はJSON文字列にする"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def other_lines(data, skip_keys):
+    """主要項目以外のキーを1行ずつ表示"""
+    return [f"  🔸 {key}: {format_value(value)}" for key, value in data.items() if key not in skip_keys]
+
+
+def render_message(channel, data, timestamp, line_prefix=""):
+    """1件のメッセージを見出し付きの1つの文字列にする（各行の先頭に line_prefix を付ける）"""
+    lines = [f"\n{SEPARATOR}", f"🕐 受信時刻: {timestamp}", f"📡 チャンネル: {channel}", SEPARATOR]
+    lines += FORMATTERS.get(channel, format_default)(data)
+    return "".join([f"{line_prefix}{line}\n" for line in lines])
+
+
+def format_default(data):
+    """登録されていないチャンネルは内容をそのまま表示"""
+    return ["📄 メッセージ内容:", json.dumps(data, ensure_ascii=False, indent=2)]
+
+
+@register_formatter("jmx-seismology")
+def format_jmx_seismology(data):
+    """JMX地震学データ"""
+    lines = ["📡 JMX地震学情報（気象庁電文）", SUBSEPARATOR]
+    if not isinstance(data, dict):
+        return lines + [f"  📄 データ: {data}"]
+    # 重要な情報を優先表示
+    lines += [f"  🔹 {key}: {data[key]}" for key in JMX_IMPORTANT_KEYS if key in data]
+    return lines + other_lines(data, JMX_IMPORTANT_KEYS)
+
+
+@register_formatter("quake-one")
+def format_quake_one(data):
+    """QUAKE.ONE データ"""
+    lines = ["🌍 QUAKE.ONE地震情報", SUBSEPARATOR]
+    if not isinstance(data, dict):
+        return lines + [f"  📄 データ: {data}"]
+
+    # 震源情報
+    if 'earthquake' in data:
+        eq_info = data['earthquake']
+        lines += [
+            "  🏔️  震源情報:",
+            f"    📏 マグニチュード: {eq_info.get('magnitude', 'N/A')}",
+            f"    📍 震源地: {eq_info.get('hypocenter', 'N/A')}",
+            f"    🕳️  深さ: {eq_info.get('depth', 'N/A')} km",
+            f"    🕐 発生時刻: {eq_info.get('time', 'N/A')}",
+        ]
+
+    # 震度情報
+    if 'intensity' in data:
+        intensity_info = data['intensity']
+        lines += ["  📊 震度情報:", f"    🔥 最大震度: {intensity_info.get('max', 'N/A')}"]
+        if 'regions' in intensity_info:
+            lines.append("    🗾 地域別震度:")
+            lines += [f"      - {region}" for region in intensity_info['regions'][:5]]  # 最初の5件のみ表示
+
+    return lines + other_lines(data, QUAKE_ONE_IMPORTANT_KEYS)
+
+
+@register_formatter("eew")
+def format_eew(data):
+    """緊急地震速報(EEW)データ"""
+    lines = ["🚨 緊急地震速報 (EEW)", SUBSEPARATOR]
+    if not isinstance(data, dict):
+        return lines + [f"  📄 データ: {data}"]
+
+    # 重要な情報を強調表示
+    if 'magnitude' in data:
+        lines.append(f"  🔥 マグニチュード: {data['magnitude']}")
+    if 'maxIntensity' in data or 'max_intensity' in data:
+        lines.append(f"  🔥 最大予想震度: {data.get('maxIntensity', data.get('max_intensity', 'N/A'))}")
+    lines += [f"{label}{data[key]}" for key, label in EEW_FIELDS if key in data]
+
+    return lines + other_lines(data, EEW_IMPORTANT_KEYS)
+
+
+# 緊急地震速報の続報で差分を表示する項目名
+EEW_FIELD_LABELS = {
+    'magnitude': "M",
+    'depth': "深さ",
+    'max_intensity': "最大予想震度",
+    'hypocenter': "震源",
+    'origin_time': "発生時刻",
+    'state': "状態",
+}
+
+
+def format_eew_value(field, value):
+    """EEWRecord の項目を表示用の文字列にする"""
+    if value is None:
+        return "N/A"
+    if field == 'origin_time':
+        return datetime.fromtimestamp(value).strftime("%H:%M:%S")
+    if field == 'depth':
+        return f"{value:g}km"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def format_eew_summary(record, state):
+    """緊急地震速報の最新の状態を1行にまとめる"""
+    return (f"🚨 [{state}] 第{format_eew_value('serial', record.serial)}報 "
+            f"{format_eew_value('hypocenter', record.hypocenter)} "
+            f"M{format_eew_value('magnitude', record.magnitude)} "
+            f"最大予想震度{format_eew_value('max_intensity', record.max_intensity)} ({record.event_id})")
+
+
+def format_eew_changes(update):
+    """続報で変わった項目だけを1行にまとめる"""
+    changes = ", ".join(
+        f"{EEW_FIELD_LABELS[field]} {format_eew_value(field, old)}→{format_eew_value(field, new)}"
+        for field, (old, new) in update.changes.items())
+    return (f"🚨 緊急地震速報 第{format_eew_value('serial', update.serial)}報 [{update.state}] "
+            f"({update.event_id}): {changes or '変更なし'}")
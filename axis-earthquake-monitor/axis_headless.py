@@ -0,0 +1,294 @@
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from axis_connection_supervisor import ConnectionSupervisor
+from axis_earthquake_model import EarthquakeModel, DEFAULT_SERVER_LIST_URL
+from axis_event_store import EventStore
+from axis_fanout_broker import FanoutBroker, format_fanout
+from axis_formatters import format_eew_changes
+from axis_latency import BUCKET_BOUNDS, format_latency, format_latency_table
+from axis_message_journal import MessageJournal
+from axis_metrics import (
+    MetricsRegistry, MetricsServer, broker_metrics, model_metrics, process_metrics, sink_metrics
+)
+from axis_message_replay import MessageReplay, load_records, parse_speed
+from axis_profiler import CallbackProfiler, format_profile
+from axis_output_sinks import RotatingFileSink, SinkHub, StdoutSink, UnixSocketSink
+
+LEVEL_PREFIXES = {
+    "INFO": "ℹ️ ",
+    "SUCCESS": "✅ ",
+    "WARNING": "⚠️ ",
+    "ERROR": "❌ ",
+}
+
+
+class HeadlessMonitor:
+    """画面なしで EarthquakeModel を動かし、受信メッセージを出力先（シンク）へ配る
+
+    受信メッセージは SinkHub を通じて各シンクのバッファへ入るだけなので、遅い出力先があっても受信は止まらない。
+    ログは標準エラー出力へ書く（標準出力はJSONLの出力に使える）。
+    """
+
+    def __init__(self, hub, token=None, server_list_url=DEFAULT_SERVER_LIST_URL, redundant=False,
+                 stale_timeout=None, max_reconnect_delay=60.0, journal_dir=None, db_path=None,
+                 stats_interval=0, log_stream=None, broker=None, latency_path=None, metrics_port=None,
+                 metrics_host='127.0.0.1', profiler=None, retention_days=None,
+                 journal_retention_days=None):
+        self.hub = hub
+        self.latency_path = latency_path  # 集計のたびに遅延のヒストグラムをJSONで書き出すファイル（任意）
+        self.broker = broker  # FanoutBroker（任意）: 受信メッセージをローカルのクライアントへ再配信する
+        if broker is not None and broker.log is None:
+            broker.log = self.log
+        self.token = token
+        self.stats_interval = stats_interval  # 0 より大きい場合は集計をその秒数ごとにログへ出力
+        self.log_stream = log_stream if log_stream is not None else sys.stderr
+        self._stop_event = threading.Event()
+        self._log_lock = threading.Lock()
+
+        self.journal = None
+        if journal_dir:
+            journal_retention = journal_retention_days * 86400 if journal_retention_days else None
+            self.journal = MessageJournal(journal_dir, retention_seconds=journal_retention)
+        self.store = None
+        if db_path:
+            retention_seconds = retention_days * 86400 if retention_days else None
+            self.store = EventStore(db_path, retention_seconds=retention_seconds)
+        self.model = EarthquakeModel(
+            callbacks={
+                'log_message': self.log,
+                'status_update': lambda status_text: self.log(f"状態: {status_text}", "INFO"),
+                'message_received': self.on_message_received,
+                'eew_update': self.on_eew_update,
+            },
+            journal=self.journal, store=self.store, server_list_url=server_list_url, redundant=redundant,
+            supervisor=ConnectionSupervisor(stale_timeout=stale_timeout, max_delay=max_reconnect_delay))
+        if profiler is not None:
+            self.model.enable_profiling(profiler)
+        self.replay = None
+        self.metrics_port = metrics_port  # 指定した場合は Prometheus 形式のメトリクスを公開する
+        self.metrics_host = metrics_host
+        self.metrics_server = None
+
+    def log(self, message, level="INFO"):
+        """ログを1行書き出す"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._log_lock:
+            self.log_stream.write(f"[{timestamp}] {LEVEL_PREFIXES.get(level, '')}{message}\n")
+            self.log_stream.flush()
+
+    def on_message_received(self, channel, decoded, received_at):
+        """受信メッセージを全てのシンクへ配る"""
+        self.hub.publish(channel, decoded.event_id, decoded.raw, received_at)
+        if self.broker:
+            self.broker.publish(channel, decoded.raw)
+
+    def on_eew_update(self, update, data):
+        """緊急地震速報の続報は変わった項目だけをログへ出す"""
+        if not update.is_new:
+            self.log(format_eew_changes(update), "WARNING")
+
+    def _start_outputs(self):
+        self.hub.start()
+        if self.broker:
+            try:
+                self.broker.start()
+            except OSError as e:
+                self.log(f"再配信サーバーを開始できません: {e}", "ERROR")
+                self.broker = None
+        if self.metrics_port is not None:
+            registry = MetricsRegistry()
+            registry.add(lambda: model_metrics(self.model))
+            registry.add(lambda: sink_metrics(self.hub))
+            if self.broker:
+                registry.add(lambda: broker_metrics(self.broker))
+            registry.add(process_metrics)
+            try:
+                self.metrics_server = MetricsServer(registry, self.metrics_host, self.metrics_port,
+                                                    log=self.log).start()
+            except OSError as e:
+                self.log(f"メトリクスを公開できません: {e}", "ERROR")
+
+    def start(self):
+        """シンク・保存先を開始して接続する"""
+        self._start_outputs()
+        if self.journal:
+            self.journal.start()
+        if self.store:
+            try:
+                self.store.start()
+            except (sqlite3.Error, OSError) as e:
+                self.log(f"データベースを開けません: {e}", "ERROR")
+                self.store = self.model.store = None
+        self.model.set_token(self.token)
+        self.model.start_websocket_connection()
+
+    def start_replay(self, path, speed=1.0):
+        """記録済みメッセージを再生してシンクへ流す（再生が終わったら停止する）"""
+        self._start_outputs()
+
+        def finished(summary):
+            self.log(f"リプレイ完了: {summary['replayed_count']}件 / {summary['elapsed']:.2f}秒 "
+                     f"({summary['messages_per_second']:.1f}件/秒)", "SUCCESS")
+            self.stop()
+
+        self.replay = MessageReplay(self.model, load_records(path), speed=speed, on_finished=finished)
+        self.replay.start()
+
+    def stop(self):
+        """run() の待機を終わらせる（シグナルハンドラや別スレッドから呼べる）"""
+        self._stop_event.set()
+
+    def run(self):
+        """stop() が呼ばれるまで待ち、終了処理を行う"""
+        try:
+            while not self._stop_event.wait(self.stats_interval or None):
+                self.log_stats()
+        finally:
+            self.close()
+
+    def log_stats(self):
+        """受信件数とシンクごとの出力件数をログへ出す"""
+        total_count, _ = self.model.stats.counts()
+        sinks = ", ".join(f"{s['name']}: 出力{s['written']} 破棄{s['dropped']} 待ち{s['backlog']}"
+                          for s in self.hub.snapshot())
+        self.log(f"受信 {total_count}件 | {sinks}" if sinks else f"受信 {total_count}件", "INFO")
+        latency = self.model.latency.summary()
+        if latency:
+            self.log(f"遅延 {format_latency(latency)}", "INFO")
+        if self.broker:
+            self.log(format_fanout(self.broker.snapshot()), "INFO")
+        if self.latency_path:
+            self.write_latency()
+
+    def log_profile(self):
+        """コールバック・処理段階ごとの所要時間をログへ出す（計測していない場合は何もしない）"""
+        if self.model.profiler is not None:
+            self.log(f"コールバックの所要時間:\n{format_profile(self.model.profiler.report())}", "INFO")
+
+    def write_latency(self):
+        """チャンネル・区間ごとの遅延のヒストグラムをJSONで書き出す（書き換えは一度に行う）"""
+        snapshot = {
+            'generated_at': time.time(),
+            'bucket_bounds': list(BUCKET_BOUNDS),
+            'channels': self.model.latency.snapshot(),
+        }
+        temporary_path = f"{self.latency_path}.tmp"
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(temporary_path, self.latency_path)
+        except OSError as e:
+            self.log(f"遅延の書き出しエラー: {e}", "ERROR")
+
+    def close(self):
+        if self.replay:
+            self.replay.stop()
+        if self.model.connection_active or self.model.connected:
+            self.model.stop_websocket_connection()
+        self.model.flush(timeout=5)
+        self.model.close()
+        self.hub.close()
+        if self.broker:
+            self.broker.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.journal:
+            self.journal.close()
+        if self.store:
+            self.store.close()
+        self.log_stats()
+        table = format_latency_table(self.model.latency.snapshot())
+        if table:
+            self.log(f"遅延の内訳:\n{table}", "INFO")
+        self.log_profile()
+
+
+def build_hub(args):
+    """コマンドライン引数からシンクを組み立てる"""
+    hub = SinkHub()
+    if args.stdout:
+        hub.add(StdoutSink(buffer_size=args.buffer_size))
+    if args.file:
+        hub.add(RotatingFileSink(args.file, max_bytes=args.max_bytes, backup_count=args.backup_count,
+                                 buffer_size=args.buffer_size))
+    for path in args.unix_socket or []:
+        hub.add(UnixSocketSink(path, buffer_size=args.buffer_size))
+    return hub
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AXIS地震情報モニター（画面なし）")
+    parser.add_argument("--token", default=os.environ.get("AXIS_TOKEN"),
+                        help="アクセストークン（省略時は環境変数 AXIS_TOKEN）")
+    parser.add_argument("--stdout", action="store_true", help="受信メッセージを標準出力へJSONLで出力")
+    parser.add_argument("--file", help="受信メッセージをJSONLで書き出すファイル")
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024, help="ファイルを切り替える大きさ（バイト）")
+    parser.add_argument("--backup-count", type=int, default=5, help="残す古いファイルの数")
+    parser.add_argument("--unix-socket", action="append", help="受信メッセージを送るUNIXソケット（複数指定可）")
+    parser.add_argument("--broker-port", type=int, help="受信メッセージをローカルへ再配信するポート（WebSocket/TCP）")
+    parser.add_argument("--broker-host", default="127.0.0.1", help="再配信サーバーの待ち受けアドレス")
+    parser.add_argument("--broker-queue-size", type=int, default=1000, help="再配信のクライアントごとのキューの件数")
+    parser.add_argument("--broker-max-dropped", type=int,
+                        help="連続してこの件数を捨てた再配信クライアントを切断する（省略時は切断しない）")
+    parser.add_argument("--buffer-size", type=int, default=10000, help="シンクごとのバッファの行数")
+    parser.add_argument("--db", help="受信データを保存するSQLiteデータベース")
+    parser.add_argument("--retention-days", type=float, help="データベースに保存する日数（超えた分は削除。既定: 削除しない）")
+    parser.add_argument("--journal-dir", help="生メッセージを保存するジャーナルのディレクトリ")
+    parser.add_argument("--journal-retention-days", type=float,
+                        help="ジャーナルを残す日数（超えたセグメントは削除。既定: 削除しない）")
+    parser.add_argument("--replay", help="記録済みメッセージ（ジャーナルのディレクトリまたはJSONL）を再生")
+    parser.add_argument("--speed", default="max", help="リプレイ速度 (例: 1, 10x, max)")
+    parser.add_argument("--server-list-url", default=DEFAULT_SERVER_LIST_URL,
+                        help="サーバーリストAPIのURL（試験サーバー利用時に指定）")
+    parser.add_argument("--redundant", action="store_true", help="2本の接続を同時に維持する冗長接続モード")
+    parser.add_argument("--stale-timeout", type=float, help="hb の応答もデータもない場合に切断とみなす秒数（既定: 90）")
+    parser.add_argument("--max-reconnect-delay", type=float, default=60.0, help="再接続の待ち時間の上限（秒）")
+    parser.add_argument("--metrics-port", type=int, help="Prometheus形式のメトリクスを公開するポート")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="メトリクスの待ち受けアドレス")
+    parser.add_argument("--latency-file", help="遅延のヒストグラムをJSONで書き出すファイル（集計の出力時と終了時に更新）")
+    parser.add_argument("--profile", action="store_true",
+                        help="コールバックと処理段階の所要時間を計測（SIGUSR1 と終了時にログへ出力）")
+    parser.add_argument("--profile-sample", type=int, default=1, help="N回に1回だけ所要時間を計る（回数は毎回数える）")
+    parser.add_argument("--stats-interval", type=float, default=0, help="集計をログへ出力する間隔（秒、0で出力しない）")
+    args = parser.parse_args()
+
+    hub = build_hub(args)
+    broker = None
+    if args.broker_port is not None:
+        broker = FanoutBroker(host=args.broker_host, port=args.broker_port, queue_size=args.broker_queue_size,
+                              max_dropped=args.broker_max_dropped)
+    if not hub.sinks and broker is None:
+        parser.error("出力先（--stdout / --file / --unix-socket / --broker-port）を1つ以上指定してください")
+    if not args.replay and not args.token:
+        parser.error("--token または環境変数 AXIS_TOKEN でアクセストークンを指定してください")
+
+    monitor = HeadlessMonitor(hub, token=args.token, server_list_url=args.server_list_url,
+                              redundant=args.redundant, stale_timeout=args.stale_timeout,
+                              max_reconnect_delay=args.max_reconnect_delay,
+                              journal_dir=None if args.replay else args.journal_dir,
+                              db_path=None if args.replay else args.db, stats_interval=args.stats_interval,
+                              broker=broker, latency_path=args.latency_file, metrics_port=args.metrics_port,
+                              metrics_host=args.metrics_host, retention_days=args.retention_days,
+                              journal_retention_days=args.journal_retention_days,
+                              profiler=CallbackProfiler(sample_every=args.profile_sample) if args.profile else None)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: monitor.stop())
+    if args.profile and hasattr(signal, 'SIGUSR1'):
+        # ログの出力はシグナルハンドラの外（別スレッド）で行う
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=monitor.log_profile,
+                                                                            daemon=True).start())
+
+    if args.replay:
+        monitor.start_replay(args.replay, parse_speed(args.speed))
+    else:
+        monitor.start()
+    monitor.run()
@@ -0,0 +1,202 @@
+import bisect
+import threading
+import time
+
+# 集計する区間（受信から表示までを5つの時刻で区切る）
+#   decode:  フレーム受信 → 解析完了
+#   queue:   解析完了 → ワーカーが取り出す（ディスパッチ待ち）
+#   process: ワーカーが取り出す → 描画待ちへ追加（画面がない場合は通知の完了）
+#   render:  描画待ちへ追加 → 画面へ反映
+#   total:   フレーム受信 → 画面へ反映（画面がない場合は通知の完了）
+#   origin:  電文の発生時刻（origin_time / DateTime） → 画面へ反映
+STAGES = ('decode', 'queue', 'process', 'render', 'total', 'origin')
+STAGE_LABELS = {
+    'decode': "解析",
+    'queue': "待ち",
+    'process': "処理",
+    'render': "描画",
+    'total': "受信→表示",
+    'origin': "発生→表示",
+}
+
+# ヒストグラムのバケット上限（秒）: 10µs から 500秒まで 1-2-5 刻み
+BUCKET_BOUNDS = tuple(mantissa * 10.0 ** exponent for exponent in range(-5, 3) for mantissa in (1, 2, 5))
+
+
+def reference_time(record):
+    """レコードの基準時刻（地震の発生時刻、なければ電文の発表時刻）を返す（不明なら None）"""
+    value = getattr(record, 'origin_time', None)
+    if value is None:
+        value = getattr(record, 'report_time', None)
+    return value
+
+
+def format_duration(seconds):
+    """秒数を µs / ms / s の読みやすい単位にする"""
+    if seconds is None:
+        return "-"
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1.0:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.1f}s"
+
+
+class LatencyHistogram:
+    """固定バケットの遅延ヒストグラム（追加は O(log バケット数)、保持するメモリは件数によらない）"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # 最後は上限を超えた分
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """パーセンタイル値（バケット内は線形補間、データがなければ None）"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                value = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(value, 0.0), self.max)
+            seen += bucket_count
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max if self.count else None,
+            'p50': self.percentile(0.50),
+            'p90': self.percentile(0.90),
+            'p99': self.percentile(0.99),
+            'buckets': list(self.counts),
+        }
+
+
+class LatencyTrace:
+    """1メッセージの各段階の時刻（time.perf_counter()）"""
+
+    __slots__ = ('tracker', 'channel', 'received_at', 'received', 'decoded', 'dispatched', 'enqueued',
+                 'origin_time', 'held', 'finished')
+
+    def __init__(self, tracker, received_at, received):
+        self.tracker = tracker
+        self.channel = None
+        self.received_at = received_at  # 受信時刻（time.time()）: 電文の発生時刻との対応付けに使う
+        self.received = received
+        self.decoded = None
+        self.dispatched = None
+        self.enqueued = None
+        self.origin_time = None
+        self.held = False
+        self.finished = False
+
+    def hold(self):
+        """描画待ちへ追加した時刻を記録し、画面へ反映するまで集計を保留する"""
+        self.enqueued = time.perf_counter()
+        self.held = True
+
+    def finish(self, end=None):
+        """最後の段階を終えたとして集計に加える（2回目以降は何もしない）"""
+        if self.finished:
+            return
+        self.finished = True
+        self.tracker.record(self, end if end is not None else time.perf_counter())
+
+
+class LatencyTracker:
+    """受信から表示までの遅延をチャンネル・区間ごとのヒストグラムに集計する"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}  # チャンネル -> {区間: LatencyHistogram}
+        self.clock_skew_count = 0  # 発生時刻が表示時刻より後だった（時計がずれている）ため集計しなかった件数
+
+    def begin(self, received_at, received=None):
+        """フレーム受信時に呼び、そのメッセージの LatencyTrace を返す"""
+        return LatencyTrace(self, received_at, received if received is not None else time.perf_counter())
+
+    def record(self, trace, end):
+        decoded = trace.decoded if trace.decoded is not None else trace.received
+        dispatched = trace.dispatched if trace.dispatched is not None else decoded
+        total = end - trace.received
+        values = [('decode', decoded - trace.received), ('queue', dispatched - decoded),
+                  ('process', (trace.enqueued if trace.enqueued is not None else end) - dispatched),
+                  ('total', total)]
+        if trace.enqueued is not None:
+            values.append(('render', end - trace.enqueued))
+        skewed = False
+        if trace.origin_time is not None:
+            origin = trace.received_at + total - trace.origin_time
+            if origin >= 0:
+                values.append(('origin', origin))
+            else:
+                skewed = True  # 発生時刻が未来になるのは手元の時計が遅れているため（ヒストグラムには入れない）
+
+        with self._lock:
+            if skewed:
+                self.clock_skew_count += 1
+            histograms = self._channels.get(trace.channel)
+            if histograms is None:
+                histograms = self._channels[trace.channel] = {stage: LatencyHistogram() for stage in STAGES}
+            for stage, seconds in values:
+                histograms[stage].add(seconds)
+
+    def snapshot(self):
+        """{チャンネル: {区間: ヒストグラムの集計}} を返す"""
+        with self._lock:
+            return {channel: {stage: histogram.snapshot() for stage, histogram in histograms.items()}
+                    for channel, histograms in self._channels.items()}
+
+    def summary(self):
+        """{チャンネル: (件数, 受信→表示の p50, p99, 発生→表示の p50)} を返す（統計表示用の軽い集計）"""
+        with self._lock:
+            return {channel: (histograms['total'].count, histograms['total'].percentile(0.50),
+                              histograms['total'].percentile(0.99), histograms['origin'].percentile(0.50))
+                    for channel, histograms in self._channels.items()}
+
+    def reset(self):
+        with self._lock:
+            self._channels = {}
+            self.clock_skew_count = 0
+
+
+def format_latency(summary):
+    """summary() を1行の文字列にする"""
+    if not summary:
+        return ""
+    parts = []
+    for channel, (count, p50, p99, origin_p50) in sorted(summary.items(), key=lambda item: str(item[0])):
+        text = f"{channel} p50 {format_duration(p50)} p99 {format_duration(p99)}"
+        if origin_p50 is not None:
+            text += f" (発生から {format_duration(origin_p50)})"
+        parts.append(text)
+    return f"{STAGE_LABELS['total']}: " + ", ".join(parts)
+
+
+def format_latency_table(snapshot):
+    """snapshot() をチャンネル・区間ごとの複数行の表にする"""
+    lines = []
+    for channel, histograms in sorted(snapshot.items(), key=lambda item: str(item[0])):
+        for stage in STAGES:
+            histogram = histograms[stage]
+            if not histogram['count']:
+                continue
+            lines.append(f"{channel:<16} {STAGE_LABELS[stage]:<8} {histogram['count']:>8}件 "
+                         f"p50 {format_duration(histogram['p50']):>8} p90 {format_duration(histogram['p90']):>8} "
+                         f"p99 {format_duration(histogram['p99']):>8} max {format_duration(histogram['max']):>8}")
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import tkinter as tk
+
+from axis_earthquake_history import EarthquakeHistory
+
+
+class LogView:
+    """Textウィジェットに直近の一定行数だけを保持するログ表示
+
+    行数が max_lines + trim_lines を超えたら先頭から trim_lines 行をまとめて削除し、
+    削除した内容は履歴ストア（EarthquakeHistory）へ移す。
+    history を指定しない場合、履歴ストアがメモリ上の上限を超えた分は一時ファイルへ退避する（close() で削除）。
+    """
+
+    def __init__(self, text_widget, max_lines=5000, trim_lines=1000, history=None):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self.trim_lines = trim_lines
+        self._spill_path = None
+        if history is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="axis_older_log_", suffix=".jsonl")
+            os.close(fd)
+            history = EarthquakeHistory(max_entries=None, max_bytes=4 * 1024 * 1024, spill_path=self._spill_path)
+        self.history = history
+        self.line_count = 0
+        self.trimmed_line_count = 0
+
+    def append(self, text):
+        """文字列を末尾に追加し、必要なら先頭をまとめて削除"""
+        self.text.insert(tk.END, text)
+        self.line_count += text.count("\n")
+        if self.line_count > self.max_lines + self.trim_lines:
+            self._trim(self.line_count - self.max_lines)
+        self.text.see(tk.END)  # 自動スクロール
+
+    def _trim(self, lines):
+        end_index = f"{lines + 1}.0"
+        removed = self.text.get("1.0", end_index)
+        self.text.delete("1.0", end_index)
+        self.history.append(removed, size=len(removed))
+        self.line_count -= lines
+        self.trimmed_line_count += lines
+
+    def clear(self):
+        """表示をクリア（表示中の内容は履歴ストアへ移す）"""
+        removed = self.text.get("1.0", "end-1c")
+        if removed:
+            self.history.append(removed, size=len(removed))
+        self.text.delete("1.0", tk.END)
+        self.line_count = 0
+
+    def older_chunks(self):
+        """表示から外れた過去のログを削除したまとまりごとに新しい順に返す（ディスクへ退避した分を含む）"""
+        return self.history.iter_reversed()
+
+    def close(self):
+        """一時ファイルへ退避した過去のログを削除"""
+        self.history.close()
+        if self._spill_path is not None:
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._spill_path = None
@@ -0,0 +1,113 @@
+import json
+import re
+
+# 高速なJSONライブラリがあれば使う（なければ標準の json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    loads = orjson.loads  # orjson.JSONDecodeError は json.JSONDecodeError のサブクラス
+else:
+    JSON_BACKEND = "json"
+    loads = json.loads
+
+# AXISのフレームは先頭に "channel" があるため、まずは先頭部分だけを探す
+PEEK_HEAD_LENGTH = 256
+# これより短いフレームは正規表現で探すより全体を解析する方が速い（eew など）
+EAGER_PARSE_LENGTH = 2048
+CHANNEL_PATTERN = re.compile(r'"channel"\s*:\s*"([^"]+)"')
+EVENT_ID_PATTERN = re.compile(r'"(?:EventID|event_id|eventId)"\s*:\s*"?([^",}\s]+)')
+SERIAL_PATTERN = re.compile(r'"(?:serial|Serial)"\s*:\s*"?(\d+)')
+MAGNITUDE_PATTERN = re.compile(r'"(?:magnitude|Magnitude)"\s*:\s*"?(-?\d+(?:\.\d+)?)')
+
+
+def peek_channel(raw):
+    """本文を解析せずにチャンネル名だけを取り出す（見つからなければ None）"""
+    match = CHANNEL_PATTERN.search(raw, 0, PEEK_HEAD_LENGTH) or CHANNEL_PATTERN.search(raw)
+    return match.group(1) if match else None
+
+
+class DecodedMessage:
+    """チャンネルと主要項目だけを先に取り出し、本文の解析は必要になるまで遅らせるメッセージ
+
+    eew では EventID・報番号・マグニチュードも先読みする。
+    大きなフレームは content / data に初めてアクセスした時点で全体を解析する（不正なJSONなら ValueError）。
+    EarthquakeModel はワーカーでの処理の最初に data へアクセスし、記録・通知の前に解析できることを確かめる。
+    """
+
+    __slots__ = ('raw', 'channel', 'event_id', 'serial', 'magnitude', '_data')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._data = None
+        self.channel = None
+        self.event_id = None
+        self.serial = None
+        self.magnitude = None
+
+        if len(raw) <= EAGER_PARSE_LENGTH:
+            try:
+                self._from_data(self.data)
+                return
+            except ValueError:
+                self._data = None # 不正なJSONは content へのアクセス時にエラーにする
+
+        self.channel = peek_channel(raw)
+        match = EVENT_ID_PATTERN.search(raw)
+        if match:
+            self.event_id = match.group(1)
+        if self.channel == 'eew':
+            match = SERIAL_PATTERN.search(raw)
+            if match:
+                self.serial = int(match.group(1))
+            match = MAGNITUDE_PATTERN.search(raw)
+            if match:
+                self.magnitude = float(match.group(1))
+
+    def _from_data(self, data):
+        """解析済みの内容から先読み項目を埋める"""
+        self.channel = data.get('channel')
+        content = data.get('message', data)
+        if not isinstance(content, dict):
+            return
+        event_id = content.get('EventID', content.get('event_id', content.get('eventId')))
+        self.event_id = str(event_id) if event_id is not None else None
+        if self.channel == 'eew':
+            serial = content.get('serial', content.get('Serial'))
+            magnitude = content.get('magnitude', content.get('Magnitude'))
+            try:
+                self.serial = int(serial) if serial is not None else None
+                self.magnitude = float(magnitude) if magnitude is not None else None
+            except (TypeError, ValueError):
+                pass
+
+    @property
+    def parsed(self):
+        """本文を解析済みか"""
+        return self._data is not None
+
+    @property
+    def data(self):
+        """フレーム全体を解析した結果"""
+        if self._data is None:
+            data = loads(self.raw)
+            if not isinstance(data, dict):
+                data = {'message': data}
+            self._data = data
+            if self.channel is None:
+                self.channel = data.get('channel')
+        return self._data
+
+    @property
+    def content(self):
+        """message 部分（message キーがない場合はフレーム全体）"""
+        data = self.data
+        return data.get('message', data)
+
+
+def decode(raw):
+    """生メッセージを DecodedMessage にする（この時点では本文を解析しない）"""
+    return DecodedMessage(raw)
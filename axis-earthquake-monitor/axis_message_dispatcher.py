@@ -0,0 +1,131 @@
+import threading
+from collections import deque
+
+# 数字が小さいほど先に処理する（一覧にないチャンネルは最後）
+CHANNEL_PRIORITIES = {
+    'eew': 0,
+    'quake-one': 1,
+    'jmx-seismology': 2,
+}
+DEFAULT_PRIORITY = 3
+
+
+class PriorityDispatcher:
+    """受信スレッドから受け取ったメッセージを、チャンネルごとの優先度付きキューでワーカースレッドへ渡す
+
+    - submit() は待たずに戻る（受信スレッドが描画や保存で止まらない）
+    - 同じチャンネルのメッセージは受信順に1件ずつ処理する
+    - 最優先のチャンネル（eew）には専用のワーカーがあり、大きな電文の処理中でも待たされない
+    - チャンネルごとのキューが max_queue_size を超えたら古いものから捨てる
+    """
+
+    def __init__(self, handler, workers=2, max_queue_size=10000, priorities=None, on_error=None):
+        self.handler = handler  # handler(item) をワーカースレッドで呼ぶ
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.priorities = priorities if priorities is not None else CHANNEL_PRIORITIES
+        self.on_error = on_error  # on_error(exception) 形式のコールバック（任意）
+        self.express_priority = min(self.priorities.values()) if self.priorities else DEFAULT_PRIORITY
+        self.submitted_count = 0
+        self.processed_count = 0
+        self.dropped_count = 0
+        self._queues = {}   # チャンネル -> deque
+        self._busy = set()  # 処理中のチャンネル
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        """ワーカースレッドを開始"""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._threads = [threading.Thread(target=self._run, args=(True,), daemon=True)]
+        self._threads += [threading.Thread(target=self._run, args=(False,), daemon=True)
+                          for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """ワーカースレッドを停止（キューに残っているメッセージは処理しない）"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, channel, item):
+        """メッセージを処理待ちに追加（任意のスレッドから呼べる）"""
+        with self._condition:
+            queue = self._queues.get(channel)
+            if queue is None:
+                queue = self._queues[channel] = deque()
+            queue.append(item)
+            if len(queue) > self.max_queue_size:
+                queue.popleft()
+                self.dropped_count += 1
+            self.submitted_count += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """キューが空になり、処理中のメッセージがなくなるまで待つ（完了したら True）"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._running or (not self._busy and not any(self._queues.values())), timeout)
+
+    @property
+    def backlog(self):
+        """処理待ちの件数"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def queue_depths(self):
+        """チャンネルごとの処理待ち件数"""
+        with self._condition:
+            return {channel: len(queue) for channel, queue in self._queues.items()}
+
+    def _priority(self, channel):
+        return self.priorities.get(channel, DEFAULT_PRIORITY)
+
+    def _next_locked(self, express):
+        """処理中でないチャンネルのうち最も優先度の高いものから1件取り出す"""
+        best = None
+        for channel, queue in self._queues.items():
+            if not queue or channel in self._busy:
+                continue
+            priority = self._priority(channel)
+            if express and priority > self.express_priority:
+                continue
+            if best is None or priority < best[0]:
+                best = (priority, channel)
+        if best is None:
+            return None, None
+        channel = best[1]
+        self._busy.add(channel)
+        return channel, self._queues[channel].popleft()
+
+    def _run(self, express):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                channel, item = self._next_locked(express)
+                while channel is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    channel, item = self._next_locked(express)
+
+            try:
+                self.handler(item)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+            finally:
+                with self._condition:
+                    self._busy.discard(channel)
+                    self.processed_count += 1
+                    self._condition.notify_all()
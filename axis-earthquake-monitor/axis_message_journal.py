@@ -0,0 +1,324 @@
+import hashlib
+import mmap
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+JournalRecord = namedtuple('JournalRecord', ['received_at', 'channel', 'raw'])
+
+# レコード: 受信時刻(float64), チャンネル長(uint16), 本文長(uint32) + チャンネル + 本文
+RECORD_HEADER = struct.Struct('<dHI')
+# インデックス: 受信時刻(float64), セグメント内オフセット(uint64), EventIDハッシュ(uint64)
+INDEX_ENTRY = struct.Struct('<dQQ')
+
+EVENT_ID_PATTERN = re.compile(rb'"(?:EventID|event_id|eventId)"\s*:\s*"?([^",}\s]+)')
+
+
+def event_id_hash(event_id):
+    """EventIDを8バイトのハッシュ値に変換（0は「EventIDなし」を表す）"""
+    if isinstance(event_id, str):
+        event_id = event_id.encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(event_id, digest_size=8).digest(), 'little') or 1
+
+
+def extract_event_id(raw):
+    """生メッセージからEventIDを取り出す（見つからない場合はNone）"""
+    match = EVENT_ID_PATTERN.search(raw)
+    return match.group(1) if match else None
+
+
+class MessageJournal:
+    """生のAXISメッセージをセグメント分割した追記専用ファイルへ保存するジャーナル
+
+    retention_seconds を指定すると、最後のレコードがそれより古いセグメントを削除する。
+    max_segments を指定すると、書き込み中のものを含めて新しい max_segments 個のセグメントだけを残す。
+    削除は書き込みスレッドがセグメントの切り替え時と prune_interval 秒ごとに行う。
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, fsync_interval=1.0,
+                 fsync_batch=512, queue_size=100000, retention_seconds=None, max_segments=None,
+                 prune_interval=60.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.retention_seconds = retention_seconds  # 保存期間（秒）。None は削除しない
+        self.max_segments = max_segments            # 残すセグメント数の上限。None は無制限
+        self.prune_interval = prune_interval
+        self.dropped_count = 0
+        self.written_count = 0
+        self.error_count = 0
+        self.pruned_segment_count = 0  # 削除したセグメント数
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._running = False
+        self._log_file = None
+        self._index_file = None
+        self._segment_size = 0
+        self._segment_number = None  # 書き込み中のセグメント番号
+
+    # --- 書き込み ---
+    def start(self):
+        """書き込みスレッドを開始"""
+        if self._running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, channel, raw, received_at=None):
+        """メッセージを書き込みキューへ追加（呼び出し元はブロックしない）"""
+        if received_at is None:
+            received_at = time.time()
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        try:
+            self._queue.put_nowait((received_at, channel or '', raw))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def flush(self):
+        """キュー内のメッセージがディスクへ書き込まれるまで待つ"""
+        if self._running:
+            self._queue.put((None, None, None))
+            self._queue.join()
+
+    def close(self):
+        """残りのメッセージを書き込んで停止"""
+        if not self._running:
+            return
+        self.flush()
+        self._running = False
+        self._queue.put((None, None, None))
+        self._thread.join(timeout=5)
+        self._close_segment()
+
+    def _writer_loop(self):
+        """キューからまとめて取り出して書き込み、一定件数または一定時間ごとにfsyncする"""
+        pending = 0
+        last_sync = time.monotonic()
+        next_prune = last_sync
+
+        while self._running or not self._queue.empty():
+            if self._prunes() and time.monotonic() >= next_prune:
+                self._prune()
+                next_prune = time.monotonic() + self.prune_interval
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+
+            force_sync = False
+            if item is not None:
+                received_at, channel, raw = item
+                try:
+                    if raw is None:
+                        force_sync = True  # flush() / close() からの同期要求
+                    else:
+                        self._write_record(received_at, channel, raw)
+                        pending += 1
+                except OSError:
+                    self.error_count += 1
+                finally:
+                    self._queue.task_done()
+
+            now = time.monotonic()
+            if pending and (force_sync or pending >= self.fsync_batch or now - last_sync >= self.fsync_interval):
+                self._sync()
+                pending = 0
+                last_sync = now
+            elif force_sync:
+                last_sync = now
+
+    def _write_record(self, received_at, channel, raw):
+        if self._log_file is None or self._segment_size >= self.segment_bytes:
+            self._open_next_segment()
+
+        channel_bytes = channel.encode('utf-8')
+        offset = self._segment_size
+        self._log_file.write(RECORD_HEADER.pack(received_at, len(channel_bytes), len(raw)))
+        self._log_file.write(channel_bytes)
+        self._log_file.write(raw)
+        self._segment_size += RECORD_HEADER.size + len(channel_bytes) + len(raw)
+
+        event_id = extract_event_id(raw)
+        self._index_file.write(INDEX_ENTRY.pack(received_at, offset, event_id_hash(event_id) if event_id else 0))
+        self.written_count += 1
+
+    def _sync(self):
+        for f in (self._log_file, self._index_file):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _open_next_segment(self):
+        self._close_segment()
+        segments = self.segment_numbers()
+        number = segments[-1] + 1 if segments else 1
+        base = os.path.join(self.directory, f"{number:08d}")
+        self._log_file = open(base + ".log", 'ab')
+        self._index_file = open(base + ".idx", 'ab')
+        self._segment_size = 0
+        self._segment_number = number
+        if self._prunes():
+            self._prune()
+
+    def _prunes(self):
+        return self.retention_seconds is not None or self.max_segments is not None
+
+    def _prune(self):
+        """保存期間を過ぎたセグメントと、上限を超えた古いセグメントを削除する（書き込み中のものは残す）"""
+        numbers = self.segment_numbers()
+        candidates = [number for number in numbers if number != self._segment_number]
+        removing = set()
+        if self.max_segments is not None:
+            removing.update(candidates[:max(0, len(numbers) - self.max_segments)])
+        if self.retention_seconds is not None:
+            cutoff = time.time() - self.retention_seconds
+            for number in candidates:
+                last_received_at = self._last_received_at(number)
+                if last_received_at is None:
+                    continue
+                if last_received_at >= cutoff:
+                    break  # 以降のセグメントはさらに新しい
+                removing.add(number)
+        for number in sorted(removing):
+            base = os.path.join(self.directory, f"{number:08d}")
+            try:
+                os.remove(base + ".log")
+                if os.path.exists(base + ".idx"):
+                    os.remove(base + ".idx")
+                self.pruned_segment_count += 1
+            except OSError:
+                self.error_count += 1  # 読み出し中などで削除できない場合は次回やり直す
+
+    def _last_received_at(self, number):
+        """セグメントの最後のレコードの受信時刻（読めなければ None）"""
+        try:
+            with open(os.path.join(self.directory, f"{number:08d}.idx"), 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < INDEX_ENTRY.size:
+                    return None
+                f.seek(size - size % INDEX_ENTRY.size - INDEX_ENTRY.size)
+                return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+        except OSError:
+            return None
+
+    def _close_segment(self):
+        if self._log_file is not None:
+            self._sync()
+            self._log_file.close()
+            self._index_file.close()
+            self._log_file = None
+            self._index_file = None
+
+    # --- 読み出し ---
+    def segment_numbers(self):
+        """既存セグメントの番号を昇順で返す"""
+        if not os.path.isdir(self.directory):
+            return []
+        numbers = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".log" and stem.isdigit():
+                numbers.append(int(stem))
+        return sorted(numbers)
+
+    def _iter_segments(self):
+        """(インデックスのmmap, ログのmmap) をセグメント順に返す"""
+        for number in self.segment_numbers():
+            base = os.path.join(self.directory, f"{number:08d}")
+            if not os.path.exists(base + ".idx"):
+                continue
+            with open(base + ".idx", 'rb') as idx_f, open(base + ".log", 'rb') as log_f:
+                if os.fstat(idx_f.fileno()).st_size < INDEX_ENTRY.size or os.fstat(log_f.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(idx_f.fileno(), 0, access=mmap.ACCESS_READ) as index, \
+                        mmap.mmap(log_f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+                    yield index, log
+
+    @staticmethod
+    def _read_record(log, offset):
+        if offset + RECORD_HEADER.size > len(log):
+            return None  # 書き込み途中のレコード
+        received_at, channel_len, raw_len = RECORD_HEADER.unpack_from(log, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + channel_len + raw_len
+        if end > len(log):
+            return None
+        channel = log[start:start + channel_len].decode('utf-8')
+        return JournalRecord(received_at, channel, log[start + channel_len:end])
+
+    @staticmethod
+    def _bisect_time(index, timestamp):
+        """インデックス中で受信時刻がtimestamp以上となる最初の位置を返す"""
+        lo, hi = 0, len(index) // INDEX_ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_ENTRY.unpack_from(index, mid * INDEX_ENTRY.size)[0] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read_range(self, start=None, end=None):
+        """受信時刻が[start, end)のレコードを順に返す"""
+        for index, log in self._iter_segments():
+            count = len(index) // INDEX_ENTRY.size
+            if end is not None and INDEX_ENTRY.unpack_from(index, 0)[0] >= end:
+                continue
+            if start is not None and INDEX_ENTRY.unpack_from(index, (count - 1) * INDEX_ENTRY.size)[0] < start:
+                continue
+
+            position = self._bisect_time(index, start) if start is not None else 0
+            for i in range(position, count):
+                received_at, offset, _ = INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size)
+                if end is not None and received_at >= end:
+                    break
+                record = self._read_record(log, offset)
+                if record is not None:
+                    yield record
+
+    def find_event(self, event_id):
+        """指定したEventIDを含むレコードを順に返す"""
+        target = event_id_hash(event_id)
+        event_id_bytes = event_id.encode('utf-8') if isinstance(event_id, str) else event_id
+        for index, log in self._iter_segments():
+            for i in range(len(index) // INDEX_ENTRY.size):
+                _, offset, hashed = INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size)
+                if hashed != target:
+                    continue
+                record = self._read_record(log, offset)
+                # ハッシュ衝突に備えて本文のEventIDを確認する
+                if record is not None and extract_event_id(record.raw) == event_id_bytes:
+                    yield record
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AXISメッセージジャーナルの読み出し")
+    parser.add_argument("directory", help="ジャーナルのディレクトリ")
+    parser.add_argument("--event", help="EventIDで検索")
+    parser.add_argument("--since", help="開始時刻 (例: 2025-07-04T12:00:00)")
+    parser.add_argument("--until", help="終了時刻 (例: 2025-07-04T13:00:00)")
+    args = parser.parse_args()
+
+    journal = MessageJournal(args.directory)
+    if args.event:
+        records = journal.find_event(args.event)
+    else:
+        since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+        until = datetime.fromisoformat(args.until).timestamp() if args.until else None
+        records = journal.read_range(since, until)
+
+    for record in records:
+        timestamp = datetime.fromtimestamp(record.received_at).strftime('%Y-%m-%d %H:%M:%S.%f')
+        sys.stdout.write(f"[{timestamp}] {record.channel}: {record.raw.decode('utf-8', 'replace')}\n")
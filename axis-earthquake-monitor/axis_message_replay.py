@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from axis_message_journal import JournalRecord, MessageJournal
+
+
+def load_jsonl_records(path):
+    """JSONLファイルから記録済みメッセージを読み込む
+
+    1行ごとに以下のいずれかの形式を受け付ける:
+      - {"received_at": 受信時刻(UNIX秒), "channel": ..., "raw": 生メッセージ文字列}
+      - データログ退避形式 {"timestamp": "YYYY-MM-DD HH:MM:SS", "channel": ..., "data": {...}}
+      - 生のAXISフレーム {"channel": ..., "message": {...}}（受信時刻なし）
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if 'raw' in entry:
+                yield JournalRecord(entry.get('received_at'), entry.get('channel', ''), entry['raw'])
+            elif 'event_id' in entry and 'received_at' in entry:
+                continue  # 生メッセージを保持していない履歴レコードは再生できない
+            elif 'data' in entry and 'timestamp' in entry:
+                received_at = datetime.strptime(entry['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+                raw = json.dumps({'channel': entry['channel'], 'message': entry['data']}, ensure_ascii=False)
+                yield JournalRecord(received_at, entry['channel'], raw)
+            else:
+                yield JournalRecord(None, entry.get('channel', ''), line)
+
+
+def load_records(path, start=None, end=None):
+    """ジャーナルのディレクトリまたはJSONLファイルから記録済みメッセージを読み込む"""
+    if os.path.isdir(path):
+        return MessageJournal(path).read_range(start, end)
+    return load_jsonl_records(path)
+
+
+class MessageReplay:
+    """記録済みメッセージを on_websocket_message に流し込むリプレイエンジン
+
+    speed=1.0 で実時間、speed=N でN倍速、speed=None または 0 で待ち時間なしで再生する。
+    """
+
+    def __init__(self, model, records, speed=1.0, on_finished=None):
+        self.model = model
+        self.records = records
+        self.speed = speed
+        self.on_finished = on_finished
+        self.replayed_count = 0
+        self.elapsed = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """別スレッドで再生を開始"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """再生を停止"""
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run(self):
+        """再生処理（呼び出し元スレッドで実行）"""
+        start_clock = time.monotonic()
+        first_received_at = None
+
+        for record in self.records:
+            if self._stop_event.is_set():
+                break
+
+            if self.speed and record.received_at is not None:
+                if first_received_at is None:
+                    first_received_at = record.received_at
+                # 記録時の間隔を speed で割った時刻まで待つ
+                delay = (record.received_at - first_received_at) / self.speed - (time.monotonic() - start_clock)
+                if delay > 0 and self._stop_event.wait(delay):
+                    break
+
+            raw = record.raw
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8')
+            self.model.on_websocket_message(None, raw)
+            self.replayed_count += 1
+
+        # 優先度付きキューに残っている分の処理も含めて計測する
+        self.model.flush()
+        self.elapsed = time.monotonic() - start_clock
+        if self.on_finished:
+            self.on_finished(self.summary())
+
+    def summary(self):
+        """再生結果の要約を返す"""
+        rate = self.replayed_count / self.elapsed if self.elapsed > 0 else 0.0
+        return {
+            'replayed_count': self.replayed_count,
+            'elapsed': self.elapsed,
+            'messages_per_second': rate,
+        }
+
+
+def parse_speed(value):
+    """再生速度の指定（"1", "10x", "max"）を数値に変換"""
+    value = value.strip().lower()
+    if value in ("max", "fast", "0"):
+        return None
+    return float(value.rstrip("x"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from axis_earthquake_model import EarthquakeModel
+
+    parser = argparse.ArgumentParser(description="記録済みAXISメッセージのリプレイ")
+    parser.add_argument("path", help="ジャーナルのディレクトリまたはJSONLファイル")
+    parser.add_argument("--speed", default="1", help="再生速度 (例: 1, 10x, max)")
+    parser.add_argument("--quiet", action="store_true", help="受信データを表示しない")
+    args = parser.parse_args()
+
+    def print_data(channel, data):
+        print(f"📡 {channel}: {json.dumps(data, ensure_ascii=False)[:200]}")
+
+    callbacks = {
+        'log_message': lambda message, level: print(f"[{level}] {message}"),
+    }
+    if not args.quiet:
+        callbacks['data_received'] = print_data
+
+    model = EarthquakeModel(callbacks=callbacks)
+    replay = MessageReplay(model, load_records(args.path), speed=parse_speed(args.speed))
+    replay.run()
+
+    summary = replay.summary()
+    total_count, channel_counts = model.stats.counts()
+    print("\n📊 リプレイ結果:")
+    print(f"  再生メッセージ数: {summary['replayed_count']}")
+    print(f"  所要時間: {summary['elapsed']:.3f} 秒")
+    print(f"  スループット: {summary['messages_per_second']:.1f} 件/秒")
+    for channel, count in channel_counts.items():
+        print(f"    - {channel}: {count}件")
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from axis_latency import BUCKET_BOUNDS
+
+# メモリ使用量の取得に使う（Windows にはない）
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 1つのメトリクス（samples は (ラベルの辞書, 値) のリスト。ヒストグラムは (ラベル, LatencyHistogram の集計)）
+Metric = namedtuple('Metric', ['name', 'kind', 'help', 'samples'])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_metrics(metrics):
+    """メトリクスのリストを Prometheus のテキスト形式にする（値が None のサンプルは出力しない）"""
+    lines = []
+    for metric in metrics:
+        samples = [(labels, value) for labels, value in metric.samples if value is not None]
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in samples:
+            if metric.kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(BUCKET_BOUNDS + (float('inf'),), value['buckets']):
+                    cumulative += count
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes():
+    """現在の常駐メモリ（バイト）。取得できない環境では None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # /proc がない環境では最大常駐メモリで代用する（macOS はバイト、それ以外は KiB）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    return None
+
+
+# --- 収集関数（呼ばれるたびに現在の値を Metric のリストで返す） ---
+def model_metrics(model):
+    """EarthquakeModel の受信・接続・処理待ち・履歴・遅延"""
+    total_count, channel_counts = model.stats.counts()
+    last_received = model.stats.last_received
+    reconnect = model.supervisor.snapshot()
+    queue_depths = model.dispatcher.queue_depths() if model.dispatcher is not None else {}
+    metrics = [
+        Metric('axis_messages_received_total', 'counter', "受信したメッセージ数（チャンネル別）",
+               [({'channel': channel}, count) for channel, count in channel_counts.items()]),
+        Metric('axis_decode_errors_total', 'counter', "JSONとして解析できなかったメッセージ数",
+               [({}, model.decode_error_count)]),
+        Metric('axis_last_message_age_seconds', 'gauge', "最後にメッセージを受信してからの秒数",
+               [({}, time.time() - last_received if last_received is not None else None)]),
+        Metric('axis_connected', 'gauge', "サーバーに接続中なら1",
+               [({}, model.connected)]),
+        Metric('axis_connects_total', 'counter', "接続に成功した回数",
+               [({}, reconnect['connect_count'])]),
+        Metric('axis_reconnects_total', 'counter', "切断後に復旧した回数",
+               [({}, reconnect['reconnect_count'])]),
+        Metric('axis_connect_failures_total', 'counter', "接続に失敗した回数",
+               [({}, reconnect['failed_attempts'])]),
+        Metric('axis_stale_disconnects_total', 'counter', "無応答で切断した回数",
+               [({}, reconnect['stale_count'])]),
+        Metric('axis_disconnected_seconds', 'gauge', "切断されてからの秒数（接続中は0）",
+               [({}, reconnect['disconnected_seconds'])]),
+        Metric('axis_heartbeat_rtt_seconds', 'gauge', "最後の hb の往復時間",
+               [({}, reconnect['last_heartbeat_rtt'])]),
+        Metric('axis_heartbeat_rtt_max_seconds', 'gauge', "hb の往復時間の最大値",
+               [({}, reconnect['max_heartbeat_rtt'] if reconnect['heartbeat_count'] else None)]),
+        Metric('axis_eew_ignored_total', 'counter', "追跡で無視した古い・重複した緊急地震速報の数",
+               [({}, model.eew_tracker.ignored_count)]),
+        Metric('axis_dispatch_queue_depth', 'gauge', "ワーカーの処理待ち件数（チャンネル別）",
+               [({'channel': channel}, depth) for channel, depth in queue_depths.items()]),
+        Metric('axis_history_entries', 'gauge', "データログに保持している件数",
+               [({}, len(model.data_log))]),
+        Metric('axis_history_bytes', 'gauge', "データログに保持しているレコードのおおよそのメモリ量（バイト）",
+               [({}, model.data_log.total_bytes)]),
+        Metric('axis_latency_clock_skew_total', 'counter', "発生時刻が表示時刻より後だったため発生→表示の遅延に入れなかった件数",
+               [({}, model.latency.clock_skew_count)]),
+        Metric('axis_latency_seconds', 'histogram', "受信から表示までの区間ごとの遅延（axis_latency.STAGES）",
+               [({'channel': channel, 'stage': stage}, histogram)
+                for channel, histograms in model.latency.snapshot().items()
+                for stage, histogram in histograms.items() if histogram['count']]),
+    ]
+    if model.profiler is not None:
+        metrics += profiler_metrics(model.profiler)
+    if model.store is not None:
+        metrics += [
+            Metric('axis_store_backlog', 'gauge', "データベースへの書き込み待ち件数", [({}, model.store.backlog)]),
+            Metric('axis_store_dropped_total', 'counter', "書き込みキューがあふれて捨てた件数",
+                   [({}, model.store.dropped_count)]),
+            Metric('axis_store_pruned_total', 'counter', "保存期間を過ぎて削除した件数", [({}, model.store.pruned_count)]),
+        ]
+    return metrics
+
+
+def profiler_metrics(profiler):
+    """CallbackProfiler のコールバック・処理段階ごとの呼び出し回数と所要時間"""
+    report = profiler.report()
+    return [
+        Metric('axis_callback_calls_total', 'counter', "コールバック・処理段階の呼び出し回数",
+               [({'name': row['name']}, row['calls']) for row in report]),
+        Metric('axis_callback_seconds_total', 'counter', "コールバック・処理段階の所要時間の合計（間引き時は推定）",
+               [({'name': row['name']}, row['total']) for row in report]),
+        Metric('axis_callback_max_seconds', 'gauge', "コールバック・処理段階の所要時間の最大値",
+               [({'name': row['name']}, row['max']) for row in report]),
+    ]
+
+
+def renderer_metrics(renderer):
+    """RenderScheduler の描画待ち件数・描画回数・捨てた行数"""
+    return [
+        Metric('axis_gui_backlog', 'gauge', "画面への描画待ち件数", [({}, renderer.backlog)]),
+        Metric('axis_gui_frames_total', 'counter', "描画したフレーム数", [({}, renderer.frame_count)]),
+        Metric('axis_gui_dropped_total', 'counter', "描画待ちがあふれて捨てたログの行数", [({}, renderer.dropped_count)]),
+    ]
+
+
+def sink_metrics(hub):
+    """SinkHub の出力先ごとの出力・破棄・書き込み待ち件数"""
+    snapshots = hub.snapshot()
+    return [
+        Metric('axis_sink_written_total', 'counter', "出力先へ書き出した件数",
+               [({'sink': s['name']}, s['written']) for s in snapshots]),
+        Metric('axis_sink_dropped_total', 'counter', "出力先のバッファがあふれて捨てた件数",
+               [({'sink': s['name']}, s['dropped']) for s in snapshots]),
+        Metric('axis_sink_backlog', 'gauge', "出力先への書き込み待ち件数",
+               [({'sink': s['name']}, s['backlog']) for s in snapshots]),
+    ]
+
+
+def broker_metrics(broker):
+    """FanoutBroker のクライアント数と配信件数"""
+    snapshot = broker.snapshot()
+    return [
+        Metric('axis_fanout_clients', 'gauge', "再配信の接続中クライアント数", [({}, snapshot['clients'])]),
+        Metric('axis_fanout_delivered_total', 'counter', "クライアントへ送った件数", [({}, snapshot['delivered'])]),
+        Metric('axis_fanout_dropped_total', 'counter', "送信が追いつかず捨てた件数", [({}, snapshot['dropped'])]),
+        Metric('axis_fanout_backlog', 'gauge', "クライアントごとのキューに溜まっている件数の合計",
+               [({}, snapshot['backlog'])]),
+    ]
+
+
+def process_metrics():
+    """プロセスのメモリ・CPU時間・スレッド数"""
+    return [
+        Metric('process_resident_memory_bytes', 'gauge', "常駐メモリ（バイト）", [({}, resident_memory_bytes())]),
+        Metric('process_cpu_seconds_total', 'counter', "CPU時間（秒）", [({}, time.process_time())]),
+        Metric('axis_threads', 'gauge', "動作中のスレッド数", [({}, threading.active_count())]),
+    ]
+
+
+class MetricsRegistry:
+    """収集関数をまとめ、呼ばれた時点の値を Prometheus のテキスト形式で返す"""
+
+    def __init__(self):
+        self.collectors = []
+        self.error_count = 0
+
+    def add(self, collector):
+        """collector() は Metric のリストを返す関数"""
+        self.collectors.append(collector)
+        return collector
+
+    def collect(self):
+        metrics = []
+        for collector in self.collectors:
+            try:
+                metrics.extend(collector())
+            except Exception:
+                # 1つの収集に失敗しても残りは返す
+                self.error_count += 1
+        metrics.append(Metric('axis_metrics_collect_errors_total', 'counter', "メトリクスの収集に失敗した回数",
+                              [({}, self.error_count)]))
+        return metrics
+
+    def render(self):
+        return render_metrics(self.collect())
+
+
+class MetricsServer:
+    """GET /metrics に Prometheus のテキスト形式で応答するHTTPサーバー（別スレッドで動く）"""
+
+    def __init__(self, registry, host='127.0.0.1', port=9464, log=None):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.log = log  # log(message, level) 形式のコールバック（任意）
+        self.request_count = 0
+        self._server = None
+
+    def start(self):
+        """待ち受けを開始（ポートが使えない場合は OSError）"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                server.request_count += 1
+                body = server.registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # アクセスログは出さない
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        if self.log:
+            self.log(f"📈 メトリクスを公開しています (http://{self.host}:{self.port}/metrics)", "INFO")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,259 @@
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from axis_websocket_frames import (
+    OP_CLOSE, OP_TEXT, accept_key, encode_frame, parse_http_head, read_message, socket_reader
+)
+
+
+class _MockClient:
+    """接続中のクライアント（送信は専用スレッドで行い、遅いクライアントが配信を止めないようにする）"""
+
+    def __init__(self, sock, queue_size):
+        self.sock = sock
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped_count = 0
+        self.sent_count = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send_frame(self, payload, opcode=OP_TEXT):
+        with self._lock:
+            self.sock.sendall(encode_frame(payload, opcode))
+
+    def enqueue(self, text):
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def writer_loop(self):
+        while not self.closed:
+            text = self.queue.get()
+            if text is None:
+                break
+            # 溜まっているフレームはまとめて送信する
+            frames = [encode_frame(text)]
+            while len(frames) < 256:
+                try:
+                    text = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if text is None:
+                    self.closed = True
+                    break
+                frames.append(encode_frame(text))
+            try:
+                with self._lock:
+                    self.sock.sendall(b"".join(frames))
+                self.sent_count += len(frames)
+            except OSError:
+                break
+        self.closed = True
+
+
+class MockAXISServer:
+    """AXIS互換のWebSocketサーバー（ローカルでの試験・負荷試験用）
+
+    - GET /api/server/list/ でサーバーリストを返す
+    - /socket へのWebSocket接続に "hello" を送り、以降 "hb" とチャンネルのフレームを配信する
+    - クライアントからの "hb" にはそのまま "hb" を返す
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, token=None, heartbeat_interval=30.0, client_queue_size=100000):
+        self.host = host
+        self.port = port
+        self.token = token  # 指定時は Authorization ヘッダーを検証する
+        self.heartbeat_interval = heartbeat_interval
+        self.client_queue_size = client_queue_size
+        self.clients = []
+        self.sent_count = 0
+        self._clients_lock = threading.Lock()
+        self._server = None
+        self._running = False
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def server_list_url(self):
+        return f"http://{self.host}:{self.port}/api/server/list/"
+
+    def start(self):
+        """サーバーを別スレッドで起動"""
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle_connection(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._running = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        """サーバーを停止"""
+        self._running = False
+        with self._clients_lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.queue.put(None)
+            try:
+                client.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # --- 接続処理 ---
+    def _handle_connection(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        head = b""
+        while b"\r\n\r\n" not in head:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return
+            head += chunk
+        request_line, headers = parse_http_head(head.split(b"\r\n\r\n", 1)[0])
+        method, path = request_line.split(" ")[:2]
+
+        if self.token and headers.get('authorization') != f"Bearer {self.token}":
+            self._send_http(sock, 401, {'error': 'unauthorized'})
+            return
+
+        if headers.get('upgrade', '').lower() == 'websocket':
+            self._handle_websocket(sock, headers)
+        elif method == 'GET' and path.rstrip('/') == '/api/server/list':
+            self._send_http(sock, 200, {'servers': [self.url]})
+        else:
+            self._send_http(sock, 404, {'error': 'not found'})
+
+    @staticmethod
+    def _send_http(sock, status, body):
+        reasons = {200: 'OK', 401: 'Unauthorized', 404: 'Not Found'}
+        payload = json.dumps(body).encode('utf-8')
+        sock.sendall(
+            f"HTTP/1.1 {status} {reasons[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + payload
+        )
+
+    def _handle_websocket(self, sock, headers):
+        sock.sendall(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n".encode('latin-1')
+        )
+
+        client = _MockClient(sock, self.client_queue_size)
+        client.send_frame("hello")
+        with self._clients_lock:
+            self.clients.append(client)
+        threading.Thread(target=client.writer_loop, daemon=True).start()
+
+        read_exact = socket_reader(sock)
+        try:
+            while self._running and not client.closed:
+                opcode, payload = read_message(read_exact, client.send_frame)
+                if opcode == OP_CLOSE:
+                    client.send_frame(payload, OP_CLOSE)
+                    break
+                if payload == b"hb":
+                    client.enqueue("hb")
+        except (EOFError, OSError):
+            pass
+        finally:
+            client.queue.put(None)
+            with self._clients_lock:
+                if client in self.clients:
+                    self.clients.remove(client)
+
+    def _heartbeat_loop(self):
+        while self._running:
+            time.sleep(self.heartbeat_interval)
+            self.broadcast_raw("hb")
+
+    # --- 配信 ---
+    def broadcast_raw(self, text):
+        """全クライアントへ文字列フレームを配信"""
+        with self._clients_lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.enqueue(text)
+        self.sent_count += 1
+
+    def broadcast(self, channel, message):
+        """全クライアントへチャンネルのメッセージを配信"""
+        self.broadcast_raw(json.dumps({'channel': channel, 'message': message}, ensure_ascii=False))
+
+    def play(self, frames, speed=1.0, stop_event=None):
+        """(開始からの秒数, フレーム文字列) の列を配信（speed=None で待ち時間なし）"""
+        start = time.monotonic()
+        for offset, text in frames:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if speed:
+                delay = offset / speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.broadcast_raw(text)
+        return time.monotonic() - start
+
+    def wait_for_clients(self, count=1, timeout=10.0):
+        """指定数のクライアントが接続するまで待つ"""
+        deadline = time.monotonic() + timeout
+        while len(self.clients) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.clients) >= count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from axis_message_replay import parse_speed
+    from axis_synthetic_load import PROFILES, build_profile
+
+    parser = argparse.ArgumentParser(description="AXIS互換のローカル試験サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=PROFILES, default="aftershock", help="負荷プロファイル")
+    parser.add_argument("--rate", type=float, default=1000.0, help="件数/秒（constant）または余震数・続報数")
+    parser.add_argument("--duration", type=float, default=60.0, help="プロファイルの長さ（秒）")
+    parser.add_argument("--speed", default="1", help="再生速度 (例: 1, 60, max)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--heartbeat", type=float, default=30.0, help="hb の送信間隔（秒）")
+    parser.add_argument("--repeat", action="store_true", help="プロファイルを繰り返し配信")
+    args = parser.parse_args()
+
+    server = MockAXISServer(args.host, args.port, heartbeat_interval=args.heartbeat).start()
+    print(f"🚀 試験サーバー起動: {server.url}/socket")
+    print(f"📋 サーバーリスト: {server.server_list_url}")
+    speed = parse_speed(args.speed)
+
+    try:
+        server.wait_for_clients(1, timeout=float("inf"))
+        while True:
+            frames = build_profile(args.profile, seed=args.seed, rate=args.rate, duration=args.duration)
+            print(f"📡 {args.profile}: {len(frames)}件を配信します")
+            elapsed = server.play(frames, speed=speed)
+            print(f"✅ 配信完了: {len(frames)}件 / {elapsed:.2f}秒 ({len(frames) / max(elapsed, 1e-9):.0f}件/秒)")
+            if not args.repeat:
+                break
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n👋 サーバーを停止します")
+        server.stop()
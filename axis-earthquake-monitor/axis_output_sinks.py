@@ -0,0 +1,266 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+
+def event_line(channel, event_id, raw, received_at):
+    """受信メッセージを1行のJSONにする（本文は解析し直さずにそのまま埋め込む）
+
+    raw はJSONとして解析できたフレームに限る（EarthquakeModel は解析できたフレームだけを message_received で通知する）。
+    緊急地震速報の追跡で無視した古い報・重複した報も通知されるため、受け手は serial で判断する。
+    """
+    if '\n' in raw or '\r' in raw:
+        # JSONの文字列中に改行は現れないため、改行は空白に置き換えてよい
+        raw = raw.replace('\r', ' ').replace('\n', ' ')
+    header = json.dumps({'received_at': received_at, 'channel': channel, 'event_id': event_id}, ensure_ascii=False)
+    return f'{header[:-1]}, "frame": {raw}}}\n'
+
+
+class Sink:
+    """出力先の基底クラス
+
+    受け取った行はシンクごとのバッファに溜め、専用スレッドでまとめて write_lines() に渡す。
+    バッファが buffer_size を超えたら古い行から捨てるため、遅い出力先があっても受信処理は止まらない。
+    """
+
+    name = "sink"
+
+    def __init__(self, buffer_size=10000, batch_size=500):
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size  # 1回の write_lines() に渡す最大行数
+        self.written_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+        self.last_error = None
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._busy = False
+
+    def start(self):
+        """出力スレッドを開始"""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self.open()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, line):
+        """行をバッファに追加（任意のスレッドから呼べる。待たずに戻る）"""
+        with self._condition:
+            self._buffer.append(line)
+            if len(self._buffer) > self.buffer_size:
+                self._buffer.popleft()
+                self.dropped_count += 1
+            self._condition.notify()
+
+    def flush(self, timeout=None):
+        """バッファが空になり書き込みが終わるまで待つ（完了したら True）"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._running or (not self._buffer and not self._busy),
+                                            timeout)
+
+    def close(self, timeout=5.0):
+        """残りの行を書き出して停止"""
+        if not self._running:
+            return
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self.close_output()
+
+    @property
+    def backlog(self):
+        """書き込み待ちの行数"""
+        with self._condition:
+            return len(self._buffer)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._buffer:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                count = min(len(self._buffer), self.batch_size)
+                lines = [self._buffer.popleft() for _ in range(count)]
+                self._busy = True
+
+            try:
+                self.write_lines(lines)
+                self.written_count += len(lines)
+            except Exception as e:
+                # 出力先の障害では受信を止めない（その分の行は捨てる）
+                self.error_count += 1
+                self.dropped_count += len(lines)
+                self.last_error = e
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def snapshot(self):
+        """出力件数・破棄件数などの集計"""
+        return {
+            'name': self.name,
+            'written': self.written_count,
+            'dropped': self.dropped_count,
+            'errors': self.error_count,
+            'backlog': self.backlog,
+            'last_error': str(self.last_error) if self.last_error else None,
+        }
+
+    # --- サブクラスで実装する ---
+    def open(self):
+        """出力先を開く（出力スレッドの開始前に呼ばれる）"""
+
+    def write_lines(self, lines):
+        """行のリストを書き出す（出力スレッドから呼ばれる）"""
+        raise NotImplementedError
+
+    def close_output(self):
+        """出力先を閉じる"""
+
+
+class StdoutSink(Sink):
+    """標準出力へJSONLで書き出す"""
+
+    name = "stdout"
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream if stream is not None else sys.stdout
+
+    def write_lines(self, lines):
+        self.stream.write("".join(lines))
+        self.stream.flush()
+
+
+class RotatingFileSink(Sink):
+    """ファイルへJSONLで書き出し、max_bytes を超えたら path.1, path.2 ... へ回す"""
+
+    name = "file"
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, backup_count=5, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def write_lines(self, lines):
+        data = "".join(lines)
+        size = len(data.encode('utf-8'))
+        if self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += size
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for number in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{number}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{number + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._size = 0
+
+    def close_output(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class UnixSocketSink(Sink):
+    """UNIXドメインソケットで待ち受けている受け手へJSONLを送る（切断時は retry_interval 秒ごとに再接続）"""
+
+    name = "unix"
+
+    def __init__(self, path, retry_interval=5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.retry_interval = retry_interval
+        self._socket = None
+        self._next_retry = 0.0
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_retry:
+            raise ConnectionError(f"{self.path} に再接続するまで待機中")
+        self._next_retry = now + self.retry_interval
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def write_lines(self, lines):
+        if self._socket is None:
+            self._socket = self._connect()
+        try:
+            self._socket.sendall("".join(lines).encode('utf-8'))
+        except OSError:
+            self.close_output()
+            raise
+
+    def close_output(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class SinkHub:
+    """1つの受信メッセージを全ての出力先へ配る"""
+
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks) if sinks else []
+        self.published_count = 0
+
+    def add(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+        return self
+
+    def publish(self, channel, event_id, raw, received_at):
+        """メッセージを1行に変換し、各出力先のバッファへ入れる"""
+        line = event_line(channel, event_id, raw, received_at)
+        for sink in self.sinks:
+            sink.submit(line)
+        self.published_count += 1
+
+    def flush(self, timeout=None):
+        return all(sink.flush(timeout) for sink in self.sinks)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def snapshot(self):
+        return [sink.snapshot() for sink in self.sinks]
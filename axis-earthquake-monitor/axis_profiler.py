@@ -0,0 +1,131 @@
+import functools
+import threading
+import time
+
+from axis_latency import LatencyHistogram, format_duration
+
+
+class _CallStats:
+    """1つのコールバック・処理段階の呼び出し回数と所要時間"""
+
+    __slots__ = ('name', 'calls', 'errors', 'histogram', 'lock')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()  # 計測した呼び出しの所要時間
+        self.lock = threading.Lock()
+
+
+class CallbackProfiler:
+    """コールバックや処理段階の関数を包み、呼び出し回数と所要時間を集計する
+
+    - wrap() で包んだ関数だけが計測される（包まなければ負担はない）
+    - sample_every=N の場合は N 回に1回だけ時間を計る（回数は毎回数える）
+    - timing=False の場合は回数だけを数える
+    """
+
+    def __init__(self, sample_every=1, timing=True):
+        self.sample_every = max(1, int(sample_every))
+        self.timing = timing
+        self.started_at = time.monotonic()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, name):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _CallStats(name)
+            return stats
+
+    def wrap(self, name, func):
+        """func を計測付きの関数にして返す"""
+        stats = self._stats_for(name)
+
+        if not self.timing:
+            @functools.wraps(func)
+            def counted(*args, **kwargs):
+                with stats.lock:
+                    stats.calls += 1
+                return func(*args, **kwargs)
+            return counted
+
+        sample_every = self.sample_every
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            # 複数のスレッドから呼ばれるため、回数の更新と間引きの判定はロックの中で行う
+            with stats.lock:
+                stats.calls += 1
+                sampled = sample_every <= 1 or stats.calls % sample_every == 0
+            start = perf_counter() if sampled else None
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                with stats.lock:
+                    stats.errors += 1
+                raise
+            finally:
+                if sampled:
+                    elapsed = perf_counter() - start
+                    with stats.lock:
+                        stats.histogram.add(elapsed)
+        return timed
+
+    def wrap_callbacks(self, callbacks, prefix="callback."):
+        """コールバックの辞書の各関数を包んだ新しい辞書を返す"""
+        return {key: self.wrap(prefix + key, func) for key, func in callbacks.items()}
+
+    def report(self):
+        """名前ごとの集計を所要時間の合計（推定）が大きい順のリストで返す"""
+        with self._lock:
+            stats_list = list(self._stats.values())
+        elapsed = time.monotonic() - self.started_at
+        rows = []
+        for stats in stats_list:
+            with stats.lock:
+                histogram = stats.histogram
+                timed = histogram.count
+                row = {
+                    'name': stats.name,
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'timed_calls': timed,
+                    'mean': histogram.sum / timed if timed else None,
+                    'p50': histogram.percentile(0.50),
+                    'p99': histogram.percentile(0.99),
+                    'max': histogram.max if timed else None,
+                }
+            # 間引いて計測した場合は平均から全呼び出し分を推定する
+            row['total'] = row['mean'] * stats.calls if timed else None
+            row['share'] = row['total'] / elapsed if timed and elapsed > 0 else None
+            rows.append(row)
+        rows.sort(key=lambda row: (row['total'] or 0.0, row['calls']), reverse=True)
+        return rows
+
+    def reset(self):
+        """集計をやり直す（包んだ関数はそのまま使える）"""
+        with self._lock:
+            for stats in self._stats.values():
+                with stats.lock:
+                    stats.calls = 0
+                    stats.errors = 0
+                    stats.histogram = LatencyHistogram()
+            self.started_at = time.monotonic()
+
+
+def format_profile(report):
+    """report() を表にする（share は経過時間に対する所要時間の割合）"""
+    if not report:
+        return "計測対象がありません"
+    lines = [f"{'名前':<32} {'回数':>9} {'合計':>9} {'平均':>9} {'p99':>9} {'最大':>9} {'割合':>6}"]
+    for row in report:
+        share = f"{row['share'] * 100:.1f}%" if row['share'] is not None else "-"
+        errors = f"  (例外 {row['errors']})" if row['errors'] else ""
+        lines.append(f"{row['name']:<32} {row['calls']:>9} {format_duration(row['total']):>9} "
+                     f"{format_duration(row['mean']):>9} {format_duration(row['p99']):>9} "
+                     f"{format_duration(row['max']):>9} {share:>6}{errors}")
+    return "\n".join(lines)
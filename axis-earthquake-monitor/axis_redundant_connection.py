@@ -0,0 +1,225 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import websocket
+
+from axis_connection_manager import StallWatchdog
+from axis_connection_supervisor import ConnectionSupervisor
+from axis_message_decoder import EVENT_ID_PATTERN, SERIAL_PATTERN, peek_channel
+
+
+def dedup_key(message):
+    """重複判定のキーを作る
+
+    eew はチャンネル + EventID + 報番号、それ以外は同一電文の判定のため本文のハッシュも含める。
+    """
+    channel = peek_channel(message) or ''
+    match = EVENT_ID_PATTERN.search(message)
+    event_id = match.group(1) if match else None
+
+    if channel == 'eew' and event_id:
+        match = SERIAL_PATTERN.search(message)
+        if match:
+            return (channel, event_id, match.group(1))
+    digest = hashlib.blake2b(message.encode('utf-8'), digest_size=12).digest()
+    return (channel, event_id, digest)
+
+
+class FrameDeduplicator:
+    """複数経路から届いたフレームのうち最初の1件だけを通し、経路ごとの先着状況を集計する"""
+
+    def __init__(self, max_keys=20000):
+        self.max_keys = max_keys
+        self._seen = OrderedDict()  # キー -> (先着した経路, 受信時刻)
+        self._lock = threading.Lock()
+        self.unique_count = 0
+        self.duplicate_count = 0
+        self.wins = {}
+        self.lead_total = {}
+        self.lead_max = {}
+
+    def accept(self, path, message, received_at=None):
+        """初めて届いたフレームなら True を返す"""
+        if received_at is None:
+            received_at = time.monotonic()
+        key = dedup_key(message)
+
+        with self._lock:
+            first = self._seen.get(key)
+            if first is None:
+                self._seen[key] = (path, received_at)
+                if len(self._seen) > self.max_keys:
+                    self._seen.popitem(last=False)
+                self.unique_count += 1
+                return True
+
+            # 後着のコピー: 先着した経路の勝ちとして差を記録
+            winner, first_received_at = first
+            if winner != path:
+                lead = received_at - first_received_at
+                self.wins[winner] = self.wins.get(winner, 0) + 1
+                self.lead_total[winner] = self.lead_total.get(winner, 0.0) + lead
+                self.lead_max[winner] = max(self.lead_max.get(winner, 0.0), lead)
+            self.duplicate_count += 1
+            return False
+
+    def report(self):
+        """経路ごとの先着件数と先行時間の要約を返す"""
+        with self._lock:
+            return {
+                'unique_count': self.unique_count,
+                'duplicate_count': self.duplicate_count,
+                'paths': {
+                    path: {
+                        'wins': wins,
+                        'mean_lead_ms': self.lead_total[path] / wins * 1000,
+                        'max_lead_ms': self.lead_max[path] * 1000,
+                    }
+                    for path, wins in self.wins.items()
+                },
+            }
+
+
+class RedundantConnection:
+    """2本の接続を同時に維持し、重複を除いたフレームを先着順に Model へ渡すホットスタンバイ接続"""
+
+    def __init__(self, model, servers, link_count=2, supervisor=None):
+        self.model = model
+        self.servers = list(servers)
+        self.link_count = link_count
+        self.supervisor = supervisor if supervisor else ConnectionSupervisor()
+        self.dedup = FrameDeduplicator()
+        self.links = {}  # 経路番号 -> 接続中のサーバー
+        self._sockets = {}
+        self._open_links = set()
+        self._deliver_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """全経路を開始し、停止されるまで待つ"""
+        threads = []
+        for index in range(self.link_count):
+            # 可能な限り異なるサーバーへ接続する
+            server = self.servers[index % len(self.servers)]
+            thread = threading.Thread(target=self._run_link, args=(index + 1, server), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+    def stop(self):
+        """全経路を切断"""
+        self._stop_event.set()
+        with self._state_lock:
+            sockets = list(self._sockets.values())
+        for ws in sockets:
+            ws.close()
+
+    def report(self):
+        """重複除去と経路ごとの先着状況"""
+        report = self.dedup.report()
+        with self._state_lock:
+            report['links'] = dict(self.links)
+            report['open_links'] = sorted(self._open_links)
+        return report
+
+    def _next_server(self, path, current):
+        """他の経路が使っていないサーバーを優先して次の接続先を選ぶ"""
+        with self._state_lock:
+            in_use = {server for other, server in self.links.items() if other != path}
+        start = self.servers.index(current) if current in self.servers else -1
+        for offset in range(1, len(self.servers) + 1):
+            candidate = self.servers[(start + offset) % len(self.servers)]
+            if candidate not in in_use:
+                return candidate
+        return self.servers[(start + 1) % len(self.servers)]
+
+    def _run_link(self, path, server):
+        backoff = self.supervisor.new_backoff()  # 経路ごとに独立して待ち時間を伸ばす
+        while not self._stop_event.is_set():
+            url = server + "/socket"
+            with self._state_lock:
+                self.links[path] = server
+            self.model._notify_log_message(f"[経路{path}] 接続先サーバー: {url}", "INFO")
+
+            ws = websocket.WebSocketApp(
+                url,
+                header=[f"Authorization: Bearer {self.model.token}"],
+                on_message=lambda ws, message: self._on_message(path, ws, message),
+                on_error=lambda ws, error: self.model._notify_log_message(f"[経路{path}] ❌ WebSocketエラー: {error}", "ERROR"),
+                on_close=lambda ws, code, msg: self._on_close(path),
+                on_open=lambda ws: self._on_open(path, ws, backoff),
+                on_pong=lambda ws, data: ws.watchdog.touch()
+            )
+            with self._state_lock:
+                self._sockets[path] = ws
+
+            def on_stall(idle):
+                self.supervisor.record_stale()
+                self.model._notify_log_message(f"[経路{path}] ⏱️ {idle:.0f}秒間受信がないため再接続します", "WARNING")
+                ws.close()
+
+            watchdog = StallWatchdog(self.supervisor.stale_timeout, on_stall).start()
+            ws.watchdog = watchdog
+            try:
+                ws.run_forever(ping_interval=60, ping_timeout=10)
+            finally:
+                watchdog.stop()
+
+            if self._stop_event.wait(backoff.next_delay()):
+                break
+            server = self._next_server(path, server)
+
+        with self._state_lock:
+            self._sockets.pop(path, None)
+            self.links.pop(path, None)
+
+    def _on_open(self, path, ws, backoff):
+        backoff.reset()
+        with self._state_lock:
+            self._open_links.add(path)
+            open_count = len(self._open_links)
+        self.model.connected = True
+        self.model._notify_log_message(f"[経路{path}] 🌐 AXISサーバーに接続しました", "SUCCESS")
+        self.model._notify_status_update(f"🟢 接続中 (冗長 {open_count}/{self.link_count})")
+        if open_count == 1:
+            self.model._notify_connection_established()
+
+        def heartbeat():
+            while not self._stop_event.is_set() and ws.sock and ws.sock.connected:
+                try:
+                    ws.send('hb')
+                    self.supervisor.record_heartbeat_sent(path)
+                except Exception:
+                    break
+                self._stop_event.wait(self.supervisor.heartbeat_interval)
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+
+    def _on_close(self, path):
+        with self._state_lock:
+            self._open_links.discard(path)
+            open_count = len(self._open_links)
+        if self._stop_event.is_set():
+            return
+        self.model._notify_log_message(f"[経路{path}] 🔌 サーバーとの接続が終了しました", "WARNING")
+        if open_count:
+            self.model._notify_status_update(f"🟢 接続中 (冗長 {open_count}/{self.link_count})")
+        else:
+            self.model.connected = False
+            self.model._notify_status_update("🟡 再接続中")
+
+    def _on_message(self, path, ws, message):
+        ws.watchdog.touch()
+        if message == "hb":
+            self.supervisor.record_heartbeat_received(path)
+            return
+        if message == "hello":
+            return
+        received_at = time.monotonic()
+        with self._deliver_lock:
+            if self.dedup.accept(path, message, received_at):
+                self.model.on_websocket_message(ws, message)
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+
+
+class RenderScheduler:
+    """Modelからの更新をキューに溜め、一定のフレームレートでまとめてGUIへ反映する
+
+    ログ行とデータは任意のスレッドで整形してキューに入れ、1フレームにつき1回の挿入で描画する。
+    ステータス・統計情報・緊急地震速報の一覧は最新の値だけを反映する。
+    LatencyTrace を添えて追加した行は、画面へ反映した時点で遅延の集計に加える。
+    描画待ちが max_backlog を超えたら古い行から捨て、捨てた行数を1行にまとめて表示する。
+    緊急地震速報の行は別のキューに入れ、捨てずに毎フレーム先に描画する。
+    """
+
+    def __init__(self, root, gui, max_fps=30, max_items_per_frame=500, max_backlog=5000):
+        self.root = root
+        self.gui = gui
+        self.max_fps = max_fps
+        self.max_items_per_frame = max_items_per_frame  # 1フレームで描画する最大件数（残りは次フレーム）
+        self.max_backlog = max_backlog  # 描画待ちの上限（緊急地震速報の行は含まない）
+        self.frame_count = 0
+        self.rendered_count = 0
+        self.dropped_count = 0  # 描画待ちがあふれて捨てた行数
+        self._texts = deque()
+        self._urgent = deque()  # 緊急地震速報の行
+        self._dropped_pending = 0  # まだ画面へ知らせていない捨てた行数
+        self._lock = threading.Lock()
+        self._status = None
+        self._stats = None
+        self._eew = None
+        self._after_id = None
+        self._running = False
+
+    @property
+    def interval_ms(self):
+        return max(1, int(1000 / self.max_fps))
+
+    @property
+    def backlog(self):
+        """描画待ちの件数"""
+        with self._lock:
+            return len(self._texts) + len(self._urgent)
+
+    # --- 任意のスレッドから呼ばれる ---
+    def post_log(self, message, level, trace=None, urgent=False):
+        """ログメッセージを描画待ちに追加（urgent=True の行は捨てずに先に描画する）"""
+        self._put(self.gui.format_log_message(message, level), trace, urgent)
+
+    def post_data(self, channel, data, trace=None):
+        """地震データを整形して描画待ちに追加"""
+        self._put(self.gui.format_earthquake_data(channel, data), trace, channel == 'eew')
+
+    def _put(self, text, trace, urgent=False):
+        if trace is not None:
+            trace.hold()
+        with self._lock:
+            if urgent:
+                self._urgent.append((text, trace))
+                return
+            self._texts.append((text, trace))
+            if len(self._texts) > self.max_backlog:
+                # 捨てた行の LatencyTrace は画面へ反映されないため集計しない
+                self._texts.popleft()
+                self.dropped_count += 1
+                self._dropped_pending += 1
+
+    def post_status(self, status_text):
+        """ステータスを更新（次のフレームで最新値のみ反映）"""
+        with self._lock:
+            self._status = status_text
+
+    def post_stats(self, total_count, channel_counts, snapshot=None):
+        """統計情報を更新（次のフレームで最新値のみ反映）"""
+        with self._lock:
+            self._stats = (total_count, channel_counts, snapshot)
+
+    def post_eew(self, text):
+        """緊急地震速報の一覧を更新（次のフレームで最新値のみ反映）"""
+        with self._lock:
+            self._eew = text
+
+    # --- GUIスレッドで実行される ---
+    def start(self):
+        """描画ループを開始"""
+        if not self._running:
+            self._running = True
+            self._after_id = self.root.after(self.interval_ms, self._on_frame)
+
+    def stop(self):
+        """描画ループを停止"""
+        self._running = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _on_frame(self):
+        try:
+            self.flush()
+        finally:
+            if self._running:
+                self._after_id = self.root.after(self.interval_ms, self._on_frame)
+
+    def flush(self):
+        """溜まっている更新を1回の描画で反映"""
+        with self._lock:
+            urgent = list(self._urgent)
+            self._urgent.clear()
+            count = min(len(self._texts), max(0, self.max_items_per_frame - len(urgent)))
+            items = [self._texts.popleft() for _ in range(count)]
+            dropped, self._dropped_pending = self._dropped_pending, 0
+            status, self._status = self._status, None
+            stats, self._stats = self._stats, None
+            eew, self._eew = self._eew, None
+
+        # 緊急地震速報の行を先に、捨てた行の知らせはそれより新しい行の前に置く
+        texts = [text for text, trace in urgent]
+        if dropped:
+            texts.append(self.gui.format_log_message(f"描画が追いつかないため {dropped}行を省略しました", "WARNING"))
+        texts += [text for text, trace in items]
+        traces = [trace for text, trace in urgent + items if trace is not None]
+
+        if texts:
+            self.gui.append_log_text("".join(texts))
+            self.rendered_count += len(texts)
+            rendered = time.perf_counter()
+            for trace in traces:
+                trace.finish(rendered)
+        if status is not None:
+            self.gui.update_status_label(status)
+        if stats is not None:
+            self.gui.update_stats_label(*stats)
+        if eew is not None:
+            self.gui.update_eew_panel(eew)
+        if texts or status is not None or stats is not None or eew is not None:
+            self.frame_count += 1
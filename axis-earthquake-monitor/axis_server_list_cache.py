@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 取得したサーバーリストの保存先（スクリプトと同じ場所）
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server_list_cache.json")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """プロセス全体で共有する requests.Session を返す（TCP/TLS接続を使い回す）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class ServerListCache:
+    """サーバーリストをディスクに保存し、接続時は保存済みのリストをすぐに返すキャッシュ
+
+    有効期限（ttl 秒）を過ぎたリストもそのまま返し、更新はバックグラウンドで行う。
+    一度も取得したことがない場合だけ、その場でAPIを呼び出す。
+    """
+
+    def __init__(self, url, cache_path=DEFAULT_CACHE_PATH, ttl=3600.0, timeout=10.0, session=None, log=None):
+        self.url = url
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = session
+        self.log = log  # log(message, level) 形式のコールバック（任意）
+        self.servers = []
+        self.fetched_at = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._load()
+
+    def _log(self, message, level):
+        if self.log:
+            self.log(message, level)
+
+    def _load(self):
+        """ディスクに保存されたリストを読み込む（URLごとに保存している）"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(self.url)
+        except (OSError, ValueError) as e:
+            self._log(f"サーバーリストのキャッシュを読み込めません: {e}", "WARNING")
+            return
+        if entry and entry.get('servers'):
+            self.servers = list(entry['servers'])
+            self.fetched_at = entry.get('fetched_at')
+
+    def _save(self, servers, fetched_at):
+        """一時ファイルへ書いてから置き換える（書き込み途中で壊れないように）"""
+        if not self.cache_path:
+            return
+        try:
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            entries[self.url] = {'servers': servers, 'fetched_at': fetched_at}
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            self._log(f"サーバーリストのキャッシュを保存できません: {e}", "WARNING")
+
+    def is_fresh(self):
+        """有効期限内のリストを持っているか"""
+        return self.fetched_at is not None and time.time() - self.fetched_at < self.ttl
+
+    def get(self, token):
+        """サーバーリストを返す（保存済みがあれば待たずに返し、期限切れなら裏で更新する）"""
+        with self._lock:
+            servers = list(self.servers)
+        if not servers:
+            return self.refresh(token) or []
+        if not self.is_fresh():
+            self.refresh_async(token)
+        return servers
+
+    def refresh(self, token):
+        """APIからサーバーリストを取得して保存する（失敗時は None）"""
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        session = self.session if self.session else get_session()
+        try:
+            self._log(f"サーバーリスト取得試行: {self.url}", "INFO")
+            response = session.get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code != 200:
+                self._log(f"エラー {response.status_code}: {response.text}", "ERROR")
+                return None
+            servers = response.json().get('servers', [])
+        except requests.exceptions.RequestException as e:
+            self._log(f"接続エラー: {e}", "ERROR")
+            return None
+        except ValueError as e:
+            self._log(f"サーバーリストの形式が不正です: {e}", "ERROR")
+            return None
+
+        if not servers:
+            return None
+        fetched_at = time.time()
+        with self._lock:
+            self.servers = list(servers)
+            self.fetched_at = fetched_at
+            self._save(self.servers, fetched_at)
+        self._log(f"サーバーリスト取得成功: {len(servers)}個のサーバー", "SUCCESS")
+        return list(servers)
+
+    def refresh_async(self, token):
+        """バックグラウンドで更新する（更新中なら何もしない）"""
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, args=(token,), daemon=True)
+            self._refresh_thread.start()
@@ -0,0 +1,230 @@
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+JST = timezone(timedelta(hours=9))
+
+HYPOCENTERS = [
+    "千葉県東方沖", "茨城県沖", "茨城県南部", "福島県沖", "宮城県沖", "岩手県沖",
+    "三陸沖", "十勝沖", "能登半島沖", "石川県能登地方", "熊本県熊本地方", "日向灘",
+    "紀伊水道", "和歌山県北部", "長野県中部", "岐阜県飛騨地方", "静岡県西部", "伊豆大島近海",
+]
+
+REGIONS = [
+    "千葉県北東部", "千葉県北西部", "茨城県北部", "茨城県南部", "栃木県南部", "埼玉県南部",
+    "東京都23区", "神奈川県東部", "福島県中通り", "福島県浜通り", "宮城県南部", "石川県能登",
+]
+
+INTENSITIES = ["1", "2", "3", "4", "5弱", "5強", "6弱", "6強", "7"]
+
+
+def format_time(dt):
+    """ISO 8601 形式（JST）の時刻文字列"""
+    return dt.astimezone(JST).isoformat(timespec='seconds')
+
+
+def intensity_for(magnitude, depth):
+    """マグニチュードと深さからおおよその最大震度を決める"""
+    level = int(magnitude * 1.3 - math.log10(max(depth, 1)) * 1.5 - 2)
+    return INTENSITIES[max(0, min(level, len(INTENSITIES) - 1))]
+
+
+def make_frame(channel, message):
+    """AXISのフレーム形式の文字列を作る"""
+    return json.dumps({'channel': channel, 'message': message}, ensure_ascii=False)
+
+
+def make_eew(event_id, serial, magnitude, hypocenter, depth, origin_time, final=False, cancel=False):
+    """緊急地震速報（eew）のメッセージ"""
+    return {
+        'EventID': event_id,
+        'serial': serial,
+        'is_final': final,
+        'is_cancel': cancel,
+        'magnitude': round(magnitude, 1),
+        'maxIntensity': intensity_for(magnitude, depth),
+        'hypocenter': hypocenter,
+        'depth': depth,
+        'origin_time': format_time(origin_time),
+        'arrival_time': format_time(origin_time + timedelta(seconds=15)),
+    }
+
+
+def make_quake_one(event_id, magnitude, hypocenter, depth, origin_time, rng):
+    """QUAKE.ONE（quake-one）のメッセージ"""
+    max_intensity = intensity_for(magnitude, depth)
+    regions = rng.sample(REGIONS, k=min(len(REGIONS), 3 + int(magnitude)))
+    return {
+        'EventID': event_id,
+        'earthquake': {
+            'magnitude': round(magnitude, 1),
+            'hypocenter': hypocenter,
+            'depth': depth,
+            'time': format_time(origin_time),
+        },
+        'intensity': {
+            'max': max_intensity,
+            'regions': [f"{region}: 震度{rng.choice(INTENSITIES[:INTENSITIES.index(max_intensity) + 1])}"
+                        for region in regions],
+        },
+    }
+
+
+def make_jmx(event_id, magnitude, hypocenter, depth, origin_time, rng, station_count=50):
+    """気象庁電文（jmx-seismology）のメッセージ（観測点数で電文の大きさを調整）"""
+    return {
+        'EventID': event_id,
+        'InfoType': '発表',
+        'Title': '震源・震度に関する情報',
+        'DateTime': format_time(origin_time + timedelta(minutes=2)),
+        'Status': '通常',
+        'Body': {
+            'Earthquake': {
+                'OriginTime': format_time(origin_time),
+                'Hypocenter': {'Name': hypocenter, 'Depth': depth},
+                'Magnitude': round(magnitude, 1),
+            },
+            'Intensity': {
+                'MaxInt': intensity_for(magnitude, depth),
+                'Stations': [
+                    {
+                        'Code': f"{rng.randrange(1000000, 9999999)}",
+                        'Name': f"{rng.choice(REGIONS)}観測点{i}",
+                        'Int': rng.choice(INTENSITIES[:4]),
+                    }
+                    for i in range(station_count)
+                ],
+            },
+        },
+    }
+
+
+class SyntheticLoad:
+    """負荷プロファイルに従って (開始からの秒数, フレーム文字列) を生成する"""
+
+    def __init__(self, seed=None, start_time=None):
+        self.rng = random.Random(seed)
+        self.start_time = start_time or datetime.now(JST)
+        self._event_seq = 0
+
+    def _next_event_id(self, origin_time):
+        """発生時刻と通し番号から EventID を作る（通し番号は桁を切らないため、同じ負荷の中で重複しない）"""
+        self._event_seq += 1
+        return origin_time.strftime('%Y%m%d%H%M%S') + f"{self._event_seq:06d}"
+
+    def earthquake(self, offset, magnitude, hypocenter=None, depth=None,
+                   eew_serials=None, eew_interval=1.0, station_count=None):
+        """1つの地震について EEW → quake-one → jmx-seismology の順にフレームを生成"""
+        rng = self.rng
+        hypocenter = hypocenter or rng.choice(HYPOCENTERS)
+        depth = depth if depth is not None else rng.choice([10, 20, 30, 40, 50, 60, 80, 100])
+        origin_time = self.start_time + timedelta(seconds=offset)
+        event_id = self._next_event_id(origin_time)
+
+        frames = []
+        if eew_serials is None:
+            eew_serials = 0 if magnitude < 3.5 else min(3 + int((magnitude - 3.5) * 4), 30)
+        for serial in range(1, eew_serials + 1):
+            estimate = magnitude + rng.uniform(-0.5, 0.3) * (eew_serials - serial) / eew_serials
+            frames.append((offset + 5 + serial * eew_interval, make_frame(
+                'eew', make_eew(event_id, serial, estimate, hypocenter, depth, origin_time,
+                                final=serial == eew_serials))))
+
+        if station_count is None:
+            station_count = min(int(10 ** (magnitude / 2.5)), 2000)
+        frames.append((offset + 90, make_frame(
+            'quake-one', make_quake_one(event_id, magnitude, hypocenter, depth, origin_time, rng))))
+        frames.append((offset + 120, make_frame(
+            'jmx-seismology', make_jmx(event_id, magnitude, hypocenter, depth, origin_time, rng, station_count))))
+        return frames
+
+    def quiet(self, duration, mean_interval=600.0, offset=0.0):
+        """平常時: 小さな地震がまばらに発生する"""
+        frames = []
+        t = offset
+        while True:
+            t += self.rng.expovariate(1.0 / mean_interval)
+            if t >= offset + duration:
+                break
+            frames.extend(self.earthquake(t, self.rng.uniform(2.0, 4.0)))
+        return sorted(frames, key=lambda frame: frame[0])
+
+    def aftershock_sequence(self, mainshock_magnitude=7.0, aftershock_count=500, duration=3600.0,
+                            hypocenter=None, offset=0.0, b_value=1.0, omori_c=0.05, omori_p=1.1):
+        """本震と、改良大森公式に従って減衰する余震列"""
+        rng = self.rng
+        hypocenter = hypocenter or rng.choice(HYPOCENTERS)
+        frames = self.earthquake(offset, mainshock_magnitude, hypocenter)
+
+        # 余震の発生時刻: 改良大森公式 n(t) ∝ (t + c)^-p を逆関数法でサンプリング
+        def omori_time():
+            u = rng.random()
+            q = 1.0 - omori_p
+            upper = (duration + omori_c) ** q
+            lower = omori_c ** q
+            return (lower + u * (upper - lower)) ** (1.0 / q) - omori_c
+
+        for _ in range(aftershock_count):
+            # Gutenberg-Richter則に従うマグニチュード（本震 -1.0 を上限）
+            magnitude = min(2.0 - math.log10(1.0 - rng.random()) / b_value, mainshock_magnitude - 1.0)
+            frames.extend(self.earthquake(offset + omori_time(), magnitude, hypocenter))
+        return sorted(frames, key=lambda frame: frame[0])
+
+    def eew_burst(self, serial_count=30, interval=0.2, magnitude=6.5, offset=0.0, cancel=False):
+        """1つの地震に対する緊急地震速報の高頻度な続報"""
+        rng = self.rng
+        hypocenter = rng.choice(HYPOCENTERS)
+        depth = rng.choice([10, 30, 50])
+        origin_time = self.start_time + timedelta(seconds=offset)
+        event_id = self._next_event_id(origin_time)
+
+        frames = []
+        for serial in range(1, serial_count + 1):
+            estimate = magnitude + rng.uniform(-0.4, 0.4) * (serial_count - serial) / serial_count
+            last = serial == serial_count
+            frames.append((offset + serial * interval, make_frame(
+                'eew', make_eew(event_id, serial, estimate, hypocenter, depth, origin_time,
+                                final=last and not cancel, cancel=last and cancel))))
+        return frames
+
+    def constant_rate(self, rate, duration, mix=(('eew', 0.6), ('quake-one', 0.3), ('jmx-seismology', 0.1))):
+        """指定した件数/秒で各チャンネルを混ぜたフレームを生成（ストレステスト用）"""
+        rng = self.rng
+        channels = [channel for channel, _ in mix]
+        weights = [weight for _, weight in mix]
+        frames = []
+        count = int(rate * duration)
+        for i in range(count):
+            offset = i / rate
+            channel = rng.choices(channels, weights)[0]
+            magnitude = rng.uniform(2.0, 7.5)
+            hypocenter = rng.choice(HYPOCENTERS)
+            depth = rng.choice([10, 30, 50])
+            origin_time = self.start_time + timedelta(seconds=offset)
+            event_id = self._next_event_id(origin_time)
+            if channel == 'eew':
+                message = make_eew(event_id, rng.randint(1, 30), magnitude, hypocenter, depth, origin_time)
+            elif channel == 'quake-one':
+                message = make_quake_one(event_id, magnitude, hypocenter, depth, origin_time, rng)
+            else:
+                message = make_jmx(event_id, magnitude, hypocenter, depth, origin_time, rng, station_count=20)
+            frames.append((offset, make_frame(channel, message)))
+        return frames
+
+
+PROFILES = ('quiet', 'aftershock', 'eew-burst', 'constant')
+
+
+def build_profile(name, seed=None, rate=1000.0, duration=60.0):
+    """名前から負荷プロファイルのフレーム列を作る"""
+    load = SyntheticLoad(seed=seed)
+    if name == 'quiet':
+        return load.quiet(duration, mean_interval=max(duration / 10, 1.0))
+    if name == 'aftershock':
+        return load.aftershock_sequence(aftershock_count=int(rate), duration=duration)
+    if name == 'eew-burst':
+        return load.eew_burst(serial_count=int(rate), interval=duration / max(rate, 1))
+    if name == 'constant':
+        return load.constant_rate(rate, duration)
+    raise ValueError(f"unknown profile: {name}")
@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import os
+import struct
+
+# WebSocket (RFC 6455) のオペコード
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def accept_key(key):
+    """Sec-WebSocket-Key から Sec-WebSocket-Accept の値を計算"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def new_client_key():
+    """クライアント用の Sec-WebSocket-Key を生成"""
+    return base64.b64encode(os.urandom(16)).decode('ascii')
+
+
+def parse_http_head(head):
+    """HTTPリクエスト/レスポンスの先頭部分を (開始行, ヘッダー辞書) に分解（ヘッダー名は小文字）"""
+    lines = head.decode('latin-1').split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    """1フレームをエンコード（クライアントからの送信時は mask=True）"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+
+    length = len(payload)
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+
+    if mask:
+        mask_key = os.urandom(4)
+        header += mask_key
+        payload = apply_mask(payload, mask_key)
+    return bytes(header) + payload
+
+
+def apply_mask(payload, mask_key):
+    """マスク処理（XOR）を適用"""
+    if not payload:
+        return payload
+    # 4バイト単位の整数演算でまとめてXORする
+    repeated = (mask_key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'little') ^ int.from_bytes(repeated, 'little')).to_bytes(len(payload), 'little')
+
+
+def _parse_length(second, read_exact):
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', read_exact(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', read_exact(8))[0]
+    return length
+
+
+def read_frame(read_exact):
+    """1フレームを読み込んで (fin, opcode, payload) を返す
+
+    read_exact(n) はちょうどnバイトを返す関数（接続終了時は EOFError を送出）。
+    """
+    first, second = read_exact(2)
+    length = _parse_length(second, read_exact)
+    mask_key = read_exact(4) if second & 0x80 else None
+    payload = read_exact(length) if length else b""
+    if mask_key:
+        payload = apply_mask(payload, mask_key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+def read_message(read_exact, send_frame=None):
+    """分割フレームを結合して1メッセージを読み込み (opcode, payload) を返す
+
+    send_frame を渡すと ping に対して pong を自動で返す。
+    """
+    message_opcode = None
+    chunks = []
+    while True:
+        fin, opcode, payload = read_frame(read_exact)
+        if opcode == OP_PING:
+            if send_frame:
+                send_frame(payload, OP_PONG)
+            continue
+        if opcode == OP_PONG:
+            continue
+        if opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        chunks.append(payload)
+        if fin:
+            return message_opcode, b"".join(chunks)
+
+
+def socket_reader(sock):
+    """ソケットから read_exact 関数を作る"""
+    def read_exact(n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = sock.recv(n - len(data))
+            if not chunk:
+                raise EOFError("connection closed")
+            data += chunk
+        return bytes(data)
+    return read_exact
+
+
+async def read_frame_async(read_exact):
+    """read_frame の asyncio 版（read_exact は asyncio.StreamReader.readexactly など）"""
+    first, second = await read_exact(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await read_exact(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await read_exact(8))[0]
+    mask_key = await read_exact(4) if second & 0x80 else None
+    payload = await read_exact(length) if length else b""
+    if mask_key:
+        payload = apply_mask(payload, mask_key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+async def read_message_async(read_exact, send_frame=None):
+    """read_message の asyncio 版（send_frame はコルーチン関数）"""
+    message_opcode = None
+    chunks = []
+    while True:
+        fin, opcode, payload = await read_frame_async(read_exact)
+        if opcode == OP_PING:
+            if send_frame:
+                await send_frame(payload, OP_PONG)
+            continue
+        if opcode == OP_PONG:
+            continue
+        if opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        chunks.append(payload)
+        if fin:
+            return message_opcode, b"".join(chunks)
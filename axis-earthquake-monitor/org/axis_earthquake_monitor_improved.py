@@ -1,49 +1,43 @@
 import websocket
-import requests
 import json
 import threading
 import time
 from datetime import datetime
+import os
 import sys
 
+# 親ディレクトリの共通モジュールを参照できるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from axis_connection_manager import ConnectionManager, StallWatchdog
+from axis_connection_supervisor import ConnectionSupervisor
+from axis_earthquake_history import EarthquakeHistory
+from axis_earthquake_stats import EarthquakeStats, format_rates
+from axis_formatters import render_message
+from axis_server_list_cache import ServerListCache
+
 class AXISEarthquakeMonitor:
     def __init__(self, token):
         self.token = token
         self.ws = None
         self.connected = False
-        self.data_log = []
+        self.data_log = EarthquakeHistory()
+        self.stats = EarthquakeStats()
         self.server_url = None
+        self.connection_manager = ConnectionManager()
+        self.supervisor = ConnectionSupervisor()
+        self.stopping = False
+        self.connected_once = False
+        self.watchdog = None
+        self.server_list_cache = ServerListCache("https://axis.prioris.jp/api/server/list/",
+                                                 log=lambda message, level: print(message))
 
     def get_server_list(self):
         """AXISサーバーリストを取得"""
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
-        # 推測されるAPIエンドポイント
-        possible_urls = [
-            "https://axis.prioris.jp/api/server/list/"
-        ]
-
-        for api_url in possible_urls:
-            try:
-                print(f"サーバーリスト取得試行: {api_url}")
-                response = requests.get(api_url, headers=headers, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    servers = data.get('servers', [])
-                    if servers:
-                        print(f"✅ サーバーリスト取得成功: {len(servers)}個のサーバー")
-                        return servers
-                else:
-                    print(f"❌ エラー {response.status_code}: {response.text}")
-
-            except requests.exceptions.RequestException as e:
-                print(f"❌ 接続エラー: {e}")
-            except Exception as e:
-                print(f"❌ その他のエラー: {e}")
+        # 保存済みのリストがあれば待たずに使い、期限切れなら裏で更新する
+        servers = self.server_list_cache.get(self.token)
+        if servers:
+            return servers
 
         # フォールバック: ドキュメントから推測されるサーバー
         print("⚠️  サーバーリストAPIが利用できません。推測サーバーを使用します。")
@@ -51,6 +45,8 @@ class AXISEarthquakeMonitor:
 
     def on_message(self, ws, message):
         """WebSocketからメッセージを受信した時の処理"""
+        if self.watchdog:
+            self.watchdog.touch()
         if message == "hello":
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 🟢 サーバーに接続されました")
             return
@@ -68,27 +64,16 @@ class AXISEarthquakeMonitor:
             # 受信時刻を記録
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            print(f"\n{'='*80}")
-            print(f"🕐 受信時刻: {timestamp}")
-            print(f"📡 チャンネル: {channel}")
-            print(f"{'='*80}")
-
-            if channel == "jmx-seismology":
-                self.display_jmx_seismology(content)
-            elif channel == "quake-one":
-                self.display_quake_one(content)
-            elif channel == "eew":
-                self.display_eew(content)
-            else:
-                print(f"📄 メッセージ内容:")
-                print(json.dumps(content, ensure_ascii=False, indent=2))
+            # チャンネルごとの表示形式で1件分をまとめて出力
+            print(render_message(channel, content, timestamp), end="")
 
-            # データをログに保存
+            # データをログと統計情報に保存
+            self.stats.record(channel)
             self.data_log.append({
                 'timestamp': timestamp,
                 'channel': channel,
                 'data': content
-            })
+            }, size=len(message))
 
         except json.JSONDecodeError as e:
             print(f"❌ JSONパースエラー: {e}")
@@ -96,92 +81,6 @@ class AXISEarthquakeMonitor:
         except Exception as e:
             print(f"❌ データ処理エラー: {e}")
 
-    def display_jmx_seismology(self, data):
-        """JMX地震学データの表示"""
-        print("📡 JMX地震学情報（気象庁電文）")
-        print("-" * 40)
-        if isinstance(data, dict):
-            # 重要な情報を優先表示
-            important_keys = ['EventID', 'InfoType', 'Title', 'DateTime', 'Status']
-            for key in important_keys:
-                if key in data:
-                    print(f"  🔹 {key}: {data[key]}")
-
-            # その他の情報
-            for key, value in data.items():
-                if key not in important_keys:
-                    if isinstance(value, (dict, list)):
-                        print(f"  🔸 {key}: {json.dumps(value, ensure_ascii=False)}")
-                    else:
-                        print(f"  🔸 {key}: {value}")
-        else:
-            print(f"  📄 データ: {data}")
-
-    def display_quake_one(self, data):
-        """QUAKE.ONE データの表示"""
-        print("🌍 QUAKE.ONE地震情報")
-        print("-" * 40)
-        if isinstance(data, dict):
-            # 震源情報
-            if 'earthquake' in data:
-                eq_info = data['earthquake']
-                print("  🏔️  震源情報:")
-                print(f"    📏 マグニチュード: {eq_info.get('magnitude', 'N/A')}")
-                print(f"    📍 震源地: {eq_info.get('hypocenter', 'N/A')}")
-                print(f"    🕳️  深さ: {eq_info.get('depth', 'N/A')} km")
-                print(f"    🕐 発生時刻: {eq_info.get('time', 'N/A')}")
-
-            # 震度情報
-            if 'intensity' in data:
-                intensity_info = data['intensity']
-                print("  📊 震度情報:")
-                print(f"    🔥 最大震度: {intensity_info.get('max', 'N/A')}")
-                if 'regions' in intensity_info:
-                    print("    🗾 地域別震度:")
-                    for region in intensity_info['regions'][:5]:  # 最初の5件のみ表示
-                        print(f"      - {region}")
-
-            # その他の情報を表示
-            for key, value in data.items():
-                if key not in ['earthquake', 'intensity']:
-                    if isinstance(value, (dict, list)):
-                        print(f"  🔸 {key}: {json.dumps(value, ensure_ascii=False)}")
-                    else:
-                        print(f"  🔸 {key}: {value}")
-        else:
-            print(f"  📄 データ: {data}")
-
-    def display_eew(self, data):
-        """緊急地震速報(EEW)データの表示"""
-        print("🚨 緊急地震速報 (EEW)")
-        print("-" * 40)
-        if isinstance(data, dict):
-            # 重要な情報を強調表示
-            if 'magnitude' in data:
-                print(f"  🔥 マグニチュード: {data['magnitude']}")
-            if 'maxIntensity' in data or 'max_intensity' in data:
-                intensity = data.get('maxIntensity', data.get('max_intensity', 'N/A'))
-                print(f"  🔥 最大予想震度: {intensity}")
-            if 'origin_time' in data:
-                print(f"  ⏰ 発生時刻: {data['origin_time']}")
-            if 'hypocenter' in data:
-                print(f"  📍 震源地: {data['hypocenter']}")
-            if 'arrival_time' in data:
-                print(f"  ⚡ 到達予想時刻: {data['arrival_time']}")
-            if 'warning_time' in data:
-                print(f"  ⏰ 警報発表時刻: {data['warning_time']}")
-
-            # その他の情報
-            for key, value in data.items():
-                important_keys = ['magnitude', 'maxIntensity', 'max_intensity', 'origin_time', 'hypocenter', 'arrival_time', 'warning_time']
-                if key not in important_keys:
-                    if isinstance(value, (dict, list)):
-                        print(f"  🔸 {key}: {json.dumps(value, ensure_ascii=False)}")
-                    else:
-                        print(f"  🔸 {key}: {value}")
-        else:
-            print(f"  📄 データ: {data}")
-
     def on_error(self, ws, error):
         """エラー発生時の処理"""
         print(f"❌ WebSocketエラー: {error}")
@@ -196,8 +95,12 @@ class AXISEarthquakeMonitor:
     def on_open(self, ws):
         """接続開始時の処理"""
         self.connected = True
+        self.connected_once = True
+        recovery = self.supervisor.record_connected()
         print("\n" + "="*80)
         print("🌐 AXISサーバーに正常に接続しました！")
+        if recovery is not None:
+            print(f"🔁 再接続しました (切断から {recovery:.1f}秒, 累計 {self.supervisor.reconnect_count}回)")
         print("📡 地震情報の受信を開始します...")
         print("📱 監視中のチャンネル: jmx-seismology, quake-one, eew")
         print("⚠️  終了するには Ctrl+C を押してください")
@@ -205,11 +108,11 @@ class AXISEarthquakeMonitor:
 
         # ハートビート送信用のスレッドを開始
         def heartbeat():
-            while self.connected:
+            while self.connected and self.ws is ws:
                 try:
                     if ws.sock and ws.sock.connected:
                         ws.send('hb')
-                    time.sleep(30)  # 30秒間隔でハートビート送信
+                    time.sleep(self.supervisor.heartbeat_interval)  # 一定間隔でハートビート送信
                 except:
                     break
 
@@ -229,12 +132,44 @@ class AXISEarthquakeMonitor:
             print("❌ 利用可能なサーバーが見つかりません")
             return
 
-        # 最初のサーバーを使用
-        self.server_url = servers[0] + "/socket"
-        print(f"🌐 接続先サーバー: {self.server_url}")
+        # 全サーバーの応答速度を計測し、速い順に接続する
+        ranked = self.connection_manager.rank(servers, self.token)
+        for result in self.connection_manager.results:
+            if result.error is None:
+                print(f"📶 {result.server}: 初回受信 {result.first_message_ms:.0f}ms")
+            else:
+                print(f"⚠️  {result.server}: 計測失敗 ({result.error})")
 
         # WebSocketアプリケーションを作成
         websocket.enableTrace(False)  # デバッグログを無効化
+        websocket.setdefaulttimeout(self.connection_manager.connect_timeout)
+
+        server = ranked[0]
+        self.supervisor.start()
+        try:
+            # 切断・停滞時はバックオフしながら次に速いサーバーへ再接続する
+            while not self.stopping:
+                opened = self.run_websocket(server + "/socket")
+                if self.stopping:
+                    break
+                delay = self.supervisor.record_disconnected(opened)
+                if delay is None:
+                    print("❌ 再接続の試行回数が上限に達しました")
+                    break
+                server = self.connection_manager.next_server(server)
+                print(f"🔁 {delay:.1f}秒後に {server} へ再接続します (連続失敗 {self.supervisor.consecutive_failures}回)")
+                if self.supervisor.wait(delay):
+                    break
+        except KeyboardInterrupt:
+            print("\n⚠️  終了シグナルを受信しました")
+            self.stop()
+        except Exception as e:
+            print(f"❌ 接続エラー: {e}")
+
+    def run_websocket(self, url):
+        """1つのサーバーに接続し、切断されるまで受信する（接続できたかを返す）"""
+        self.server_url = url
+        print(f"🌐 接続先サーバー: {self.server_url}")
 
         headers = [f"Authorization: Bearer {self.token}"]
 
@@ -244,22 +179,30 @@ class AXISEarthquakeMonitor:
             on_message=self.on_message,
             on_error=self.on_error,
             on_close=self.on_close,
-            on_open=self.on_open
+            on_open=self.on_open,
+            on_pong=lambda ws, data: self.watchdog.touch()
         )
 
+        def on_stall(idle):
+            self.supervisor.record_stale()
+            print(f"⏱️  {idle:.0f}秒間 hb の応答もデータもないため接続を切断します")
+            self.ws.close()
+
+        self.connected_once = False
+        self.watchdog = StallWatchdog(self.supervisor.stale_timeout, on_stall).start()
         try:
             # 接続開始（永続化）
             self.ws.run_forever(ping_interval=60, ping_timeout=10)
-        except KeyboardInterrupt:
-            print("\n⚠️  終了シグナルを受信しました")
-            self.stop()
-        except Exception as e:
-            print(f"❌ 接続エラー: {e}")
+        finally:
+            self.watchdog.stop()
+        return self.connected_once
 
     def stop(self):
         """監視停止"""
         print("🛑 監視を停止しています...")
         self.connected = False
+        self.stopping = True
+        self.supervisor.cancel()
         if self.ws:
             self.ws.close()
 
@@ -272,26 +215,29 @@ class AXISEarthquakeMonitor:
             for channel, count in summary['channels'].items():
                 print(f"    - {channel}: {count}件")
             print(f"  最終受信時刻: {summary['latest_message']}")
+            print(f"  直近の受信数: {format_rates(summary['snapshot'])}")
+
+        reconnects = self.supervisor.snapshot()
+        if reconnects['reconnect_count'] or reconnects['failed_attempts']:
+            print(f"  再接続: {reconnects['reconnect_count']}回 (失敗 {reconnects['failed_attempts']}回, "
+                  f"無応答 {reconnects['stale_count']}回, 最大復旧時間 {reconnects['max_recovery_seconds']:.1f}秒)")
 
         print("✅ 停止完了")
 
     def get_log_summary(self):
         """受信データのサマリーを取得"""
-        if not self.data_log:
+        snapshot = self.stats.snapshot()
+        if not snapshot['total_count']:
             return "受信データはありません"
 
+        latest = datetime.fromtimestamp(snapshot['last_received']).strftime('%Y-%m-%d %H:%M:%S')
         summary = {
-            'total_messages': len(self.data_log),
-            'channels': {},
-            'latest_message': self.data_log[-1]['timestamp'] if self.data_log else None
+            'total_messages': snapshot['total_count'],
+            'channels': snapshot['channel_counts'],
+            'latest_message': latest,
+            'snapshot': snapshot
         }
 
-        for entry in self.data_log:
-            channel = entry['channel']
-            if channel not in summary['channels']:
-                summary['channels'][channel] = 0
-            summary['channels'][channel] += 1
-
         return summary
 
 # 使用例とメイン処理
@@ -1,36 +1,17 @@
 
-import requests
-import json
+from axis_server_list_cache import ServerListCache
 
 class AXISServerList:
     def __init__(self, token):
         self.token = token
         self.base_url = "https://axis.prioris.jp"  # 推測されるベースURL
+        # Model と同じキャッシュファイル・共有セッションを使う
+        self.cache = ServerListCache(f"{self.base_url}/api/server/list/",
+                                     log=lambda message, level: print(message))
 
     def get_available_servers(self):
-        """利用可能なサーバーリストを取得"""
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
-        # APIエンドポイント（ドキュメントから推測）
-        api_url = f"{self.base_url}/api/servers"  # 実際のURLは調整が必要
-
-        try:
-            response = requests.get(api_url, headers=headers)
-
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('servers', [])
-            else:
-                print(f"サーバーリスト取得エラー: {response.status_code}")
-                print(f"レスポンス: {response.text}")
-                return []
-
-        except requests.exceptions.RequestException as e:
-            print(f"ネットワークエラー: {e}")
-            return []
+        """利用可能なサーバーリストを取得（保存済みがあれば待たずに返す）"""
+        return self.cache.get(self.token)
 
     def test_connection(self, server_url):
         """指定されたサーバーへの接続テスト"""
@@ -0,0 +1,18 @@
+"""テスト用のフレームを作る"""
+import random
+from datetime import datetime
+
+from axis_synthetic_load import JST, make_eew, make_frame, make_jmx
+
+ORIGIN_TIME = datetime(2025, 7, 4, 12, 34, 56, tzinfo=JST)
+
+
+def jmx_frame(station_count=100):
+    """EAGER_PARSE_LENGTH より大きい jmx-seismology のフレーム"""
+    message = make_jmx('20250704123456', 5.5, '茨城県沖', 40, ORIGIN_TIME, random.Random(0), station_count)
+    return make_frame('jmx-seismology', message)
+
+
+def eew_frame(event_id, serial, magnitude=6.1, final=False, cancel=False, origin_time=ORIGIN_TIME):
+    """緊急地震速報のフレーム"""
+    return make_frame('eew', make_eew(event_id, serial, magnitude, '茨城県沖', 40, origin_time, final, cancel))
@@ -0,0 +1,52 @@
+from axis_eew_tracker import STATE_ACTIVE, STATE_CANCELLED, STATE_EXPIRED, STATE_FINAL, EEWTracker
+from axis_event_records import EEWRecord
+
+
+def eew(serial, received_at=1000.0, event_id='20250704123456', magnitude=6.1, final=False, cancel=False):
+    content = {'serial': serial, 'magnitude': magnitude, 'hypocenter': '茨城県沖',
+               'is_final': final, 'is_cancel': cancel}
+    return EEWRecord(received_at, 'eew', event_id, content)
+
+
+def test_follow_up_serial_updates_the_live_record():
+    tracker = EEWTracker()
+    first = tracker.update(eew(1))
+    second = tracker.update(eew(2, received_at=1001.0, magnitude=6.4, final=True))
+
+    assert first.is_new and not second.is_new
+    assert second.record is first.record
+    assert first.record.serial == 2 and first.record.magnitude == 6.4
+    assert second.changes == {'magnitude': (6.1, 6.4), 'state': (STATE_ACTIVE, STATE_FINAL)}
+
+
+def test_stale_and_duplicate_serials_are_ignored():
+    tracker = EEWTracker()
+    tracker.update(eew(3))
+
+    assert tracker.update(eew(2)) is None
+    assert tracker.update(eew(3)) is None
+    assert tracker.ignored_count == 2
+    assert tracker.get('20250704123456').serial == 3
+
+
+def test_records_without_event_id_are_always_new():
+    tracker = EEWTracker()
+    first = tracker.update(eew(1, event_id=None))
+    second = tracker.update(eew(1, event_id=None))
+
+    assert first.is_new and second.is_new
+    assert first.record is not second.record
+
+
+def test_silent_event_expires_and_is_dropped_after_retention():
+    tracker = EEWTracker(inactive_seconds=180, retain_seconds=600)
+    record = tracker.update(eew(1)).record
+    tracker.update(eew(1, event_id='20250704999999', cancel=True))
+
+    assert tracker.state(record, now=1100.0) == STATE_ACTIVE
+    assert tracker.state(record, now=1200.0) == STATE_EXPIRED
+    assert [state for _, state in tracker.events(now=1200.0)] == [STATE_CANCELLED, STATE_EXPIRED]
+
+    tracker.expire(now=1000.0 + 180 + 601)
+    assert tracker.get('20250704123456') is None
+    assert tracker.get('20250704999999') is None
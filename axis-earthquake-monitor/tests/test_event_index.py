@@ -0,0 +1,67 @@
+from axis_earthquake_history import EarthquakeHistory
+from axis_earthquake_model import EarthquakeModel
+from axis_event_index import EventIndex
+from axis_event_records import QuakeOneRecord
+from frames import ORIGIN_TIME, eew_frame
+
+
+def quake(event_id, magnitude, origin_time='2025-07-04T12:34:56+09:00'):
+    content = {'earthquake': {'magnitude': magnitude, 'hypocenter': '茨城県沖', 'time': origin_time},
+               'intensity': {'max': '4'}}
+    return QuakeOneRecord(1000.0, 'quake-one', event_id, content)
+
+
+def test_discard_removes_record_from_every_index():
+    index = EventIndex()
+    record = quake('1', 5.0)
+    index.add(record)
+    assert index.query(min_magnitude=4.5) == [record]
+
+    assert index.discard(record)
+    assert index.get('1') is None
+    assert index.query(min_magnitude=4.5) == []
+    assert index.query(hypocenter='茨城県沖') == []
+
+
+def test_untimed_records_are_only_returned_without_period():
+    index = EventIndex()
+    timed, untimed = quake('1', 5.0), quake('2', 5.0, origin_time=None)
+    index.add(timed)
+    index.add(untimed)
+
+    assert index.query() == [timed, untimed]
+    assert index.query(since=ORIGIN_TIME.timestamp() - 60) == [timed]
+
+
+def test_refresh_updates_changed_values():
+    index = EventIndex()
+    record = quake('1', 5.0)
+    index.add(record)
+    record.magnitude = 6.0
+
+    assert index.refresh(record)
+    assert index.query(min_magnitude=5.5) == [record]
+    assert index.query(max_magnitude=5.5) == []
+
+
+def test_refresh_does_not_reindex_discarded_record():
+    index = EventIndex()
+    record = quake('1', 5.0)
+    index.add(record)
+    index.discard(record)
+
+    assert not index.refresh(record)
+    assert index.get('1') is None
+    assert len(index) == 0
+
+
+def test_later_serial_of_evicted_eew_is_not_reindexed():
+    model = EarthquakeModel(history=EarthquakeHistory(max_entries=1), dispatch=False)
+    model.on_websocket_message(None, eew_frame('20250704000001', 1))
+    model.on_websocket_message(None, eew_frame('20250704000002', 1))
+    assert model.event_index.get('20250704000001') is None
+
+    model.on_websocket_message(None, eew_frame('20250704000001', 2, magnitude=6.5))
+    assert model.eew_tracker.get('20250704000001').magnitude == 6.5
+    assert model.event_index.get('20250704000001') is None
+    assert [record.event_id for record in model.event_index.query()] == ['20250704000002']
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from axis_event_store import EventStore
+
+
+def write_store(path, messages, **kwargs):
+    """(channel, event_id, raw, received_at) の列をデータベースに書き込んで閉じる"""
+    store = EventStore(str(path), **kwargs).start()
+    for channel, event_id, raw, received_at in messages:
+        store.append(channel, event_id, raw, received_at)
+    store.close()
+    return store
+
+
+def test_messages_are_written_in_batches_and_read_back(tmp_path):
+    messages = [('eew' if i % 2 else 'quake-one', str(i // 2), f'{{"n": {i}}}', 1000.0 + i) for i in range(10)]
+    store = write_store(tmp_path / "history.db", messages, batch_size=4)
+
+    assert store.written_count == 10
+    assert store.count() == 10
+    assert [m.received_at for m in store.read_range(1002.0, 1006.0, channel='eew')] == [1003.0, 1005.0]
+    assert [m.channel for m in store.find_event('2')] == ['quake-one', 'eew']
+    assert [m.received_at for m in store.load_recent(since=1007.0)] == [1007.0, 1008.0, 1009.0]
+
+
+def test_database_uses_wal_mode(tmp_path):
+    path = tmp_path / "history.db"
+    write_store(path, [])
+    connection = sqlite3.connect(str(path))
+    try:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    finally:
+        connection.close()
+
+
+def test_schema_is_created_only_once(tmp_path, monkeypatch):
+    store = EventStore(str(tmp_path / "history.db"))
+    calls = []
+    create_schema = store._create_schema
+    monkeypatch.setattr(store, '_create_schema', lambda: (calls.append(1), create_schema()))
+
+    for _ in range(3):
+        store.connect().close()
+    assert store.count() == 0
+    assert len(calls) == 1
+
+
+def test_messages_past_retention_are_pruned(tmp_path):
+    path = tmp_path / "history.db"
+    now = time.time()
+    write_store(path, [('eew', str(i), '{}', now - 7200 + i) for i in range(5)] + [('eew', '9', '{}', now)])
+
+    store = write_store(path, [], retention_seconds=3600)
+    assert store.pruned_count == 5
+    assert [m.event_id for m in store.read_range()] == ['9']
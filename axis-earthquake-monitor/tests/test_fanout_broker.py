@@ -0,0 +1,44 @@
+import json
+import socket
+import time
+
+from axis_earthquake_model import EarthquakeModel
+from axis_fanout_broker import FanoutBroker
+from frames import eew_frame
+
+
+def subscribe_tcp(broker, channel):
+    """TCPで購読し、購読が登録されるまで待ってからソケットを返す"""
+    client = socket.create_connection((broker.host, broker.port), timeout=5)
+    client.sendall(f"SUBSCRIBE {channel}\n".encode('utf-8'))
+    deadline = time.monotonic() + 5
+    while not broker._subscribers.get(channel) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return client
+
+
+def read_lines(client, count):
+    data = b""
+    while data.count(b"\n") < count:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode('utf-8').splitlines()
+
+
+def test_ignored_eew_frames_are_relayed_to_subscribers():
+    broker = FanoutBroker().start()
+    model = EarthquakeModel(callbacks={'message_received': broker.on_message_received}, dispatch=False)
+    client = subscribe_tcp(broker, 'eew')
+    try:
+        for serial in (2, 1, 2):
+            model.on_websocket_message(None, eew_frame('20250704123456', serial))
+        lines = read_lines(client, 3)
+    finally:
+        client.close()
+        model.close()
+        broker.stop()
+
+    assert [json.loads(line)['message']['serial'] for line in lines] == [2, 1, 2]
+    assert model.eew_tracker.ignored_count == 2
@@ -0,0 +1,30 @@
+from axis_latency import LatencyTracker
+
+
+def finish_trace(tracker, received_at, origin_time):
+    trace = tracker.begin(received_at, received=10.0)
+    trace.channel = 'eew'
+    trace.origin_time = origin_time
+    trace.finish(end=10.5)
+
+
+def test_origin_latency_is_measured_to_display():
+    tracker = LatencyTracker()
+    finish_trace(tracker, received_at=1000.0, origin_time=990.0)
+
+    origin = tracker.snapshot()['eew']['origin']
+    assert origin['count'] == 1
+    assert origin['sum'] == 10.5
+    assert tracker.clock_skew_count == 0
+
+
+def test_origin_in_the_future_is_counted_as_clock_skew():
+    tracker = LatencyTracker()
+    finish_trace(tracker, received_at=1000.0, origin_time=1002.0)
+    finish_trace(tracker, received_at=1000.0, origin_time=999.0)
+
+    snapshot = tracker.snapshot()['eew']
+    assert snapshot['origin']['count'] == 1
+    assert snapshot['origin']['sum'] == 1.5
+    assert snapshot['total']['count'] == 2
+    assert tracker.clock_skew_count == 1
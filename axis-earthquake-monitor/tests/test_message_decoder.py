@@ -0,0 +1,36 @@
+from axis_earthquake_model import EarthquakeModel
+from axis_message_decoder import EAGER_PARSE_LENGTH, decode
+from frames import jmx_frame
+
+
+def make_model():
+    received = []
+    model = EarthquakeModel(callbacks={'message_received': lambda *args: received.append(args)}, dispatch=False)
+    return model, received
+
+
+def test_large_frame_is_peeked_without_parsing():
+    assert len(jmx_frame()) > EAGER_PARSE_LENGTH
+    decoded = decode(jmx_frame())
+    assert decoded.channel == 'jmx-seismology'
+    assert not decoded.parsed
+
+
+def test_truncated_large_frame_is_rejected_before_notification():
+    model, received = make_model()
+    model.on_websocket_message(None, jmx_frame()[:3000])
+
+    assert received == []
+    assert len(model.data_log) == 0
+    assert model.decode_error_count == 1
+    assert model.stats.counts()[0] == 0
+
+
+def test_valid_large_frame_is_recorded_and_notified():
+    model, received = make_model()
+    model.on_websocket_message(None, jmx_frame())
+
+    assert len(received) == 1
+    assert len(model.data_log) == 1
+    assert model.data_log[0].title == '震源・震度に関する情報'
+    assert model.decode_error_count == 0
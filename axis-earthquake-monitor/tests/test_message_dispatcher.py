@@ -0,0 +1,55 @@
+import threading
+
+from axis_message_dispatcher import PriorityDispatcher
+
+
+def test_full_queue_drops_oldest_messages():
+    handled = []
+    dispatcher = PriorityDispatcher(handled.append, workers=1, max_queue_size=3)
+    for i in range(5):
+        dispatcher.submit('jmx-seismology', i)
+    assert dispatcher.dropped_count == 2
+    assert dispatcher.queue_depths() == {'jmx-seismology': 3}
+
+    dispatcher.start()
+    try:
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.stop()
+    assert handled == [2, 3, 4]
+
+
+def test_higher_priority_channel_is_processed_first():
+    handled = []
+    dispatcher = PriorityDispatcher(handled.append, workers=1)
+    dispatcher.express_priority = -1  # 専用ワーカーを使わず、1つのワーカーの取り出し順だけを確かめる
+    for channel in ('jmx-seismology', 'quake-one', 'eew', 'jmx-seismology', 'eew'):
+        dispatcher.submit(channel, channel)
+
+    dispatcher.start()
+    try:
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.stop()
+    assert handled == ['eew', 'eew', 'quake-one', 'jmx-seismology', 'jmx-seismology']
+
+
+def test_eew_is_not_blocked_by_slow_telegram():
+    release = threading.Event()
+    handled_eew = threading.Event()
+
+    def handler(channel):
+        if channel == 'eew':
+            handled_eew.set()
+        else:
+            release.wait(5)
+
+    dispatcher = PriorityDispatcher(handler, workers=1).start()
+    try:
+        dispatcher.submit('jmx-seismology', 'jmx-seismology')
+        dispatcher.submit('eew', 'eew')
+        assert handled_eew.wait(5)
+    finally:
+        release.set()
+        dispatcher.flush(timeout=5)
+        dispatcher.stop()
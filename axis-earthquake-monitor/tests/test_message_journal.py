@@ -0,0 +1,57 @@
+import time
+
+from axis_message_journal import MessageJournal
+from frames import eew_frame, jmx_frame
+
+
+def write_journal(directory, messages, **kwargs):
+    """(channel, raw, received_at) の列をジャーナルに書き込んで閉じる"""
+    journal = MessageJournal(str(directory), **kwargs)
+    journal.start()
+    for channel, raw, received_at in messages:
+        journal.append(channel, raw, received_at)
+    journal.close()
+    return journal
+
+
+def test_read_range_returns_records_in_time_window(tmp_path):
+    messages = [('eew', eew_frame('20250704123456', serial), 1000.0 + serial) for serial in range(1, 6)]
+    journal = write_journal(tmp_path, messages, segment_bytes=600)
+
+    assert len(journal.segment_numbers()) > 1
+    assert [record.received_at for record in journal.read_range(1002.0, 1004.0)] == [1002.0, 1003.0]
+    assert [record.received_at for record in journal.read_range()] == [1001.0, 1002.0, 1003.0, 1004.0, 1005.0]
+
+
+def test_find_event_returns_only_matching_event(tmp_path):
+    messages = [
+        ('eew', eew_frame('20250704000001', 1), 1000.0),
+        ('jmx-seismology', jmx_frame(), 1001.0),
+        ('eew', eew_frame('20250704999999', 1), 1002.0),
+        ('eew', eew_frame('20250704000001', 2), 1003.0),
+    ]
+    journal = write_journal(tmp_path, messages)
+
+    records = list(journal.find_event('20250704000001'))
+    assert [record.received_at for record in records] == [1000.0, 1003.0]
+    assert all(record.channel == 'eew' for record in records)
+
+
+def test_segments_past_retention_are_pruned(tmp_path):
+    now = time.time()
+    old = [('eew', eew_frame('20250704123456', serial), now - 7200 + serial) for serial in range(1, 4)]
+    write_journal(tmp_path, old, segment_bytes=1)
+
+    recent = [('eew', eew_frame('20250704999999', 1), now)]
+    journal = write_journal(tmp_path, recent, segment_bytes=1, retention_seconds=3600)
+
+    assert journal.pruned_segment_count == 3
+    assert [record.received_at for record in journal.read_range()] == [now]
+
+
+def test_max_segments_keeps_newest_segments(tmp_path):
+    messages = [('eew', eew_frame('20250704123456', serial), 1000.0 + serial) for serial in range(1, 6)]
+    journal = write_journal(tmp_path, messages, segment_bytes=1, max_segments=2)
+
+    assert len(journal.segment_numbers()) == 2
+    assert [record.received_at for record in journal.read_range()] == [1004.0, 1005.0]
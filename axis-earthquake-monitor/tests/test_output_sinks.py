@@ -0,0 +1,45 @@
+import io
+import json
+
+from axis_headless import HeadlessMonitor
+from axis_output_sinks import SinkHub, StdoutSink, event_line
+from frames import eew_frame, jmx_frame
+
+
+def test_event_line_embeds_frame_as_json():
+    raw = '{"channel": "eew",\n "message": {"EventID": "1"}}'
+    entry = json.loads(event_line('eew', '1', raw, 1.5))
+    assert entry == {'received_at': 1.5, 'channel': 'eew', 'event_id': '1',
+                     'frame': {'channel': 'eew', 'message': {'EventID': '1'}}}
+
+
+def publish_frames(frames):
+    """HeadlessMonitor にフレームを受信させ、(出力された行, モニター) を返す"""
+    stream = io.StringIO()
+    hub = SinkHub([StdoutSink(stream)])
+    monitor = HeadlessMonitor(hub, log_stream=io.StringIO())
+    hub.start()
+    try:
+        for frame in frames:
+            monitor.model.on_websocket_message(None, frame)
+        monitor.model.flush(timeout=5)
+        hub.flush(timeout=5)
+    finally:
+        monitor.model.close()
+        hub.close()
+    return stream.getvalue().splitlines(), monitor
+
+
+def test_invalid_large_frame_is_not_published_to_sinks():
+    lines, monitor = publish_frames([jmx_frame()[:3000], jmx_frame()])
+    assert len(lines) == 1
+    assert json.loads(lines[0])['frame']['channel'] == 'jmx-seismology'
+    assert monitor.model.decode_error_count == 1
+
+
+def test_ignored_eew_frames_are_still_published():
+    lines, monitor = publish_frames([eew_frame('20250704123456', 2), eew_frame('20250704123456', 1),
+                                     eew_frame('20250704123456', 2)])
+
+    assert [json.loads(line)['frame']['message']['serial'] for line in lines] == [2, 1, 2]
+    assert monitor.model.eew_tracker.ignored_count == 2
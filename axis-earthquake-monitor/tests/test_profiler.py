@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from axis_profiler import CallbackProfiler
+
+
+def call_from_threads(func, threads=8, calls=2000):
+    def run():
+        for _ in range(calls):
+            func()
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * calls
+
+
+def test_calls_from_many_threads_are_all_counted():
+    profiler = CallbackProfiler(sample_every=4)
+    expected = call_from_threads(profiler.wrap('stage.work', lambda: None))
+
+    row = profiler.report()[0]
+    assert row['calls'] == expected
+    assert row['timed_calls'] == expected // 4
+
+
+def test_errors_are_counted_on_unsampled_calls():
+    profiler = CallbackProfiler(sample_every=2)
+
+    def fail():
+        raise ValueError("失敗")
+    wrapped = profiler.wrap('callback.fail', fail)
+    for _ in range(4):
+        with pytest.raises(ValueError):
+            wrapped()
+
+    row = profiler.report()[0]
+    assert (row['calls'], row['errors'], row['timed_calls']) == (4, 4, 2)
@@ -0,0 +1,26 @@
+from axis_redundant_connection import FrameDeduplicator, dedup_key
+from frames import eew_frame, jmx_frame
+
+
+def test_first_copy_wins_and_lead_is_recorded():
+    dedup = FrameDeduplicator()
+    assert dedup.accept('A', eew_frame('20250704123456', 1), received_at=10.0)
+    assert not dedup.accept('B', eew_frame('20250704123456', 1), received_at=10.25)
+    assert dedup.accept('B', eew_frame('20250704123456', 2), received_at=11.0)
+
+    report = dedup.report()
+    assert (report['unique_count'], report['duplicate_count']) == (2, 1)
+    assert report['paths'] == {'A': {'wins': 1, 'mean_lead_ms': 250.0, 'max_lead_ms': 250.0}}
+
+
+def test_eew_key_uses_serial_and_other_channels_use_body():
+    assert dedup_key(eew_frame('20250704123456', 3)) == ('eew', '20250704123456', '3')
+    assert dedup_key(jmx_frame(station_count=10)) != dedup_key(jmx_frame(station_count=20))
+
+
+def test_oldest_keys_are_forgotten_past_max_keys():
+    dedup = FrameDeduplicator(max_keys=2)
+    for serial in (1, 2, 3):
+        assert dedup.accept('A', eew_frame('20250704123456', serial))
+    assert dedup.accept('B', eew_frame('20250704123456', 1))
+    assert not dedup.accept('B', eew_frame('20250704123456', 3))
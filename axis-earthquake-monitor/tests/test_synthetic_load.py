@@ -0,0 +1,8 @@
+from axis_synthetic_load import SyntheticLoad
+from frames import ORIGIN_TIME
+
+
+def test_event_ids_are_unique_within_same_second():
+    load = SyntheticLoad(seed=0, start_time=ORIGIN_TIME)
+    event_ids = [load._next_event_id(ORIGIN_TIME) for _ in range(250)]
+    assert len(set(event_ids)) == len(event_ids)